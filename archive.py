@@ -0,0 +1,476 @@
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from configs import DB_ARCHIVE_AFTER_DAYS, DB_ARCHIVE_BATCH_SIZE, DB_PATH, DB_STORAGE_PROFILE
+from connection_pool import connect
+
+# Columns of the predictions table, in its order; archive files hold the same columns
+COLUMNS = ['prediction_id', 'doctor_id', 'patient_id', 'prediction_timestamp', 'age', 'cancer_stage', 'tumor_size',
+           'tumor_type', 'metastasis', 'treatment_type', 'comorbidities', 'predicted_class', 'prediction_probability']
+_COLUMN_LIST = ', '.join(COLUMNS)
+
+# An archive file: the predictions table without its foreign keys (the users stay in the main database),
+# with the same history indexes as the hot table. `{schema}` is the name the file is attached under
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS {schema}.predictions (
+        prediction_id           INTEGER PRIMARY KEY,
+        doctor_id               INTEGER NOT NULL,
+        patient_id              INTEGER NOT NULL,
+        prediction_timestamp    DATETIME NOT NULL,
+        age                     INT NOT NULL,
+        cancer_stage            VARCHAR(5) NOT NULL,
+        tumor_size              REAL NOT NULL,
+        tumor_type              VARCHAR(20) NOT NULL,
+        metastasis              VARCHAR(5) NOT NULL,
+        treatment_type          VARCHAR(20) NOT NULL,
+        comorbidities           VARCHAR(15) NOT NULL,
+        predicted_class         VARCHAR(15) NOT NULL,
+        prediction_probability  REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_predictions_doctor_time "
+    "ON predictions(doctor_id, prediction_timestamp DESC, prediction_id DESC)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_predictions_patient_time "
+    "ON predictions(patient_id, prediction_timestamp DESC, prediction_id DESC)",
+]
+
+# The hot table and its indexes, as named in dbstat
+HOT_OBJECTS = ['predictions', 'idx_predictions_doctor_time', 'idx_predictions_patient_time']
+
+
+def archive_path(db_path, year):
+    """Where the predictions of `year` are archived: next to `db_path`, e.g. app_database.archive_2023.db."""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.archive_{year}{ext or '.db'}"
+
+
+def archive_schema(year):
+    """The name an archive file is attached under."""
+    return f"archive_{year}"
+
+
+def has_archives(conn):
+    """Whether any prediction was ever archived (False before migration 6 too)."""
+    try:
+        return conn.execute("SELECT 1 FROM prediction_archives LIMIT 1").fetchone() is not None
+    except sqlite3.OperationalError:
+        return False
+
+
+def attach(conn, years):
+    """
+    Attaches the archive files of `years` to `conn`, unless they already are, and returns their schema
+    names in the same order. Connections keep archives attached between calls; when SQLite's limit on
+    attached databases would be exceeded, the other archives are detached first.
+
+    ATTACH cannot run inside a transaction: attach everything a transaction needs before its first write.
+    """
+    databases = {name: file for _, name, file in conn.execute("PRAGMA database_list").fetchall()}
+    schemas = [archive_schema(year) for year in years]
+    missing = [(year, schema) for year, schema in zip(years, schemas) if schema not in databases]
+    if not missing:
+        return schemas
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    if len(schemas) > limit:
+        raise ValueError(f"Cannot attach {len(schemas)} archives at once (SQLite allows {limit}).")
+    attached = [name for name in databases if name not in ('main', 'temp')]
+    if len(attached) + len(missing) > limit:
+        for name in attached:
+            if name.startswith('archive_') and name not in schemas:
+                conn.execute(f"DETACH DATABASE {name}")
+    # Files are named relative to the main database, so a replica (next to it) finds the same archives
+    directory = os.path.dirname(databases['main'])
+    marks = ", ".join("?" * len(missing))
+    files = dict(conn.execute(f"SELECT year, file FROM prediction_archives WHERE year IN ({marks})",
+                              [year for year, _ in missing]).fetchall())
+    for year, schema in missing:
+        if year not in files:
+            raise ValueError(f"No archive of {year} predictions.")
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (os.path.join(directory, files[year]),))
+    return schemas
+
+
+def year_groups(conn, years):
+    """
+    Splits `years` into consecutive runs that can be attached at once, given SQLite's limit on
+    attached databases and whatever other databases are attached to `conn`.
+    """
+    others = sum(1 for _, name, _ in conn.execute("PRAGMA database_list").fetchall()
+                 if name not in ('main', 'temp') and not name.startswith('archive_'))
+    size = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - others)
+    return [years[i:i + size] for i in range(0, len(years), size)]
+
+
+def archived_years(conn, column, value, descending=False):
+    """The years whose archive holds predictions with `column` (patient_id or doctor_id) = `value`."""
+    return [year for (year,) in conn.execute(
+        f"SELECT year FROM archived_prediction_counts WHERE {column} = ? GROUP BY year ORDER BY year{' DESC' if descending else ''}",
+        (value,)).fetchall()]
+
+
+def archived_count(conn, column, value):
+    """How many archived predictions have `column` (patient_id or doctor_id) = `value`, without opening an archive."""
+    return conn.execute(f"SELECT COALESCE(SUM(predictions), 0) FROM archived_prediction_counts WHERE {column} = ?",
+                        (value,)).fetchone()[0]
+
+
+# --- Archival Job ---
+def _cutoff(older_than_days):
+    # Timestamps are stored as SQLite's CURRENT_TIMESTAMP: UTC, 'YYYY-MM-DD HH:MM:SS'
+    return (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _prepare(conn, db_path, years):
+    """Registers and creates the archive files of `years` (outside any transaction) and attaches them."""
+    conn.executemany("INSERT OR IGNORE INTO prediction_archives (year, file) VALUES (?, ?)",
+                     [(year, os.path.basename(archive_path(db_path, year))) for year in years])
+    conn.commit()
+    schemas = attach(conn, years)
+    for schema in schemas:
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement.format(schema=schema))
+    return schemas
+
+
+def archive_predictions(db_path=DB_PATH, older_than_days=DB_ARCHIVE_AFTER_DAYS, profile=DB_STORAGE_PROFILE,
+                        batch_size=DB_ARCHIVE_BATCH_SIZE, before=None):
+    """
+    Moves every prediction older than `older_than_days` days (or logged before `before`, a UTC
+    'YYYY-MM-DD HH:MM:SS' timestamp) from the predictions table into its year's archive file.
+
+    Predictions move `batch_size` at a time, in prediction_id order, each batch in one IMMEDIATE
+    transaction across the main database and the archives it touches: copied, counted in
+    archived_prediction_counts and prediction_archives, then deleted from the hot table with
+    archive_state.moving set, so the summary tables (dashboard totals, each patient's latest
+    prediction) keep counting them. Copies are INSERT OR IGNORE, so rerunning an interrupted job
+    is safe. Deleted rows leave free pages that new predictions reuse; VACUUM returns them to the OS.
+
+    Returns:
+        dict: `before`, predictions `moved`, `batches`, `years` touched and `seconds` taken.
+    """
+    before = before or _cutoff(older_than_days)
+    conn = connect(db_path, profile)
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'archive_state'").fetchone() is None:
+        conn.close()
+        raise RuntimeError("The database predates the prediction archive; run `python migrations.py migrate` first.")
+
+    stats = {'before': before, 'moved': 0, 'batches': 0, 'years': set()}
+    start = time.perf_counter()
+    last_id = 0
+    try:
+        while True:
+            batch = conn.execute("""
+                SELECT prediction_id, CAST(substr(prediction_timestamp, 1, 4) AS INTEGER)
+                FROM predictions
+                WHERE prediction_id > ? AND prediction_timestamp < ?
+                ORDER BY prediction_id
+                LIMIT ?
+            """, (last_id, before, batch_size)).fetchall()
+            if not batch:
+                break
+            first_id, last_id = batch[0][0], batch[-1][0]
+            years = sorted({year for _, year in batch})
+            moved = 0
+            # A batch spanning more years than can be attached at once moves one group of years per transaction
+            for group in year_groups(conn, years):
+                schemas = _prepare(conn, db_path, group)
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("UPDATE archive_state SET moving = 1")
+                    for year, schema in zip(group, schemas):
+                        # Re-read inside the transaction: rows deleted since the batch was picked are not moved
+                        where = "prediction_id BETWEEN ? AND ? AND prediction_timestamp >= ? AND prediction_timestamp < ?"
+                        bounds = (first_id, last_id, f"{year}-01-01 00:00:00", min(f"{year + 1}-01-01 00:00:00", before))
+                        conn.execute(f"INSERT OR IGNORE INTO {schema}.predictions ({_COLUMN_LIST}) "
+                                     f"SELECT {_COLUMN_LIST} FROM main.predictions WHERE {where}", bounds)
+                        conn.execute(f"""
+                            INSERT INTO archived_prediction_counts (patient_id, year, doctor_id, predictions)
+                            SELECT patient_id, ?, doctor_id, COUNT(*) FROM main.predictions WHERE {where}
+                            GROUP BY patient_id, doctor_id
+                            ON CONFLICT (patient_id, year, doctor_id) DO UPDATE SET predictions = predictions + excluded.predictions
+                        """, (year,) + bounds)
+                        conn.execute(f"""
+                            UPDATE prediction_archives SET
+                                predictions = predictions + b.n,
+                                oldest = MIN(COALESCE(oldest, b.lo), b.lo),
+                                newest = MAX(COALESCE(newest, b.hi), b.hi),
+                                first_prediction_id = MIN(COALESCE(first_prediction_id, b.first_id), b.first_id),
+                                last_prediction_id = MAX(COALESCE(last_prediction_id, b.last_id), b.last_id)
+                            FROM (SELECT COUNT(*) AS n, MIN(prediction_timestamp) AS lo, MAX(prediction_timestamp) AS hi,
+                                         MIN(prediction_id) AS first_id, MAX(prediction_id) AS last_id
+                                  FROM main.predictions WHERE {where}) AS b
+                            WHERE year = ? AND b.n > 0
+                        """, bounds + (year,))
+                    moved += conn.execute("""
+                        DELETE FROM main.predictions
+                        WHERE prediction_id BETWEEN ? AND ? AND prediction_timestamp >= ? AND prediction_timestamp < ?
+                    """, (first_id, last_id, f"{group[0]}-01-01 00:00:00",
+                          min(f"{group[-1] + 1}-01-01 00:00:00", before))).rowcount
+                    conn.execute("UPDATE archive_state SET moving = 0")
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+            stats['moved'] += moved
+            stats['batches'] += 1
+            stats['years'].update(years)
+    finally:
+        conn.close()
+    stats['years'] = sorted(stats['years'])
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+# --- Deleting Users ---
+# Each patient's latest prediction in one archive, as stored in patient_latest_prediction
+_LATEST_IN = """
+    SELECT patient_id, prediction_id, doctor_id, prediction_timestamp, predicted_class, prediction_probability
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY patient_id ORDER BY prediction_timestamp DESC, prediction_id DESC
+        ) AS rn
+        FROM {table}
+        WHERE {where}
+    )
+    WHERE rn = 1
+"""
+
+
+def purge_users(conn, user_ids):
+    """
+    Deletes the archived predictions made by or for `user_ids` and takes them out of the summary
+    tables; their hot predictions cascade with the users. Call it before the DELETE of the users,
+    on a connection with no open transaction, then pass its result to restore_latest.
+
+    Archives are purged as many years at a time as can be attached at once. When they do not all
+    fit, each group but the last is committed before the next is attached (ATTACH cannot run inside
+    a transaction); the last group is left in the caller's transaction. An interrupted purge keeps
+    every counter in step with the archives, and deleting the users again finishes it.
+
+    Returns:
+        dict: patient_id -> the newest archived prediction that survives the purge (a
+              patient_latest_prediction row) or None, for every patient whose latest prediction
+              must be re-read once the users are deleted.
+    """
+    if not user_ids or not has_archives(conn):
+        return {}
+    ids = tuple(user_ids)
+    marks = ", ".join("?" * len(ids))
+    match = f"(doctor_id IN ({marks}) OR patient_id IN ({marks}))"
+    affected = [patient_id for (patient_id,) in conn.execute(
+        f"SELECT patient_id FROM patient_latest_prediction WHERE {match}", ids + ids).fetchall()]
+
+    # Read the replacement latest predictions before anything is deleted: restore_latest runs inside
+    # the transaction deleting the users, where no further archive can be attached
+    latest = dict.fromkeys(affected)
+    by_year = {}
+    if affected:
+        patient_marks = ", ".join("?" * len(affected))
+        for patient_id, year in conn.execute(f"""
+            SELECT patient_id, MAX(year) FROM archived_prediction_counts
+            WHERE patient_id IN ({patient_marks}) AND NOT {match} AND predictions > 0
+            GROUP BY patient_id
+        """, tuple(affected) + ids + ids).fetchall():
+            by_year.setdefault(year, []).append(patient_id)
+    for group in year_groups(conn, sorted(by_year)):
+        for year, schema in zip(group, attach(conn, group)):
+            patients = tuple(by_year[year])
+            where = f"patient_id IN ({', '.join('?' * len(patients))}) AND NOT {match}"
+            for row in conn.execute(_LATEST_IN.format(table=f"{schema}.predictions", where=where), patients + ids + ids).fetchall():
+                latest[row[0]] = tuple(row)
+
+    years = [year for (year,) in conn.execute(
+        f"SELECT DISTINCT year FROM archived_prediction_counts WHERE {match} ORDER BY year", ids + ids).fetchall()]
+    for i, group in enumerate(year_groups(conn, years)):
+        if i:
+            conn.commit()
+        purged = 0
+        for schema in attach(conn, group):
+            counts = conn.execute(f"SELECT doctor_id, predicted_class, COUNT(*) FROM {schema}.predictions WHERE {match} "
+                                  f"GROUP BY doctor_id, predicted_class", ids + ids).fetchall()
+            conn.executemany("UPDATE doctor_risk_counts SET predictions = predictions - ? WHERE doctor_id = ? AND predicted_class = ?",
+                             [(n, doctor_id, predicted_class) for doctor_id, predicted_class, n in counts])
+            conn.executemany("UPDATE system_totals SET value = value - ? WHERE name = 'predictions.class:' || ?",
+                             [(n, predicted_class) for _, predicted_class, n in counts])
+            purged += conn.execute(f"DELETE FROM {schema}.predictions WHERE {match}", ids + ids).rowcount
+        if purged:
+            year_marks = ", ".join("?" * len(group))
+            conn.execute(f"DELETE FROM archived_prediction_counts WHERE {match} AND year IN ({year_marks})", ids + ids + tuple(group))
+            conn.execute(f"""
+                UPDATE prediction_archives SET predictions = (
+                    SELECT COALESCE(SUM(predictions), 0) FROM archived_prediction_counts c WHERE c.year = prediction_archives.year
+                ) WHERE year IN ({year_marks})
+            """, group)
+            # Cached reads spanning the archives are invalidated like any other predictions write
+            conn.execute("UPDATE table_versions SET version = version + 1 WHERE table_name = 'predictions'")
+    return latest
+
+
+def restore_latest(conn, latest):
+    """
+    Recomputes the latest prediction of the patients returned by purge_users, from the hot table or,
+    for patients with no hot prediction left, from the archived one purge_users found. Call after
+    deleting the users, in the same transaction.
+    """
+    if not latest:
+        return
+    ids = tuple(latest)
+    marks = ", ".join("?" * len(ids))
+    conn.execute(f"DELETE FROM patient_latest_prediction WHERE patient_id IN ({marks})", ids)
+    # Hot predictions are newer than archived ones
+    conn.execute(f"""
+        INSERT INTO patient_latest_prediction (patient_id, prediction_id, doctor_id, prediction_timestamp,
+                                               predicted_class, prediction_probability)
+        {_LATEST_IN.format(table='main.predictions', where=f'patient_id IN ({marks})')}
+    """, ids)
+    conn.executemany("""
+        INSERT OR IGNORE INTO patient_latest_prediction (patient_id, prediction_id, doctor_id, prediction_timestamp,
+                                                         predicted_class, prediction_probability)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [row for row in latest.values() if row is not None])
+
+
+# --- Maintenance ---
+@contextmanager
+def including_archives(conn):
+    """
+    Within the block, `predictions` on `conn` names a TEMP view over the hot table and every archive,
+    for queries that must see all predictions (the summary table check and rebuild).
+
+    When there are more archives than can be attached at once, they are copied into a TEMP table a
+    group at a time (committing `conn` in between) and the view reads the copy: a snapshot of the
+    archives as of entering the block, so run it while no archival job or user deletion is running.
+    """
+    years = [year for (year,) in conn.execute("SELECT year FROM prediction_archives ORDER BY year").fetchall()] \
+        if has_archives(conn) else []
+    if not years:
+        yield
+        return
+    groups = year_groups(conn, years)
+    if len(groups) == 1:
+        tables = ['main.predictions'] + [f"{schema}.predictions" for schema in attach(conn, years)]
+    else:
+        conn.execute(f"CREATE TEMP TABLE archived_predictions AS SELECT {_COLUMN_LIST} FROM main.predictions WHERE 0")
+        for group in groups:
+            for schema in attach(conn, group):
+                conn.execute(f"INSERT INTO temp.archived_predictions SELECT {_COLUMN_LIST} FROM {schema}.predictions")
+            conn.commit()
+        tables = ['main.predictions', 'temp.archived_predictions']
+    conn.execute("CREATE TEMP VIEW predictions AS " +
+                 " UNION ALL ".join(f"SELECT {_COLUMN_LIST} FROM {table}" for table in tables))
+    try:
+        yield
+    finally:
+        conn.execute("DROP VIEW temp.predictions")
+        conn.execute("DROP TABLE IF EXISTS temp.archived_predictions")
+
+
+def check_archives(conn):
+    """
+    Recounts every archive and compares it with archived_prediction_counts and prediction_archives.
+
+    Returns:
+        dict: year -> (missing, extra) counter rows, as in summary_tables.check_summaries.
+    """
+    report = {}
+    for (year,) in conn.execute("SELECT year FROM prediction_archives ORDER BY year").fetchall():
+        schema, = attach(conn, [year])
+        actual = f"""
+            SELECT patient_id, {year}, doctor_id, COUNT(*) FROM {schema}.predictions GROUP BY patient_id, doctor_id
+        """
+        stored = f"SELECT patient_id, year, doctor_id, predictions FROM archived_prediction_counts WHERE year = {year} AND predictions != 0"
+        missing = conn.execute(f"{actual} EXCEPT {stored}").fetchall()
+        extra = conn.execute(f"{stored} EXCEPT {actual}").fetchall()
+        total = conn.execute(f"SELECT COUNT(*) FROM {schema}.predictions").fetchone()[0]
+        catalog = conn.execute("SELECT predictions FROM prediction_archives WHERE year = ?", (year,)).fetchone()[0]
+        if total != catalog:
+            missing.append(('prediction_archives', year, total))
+            extra.append(('prediction_archives', year, catalog))
+        report[year] = ([tuple(row) for row in missing], [tuple(row) for row in extra])
+    return report
+
+
+def hot_table_size(conn):
+    """Bytes used by the hot predictions table and its indexes, from the dbstat virtual table."""
+    marks = ", ".join("?" * len(HOT_OBJECTS))
+    return conn.execute(f"SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN ({marks})", HOT_OBJECTS).fetchone()[0]
+
+
+def status(db_path=DB_PATH, profile=DB_STORAGE_PROFILE):
+    """The hot table's rows and size, the database file's size and free pages, and each archive."""
+    conn = connect(db_path, profile)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        report = {
+            'hot_predictions': conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0],
+            'hot_bytes': hot_table_size(conn),
+            'file_bytes': os.path.getsize(db_path),
+            'free_bytes': conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size,
+            'archives': [],
+        }
+        if has_archives(conn):
+            for row in conn.execute("SELECT * FROM prediction_archives ORDER BY year").fetchall():
+                path = os.path.join(os.path.dirname(db_path), row['file'])
+                report['archives'].append({**dict(row), 'bytes': os.path.getsize(path) if os.path.exists(path) else None})
+        return report
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old predictions into per-year files, or inspect the archives.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run = subparsers.add_parser('run', help="Move predictions older than --days into their year's archive")
+    run.add_argument('--days', type=int, default=DB_ARCHIVE_AFTER_DAYS)
+    run.add_argument('--batch-size', type=int, default=DB_ARCHIVE_BATCH_SIZE)
+    subparsers.add_parser('status', help="Show the hot table's size and every archive")
+    subparsers.add_parser('check', help="Recount the archives and compare with their counters")
+    for sub in subparsers.choices.values():
+        sub.add_argument('--db', default=DB_PATH)
+        sub.add_argument('--profile', default=DB_STORAGE_PROFILE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        before = status(args.db, args.profile)
+        stats = archive_predictions(args.db, args.days, args.profile, args.batch_size)
+        after = status(args.db, args.profile)
+        print(f"Archived {stats['moved']:,} predictions logged before {stats['before']} in {stats['seconds']:.2f}s "
+              f"({stats['batches']} batch(es), years {', '.join(map(str, stats['years'])) or '-'}).")
+        print(f"Hot table: {before['hot_predictions']:,} -> {after['hot_predictions']:,} predictions, "
+              f"{before['hot_bytes'] / 2**20:,.1f} -> {after['hot_bytes'] / 2**20:,.1f} MB "
+              f"({after['free_bytes'] / 2**20:,.1f} MB free for reuse).")
+        return
+
+    if args.command == 'status':
+        report = status(args.db, args.profile)
+        print(f"Hot table: {report['hot_predictions']:,} predictions, {report['hot_bytes'] / 2**20:,.1f} MB "
+              f"(file {report['file_bytes'] / 2**20:,.1f} MB, {report['free_bytes'] / 2**20:,.1f} MB free)")
+        for archive in report['archives']:
+            size = "missing" if archive['bytes'] is None else f"{archive['bytes'] / 2**20:,.1f} MB"
+            print(f"  {archive['year']}: {archive['predictions']:>10,} predictions, {archive['oldest']} .. "
+                  f"{archive['newest']}, {archive['file']} ({size})")
+        return
+
+    conn = connect(args.db, args.profile)
+    failures = 0
+    report = check_archives(conn) if has_archives(conn) else {}
+    for year, (missing, extra) in report.items():
+        problems = f": {len(missing)} missing, {len(extra)} extra row(s)" if missing or extra else ""
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<6}{year}{problems}")
+        for row in missing[:5]:
+            print(f"        missing {row}")
+        for row in extra[:5]:
+            print(f"        extra   {row}")
+    print(f"{len(report) - failures}/{len(report)} archives consistent.")
+    conn.close()
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
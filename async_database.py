@@ -0,0 +1,206 @@
+import asyncio
+import atexit
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from configs import DB_PATH, DB_READER_THREADS, DB_READ_TIMEOUT, DB_STORAGE_PROFILE
+from database import DatabaseManager
+
+# DatabaseManager methods that only read; AsyncDatabaseManager offers exactly these
+READ_PREFIXES = ('get_', 'search_', 'find_')
+
+# Queued by close(), once per thread, to stop the reader threads after the reads queued before it
+_STOP = object()
+
+
+class ReaderPool:
+    """
+    A fixed set of reader threads for one database file, each with its own DatabaseManager.
+
+    Every thread opens a dedicated connection, so reads never wait for a pooled one and
+    never share a connection. SQLite lets any number of connections read at once and
+    the sqlite3 module releases the GIL while a statement runs, so reads submitted
+    together overlap. The managers share the process-wide query cache when `use_cache`
+    is set, and write nothing. If a thread cannot open its connection, the pool fails
+    every queued read with that error and refuses new ones.
+    """
+
+    def __init__(self, db_path=DB_PATH, threads=DB_READER_THREADS, profile=DB_STORAGE_PROFILE, use_cache=True):
+        self.db_path = db_path
+        self.profile = profile
+        self.use_cache = use_cache
+        self.queue = queue.SimpleQueue()  # (future, read) pairs
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error = None  # why a reader thread could not open the database
+        # Statistics
+        self.reads = 0
+        self.failures = 0
+        self._threads = [threading.Thread(target=self._run, name=f'db-reader-{i}', daemon=True) for i in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        try:
+            db_manager = DatabaseManager(self.db_path, use_pool=False, profile=self.profile, use_cache=self.use_cache,
+                                         write_mode='sync')
+        except Exception as e:
+            print(f"Reader thread could not open {self.db_path}: {e}")
+            self._fail(e)
+            return
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _STOP:
+                    return
+                future, read = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(read(db_manager))
+                except Exception as e:
+                    with self._lock:
+                        self.failures += 1
+                    future.set_exception(e)
+        finally:
+            db_manager.close()
+
+    def _fail(self, error):
+        """Fails every queued read with `error` and refuses new ones; stop markers stay queued for close()."""
+        with self._lock:
+            self._error = error
+            stops = 0
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stops += 1
+                    continue
+                future, _ = item
+                if future.set_running_or_notify_cancel():
+                    self.failures += 1
+                    future.set_exception(error)
+            for _ in range(stops):
+                self.queue.put(_STOP)
+
+    def submit(self, read):
+        """Queues `read(db_manager)` for the next free reader thread and returns its Future."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Reader pool is closed.")
+            if self._error is not None:
+                raise RuntimeError(f"Reader pool could not open {self.db_path}: {self._error}")
+            self.reads += 1
+            self.queue.put((future, read))
+        return future
+
+    def stats(self):
+        """Thread count and read counters."""
+        with self._lock:
+            return {
+                'threads': len(self._threads),
+                'reads': self.reads,
+                'failures': self.failures,
+                'queued': self.queue.qsize(),
+            }
+
+    def close(self):
+        """Lets the threads finish the reads already queued, then closes their connections."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _ in self._threads:
+                self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+
+class AsyncDatabaseManager:
+    """
+    Awaitable DatabaseManager reads, run on the shared reader threads for `db_path`.
+
+    Every get_*, search_* and find_* method of DatabaseManager is a coroutine here, taking
+    the same arguments and running the same SQL, so independent reads can be awaited together:
+
+        trend, history = await asyncio.gather(
+            async_db.get_risk_trend(patient_id),
+            async_db.get_history_by_patient_id(patient_id, page_size=ITEMS_PER_PAGE),
+        )
+
+    Synchronous callers such as the Streamlit pages use `read_all` instead. Writes stay on
+    DatabaseManager, which commits them on the calling thread.
+    """
+
+    def __init__(self, db_path=DB_PATH, profile=DB_STORAGE_PROFILE, use_cache=True):
+        self._readers = get_readers(db_path, profile, use_cache)
+
+    async def run(self, read):
+        """Awaits `read(db_manager)` on a reader thread, for reads no single method covers."""
+        return await asyncio.wrap_future(self._readers.submit(read))
+
+    def read_all(self, timeout=DB_READ_TIMEOUT, **reads):
+        """
+        Runs every `read(db_manager)` concurrently and waits for all of them.
+
+        Reads run on other threads, so anything tied to the Streamlit session (such as a
+        page cursor from st.session_state) must be looked up before calling.
+
+        Returns:
+            dict: The results, under the names the reads were given. The first failed read's
+                  exception is raised once every read has finished, and TimeoutError if they
+                  have not all finished within `timeout` seconds.
+        """
+        futures = {name: self._readers.submit(read) for name, read in reads.items()}
+        deadline = time.monotonic() + timeout
+        return {name: future.result(timeout=max(0, deadline - time.monotonic())) for name, future in futures.items()}
+
+    def reader_stats(self):
+        """Statistics of the shared reader threads."""
+        return self._readers.stats()
+
+
+def _read_method(name):
+    @functools.wraps(getattr(DatabaseManager, name))
+    async def read(self, *args, **kwargs):
+        # Looked up per call, so instrumentation enabled later (db_metrics) applies
+        return await self.run(lambda db_manager: getattr(db_manager, name)(*args, **kwargs))
+    return read
+
+
+for _name in dir(DatabaseManager):
+    if _name.startswith(READ_PREFIXES):
+        setattr(AsyncDatabaseManager, _name, _read_method(_name))
+
+
+# --- Process-wide Registry ---
+# One set of reader threads per database file, storage profile and cache setting
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_readers(db_path=DB_PATH, profile=DB_STORAGE_PROFILE, use_cache=True):
+    """Returns the shared reader pool for `db_path`, starting its threads on first use."""
+    with _readers_lock:
+        readers = _readers.get((db_path, profile, use_cache))
+        if readers is None:
+            readers = _readers[(db_path, profile, use_cache)] = ReaderPool(db_path, profile=profile, use_cache=use_cache)
+        return readers
+
+
+def close_readers():
+    """Stops every shared reader pool; registered to run at interpreter exit."""
+    with _readers_lock:
+        pools = list(_readers.values())
+        _readers.clear()
+    for readers in pools:
+        readers.close()
+
+
+atexit.register(close_readers)
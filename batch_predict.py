@@ -0,0 +1,149 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from feature_plan import INPUT_FEATURES
+
+# --- Worker State ---
+# Each worker process loads the artifacts (and its prediction cache) once in its initializer
+_artifacts = None
+_cache = None
+
+
+def _init_worker(cache_size=0):
+    """Loads the model artifacts into the worker process."""
+    global _artifacts, _cache
+    from utils import read_model_artifacts
+    from prediction_cache import PredictionCache
+    _artifacts = read_model_artifacts()
+    # One thread per process: parallelism comes from the pool, not from XGBoost
+    _artifacts['model'].set_params(n_jobs=1)
+    _cache = PredictionCache(max_entries=cache_size) if cache_size > 0 else None
+
+
+def score_chunk(chunk, artifacts=None, cache=None):
+    """
+    Preprocesses and scores one chunk of raw patient rows, consulting `cache` first if given.
+
+    Returns:
+        pd.DataFrame: 'prediction_probability' and 'predicted_class' columns, indexed like the chunk.
+    """
+    from utils import classify_risk_array
+    artifacts = artifacts or _artifacts
+    if cache is not None:
+        probabilities = cache.predict_proba(chunk, artifacts)
+    else:
+        X = artifacts['feature_plan'].transform(chunk)
+        probabilities = artifacts['model'].predict_proba(X)[:, 1]
+    return pd.DataFrame({
+        'prediction_probability': probabilities,
+        'predicted_class': classify_risk_array(probabilities),
+    }, index=chunk.index)
+
+
+def _score_and_attach(chunk, id_column):
+    """Worker entry point: scores a chunk, carries the optional ID column through and counts cache hits."""
+    hits_before = _cache.hits if _cache else 0
+    scored = score_chunk(chunk, cache=_cache)
+    if id_column:
+        scored.insert(0, id_column, chunk[id_column].to_numpy())
+    return scored, (_cache.hits - hits_before) if _cache else 0
+
+
+def read_chunks(input_path, chunk_size, id_column=None):
+    """Streams the input CSV in bounded chunks, reading only the model inputs (and the ID column)."""
+    header = pd.read_csv(input_path, nrows=0).columns
+    missing = [col for col in INPUT_FEATURES if col not in header]
+    if missing:
+        raise ValueError(f"Input file is missing required columns: {', '.join(missing)}")
+
+    usecols = INPUT_FEATURES + ([id_column] if id_column else [])
+    # keep_default_na=False keeps labels such as "None" as strings instead of NaN
+    dtypes = {col: str for col in INPUT_FEATURES if col not in ('Age', 'TumorSize')}
+    yield from pd.read_csv(input_path, usecols=usecols, dtype=dtypes, keep_default_na=False, chunksize=chunk_size)
+
+
+def batch_predict(input_path, output_path, chunk_size=50_000, workers=None, id_column=None, cache_size=0):
+    """
+    Scores a patient CSV chunk by chunk across a pool of worker processes.
+
+    At most two chunks per worker are in flight at any time, and results are
+    written in input order as soon as they are ready, so memory stays flat
+    regardless of the input size. With `cache_size` > 0, each worker keeps an LRU cache
+    of probabilities so repeated feature combinations are scored only once.
+
+    Returns:
+        dict: Row count, elapsed seconds, worker count and throughput figures.
+    """
+    workers = workers or os.cpu_count() or 1
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', newline='')
+
+    start = time.perf_counter()
+    total_rows = 0
+    cache_hits = 0
+    write_header = True
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_size,)) as pool:
+            pending = deque()
+            for chunk in read_chunks(input_path, chunk_size, id_column):
+                pending.append(pool.submit(_score_and_attach, chunk, id_column))
+                # Back-pressure: wait for the oldest chunk before reading more input
+                while len(pending) >= workers * 2:
+                    scored, hits = pending.popleft().result()
+                    total_rows += _write(scored, out, write_header)
+                    cache_hits += hits
+                    write_header = False
+            while pending:
+                scored, hits = pending.popleft().result()
+                total_rows += _write(scored, out, write_header)
+                cache_hits += hits
+                write_header = False
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    rows_per_sec = total_rows / elapsed if elapsed > 0 else 0.0
+    return {
+        'rows': total_rows,
+        'seconds': elapsed,
+        'workers': workers,
+        'rows_per_sec': rows_per_sec,
+        'rows_per_sec_per_core': rows_per_sec / workers,
+        'cache_hits': cache_hits,
+    }
+
+
+def _write(scored, out, write_header):
+    """Appends a scored chunk to the output stream and returns its row count."""
+    scored.to_csv(out, header=write_header, index=False, float_format='%.6f')
+    return len(scored)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with the cancer risk model.")
+    parser.add_argument('input', help="CSV with the model inputs: " + ", ".join(INPUT_FEATURES))
+    parser.add_argument('output', help="Output CSV path, or '-' for stdout")
+    parser.add_argument('--chunk-size', type=int, default=50_000, help="Rows per chunk (default: 50000)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--id-column', default=None, help="Input column copied to the output, e.g. PatientID")
+    parser.add_argument('--cache-size', type=int, default=0, help="Per-worker prediction cache entries (default: off)")
+    args = parser.parse_args(argv)
+
+    stats = batch_predict(args.input, args.output, args.chunk_size, args.workers, args.id_column, args.cache_size)
+    print(
+        f"Scored {stats['rows']} rows in {stats['seconds']:.2f}s with {stats['workers']} workers "
+        f"({stats['rows_per_sec']:.0f} rows/sec, {stats['rows_per_sec_per_core']:.0f} rows/sec per core)",
+        file=sys.stderr,
+    )
+    if args.cache_size:
+        print(f"Prediction cache hits: {stats['cache_hits']} ({stats['cache_hits'] / max(stats['rows'], 1):.1%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Size of the hot predictions table, and the latency of the history views and of logging a
+prediction, before and after archiving old predictions into per-year files.
+
+50 doctors and 5,000 patients share `predictions` predictions spread evenly over `--years`
+years from 2020-01-01; everything older than the newest `--hot-fraction` is archived. The
+views are timed on their first page (hot rows only) and on a page starting past the hot
+window (read from the hot table before archiving, from the archives after). Latencies are
+medians with the query cache off; the hot table's size is read from dbstat.
+
+Usage (from the repository root):
+    python -m benchmarks.archive --predictions 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from archive import archive_predictions, hot_table_size
+from benchmarks.summary_tables import DOCTORS, seed_database
+from configs import ITEMS_PER_PAGE
+from connection_pool import close_pool
+from database import DatabaseManager
+from models import Prediction
+
+DOCTOR_ID = 1
+PATIENT_ID = DOCTORS + 1
+PREDICTION = Prediction(
+    doctor_id=DOCTOR_ID, patient_id=PATIENT_ID, age=60, cancer_stage='II', tumor_size=4.0, tumor_type='Lung',
+    metastasis='No', treatment_type='Surgery', comorbidities='Hypertension', predicted_class='Low Risk',
+    prediction_probability=0.3,
+)
+
+
+def _time(fn, repeats):
+    fn()  # warm-up: attaches the archives, loads pages into SQLite's cache
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples))
+
+
+def measure(path, cutoff, repeats):
+    """Hot table rows and MB, then the median ms of each view and of a sync log_prediction."""
+    conn = sqlite3.connect(path)
+    report = {
+        'hot rows': conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0],
+        'hot MB': hot_table_size(conn) / 2**20,
+        'file MB': os.path.getsize(path) / 2**20,
+    }
+    conn.close()
+
+    past_hot = {'cursor': (cutoff, 0), 'page_size': ITEMS_PER_PAGE}
+    first = {'page_size': ITEMS_PER_PAGE}
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(path, use_cache=False, write_mode='sync')
+        views = {
+            'history_summary': lambda **kw: db_manager.get_history_summary(PATIENT_ID, **kw),
+            'history_by_patient_id': lambda **kw: db_manager.get_history_by_patient_id(PATIENT_ID, **kw),
+            'patient_records': lambda **kw: db_manager.get_patient_records(DOCTOR_ID, **kw),
+        }
+        for name, view in views.items():
+            report[f'{name} first page ms'] = _time(lambda: view(**first), repeats)
+            report[f'{name} past hot ms'] = _time(lambda: view(**past_hot), repeats)
+        report['risk_trend ms'] = _time(lambda: db_manager.get_risk_trend(PATIENT_ID), repeats)
+        report['log_prediction ms'] = _time(lambda: db_manager.log_prediction(PREDICTION), repeats)
+        close_pool(path)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot table and history views before and after archiving.")
+    parser.add_argument('--predictions', type=int, default=200_000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--hot-fraction', type=float, default=0.2, help="Share of the newest predictions left hot")
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    seconds_apart = args.years * 365 * 86400 // args.predictions
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_database(path, args.predictions, seconds_apart=seconds_apart)
+        conn = sqlite3.connect(path)
+        cutoff = conn.execute("SELECT datetime('2020-01-01', '+' || ? || ' seconds')",
+                              (int(args.predictions * (1 - args.hot_fraction)) * seconds_apart,)).fetchone()[0]
+        conn.close()
+
+        before = measure(path, cutoff, args.repeats)
+        stats = archive_predictions(path, before=cutoff)
+        after = measure(path, cutoff, args.repeats)
+        conn = sqlite3.connect(path)
+        conn.execute("VACUUM")
+        conn.close()
+        vacuumed_mb = os.path.getsize(path) / 2**20
+        archive_mb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp) if '.archive_' in name) / 2**20
+
+        print(f"{args.predictions:,} predictions over {args.years} years; archived before {cutoff}: "
+              f"{stats['moved']:,} in {stats['seconds']:.1f}s ({stats['moved'] / stats['seconds']:,.0f}/s, "
+              f"{stats['batches']} batches, {len(stats['years'])} archive files, {archive_mb:,.1f} MB)")
+        print(f"  {'':<38}{'before':>12}{'after':>12}")
+        for key in before:
+            fmt = ',.2f' if isinstance(before[key], float) else ','
+            print(f"  {key:<38}{before[key]:>12{fmt}}{after[key]:>12{fmt}}")
+        print(f"  {'file MB after VACUUM':<38}{'':>12}{vacuumed_mb:>12,.2f}")
+
+
+if __name__ == "__main__":
+    main()
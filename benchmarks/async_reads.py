@@ -0,0 +1,98 @@
+"""
+Page-level latency of dashboard pages that combine several independent reads: one after
+another on the script thread, against all at once on the reader threads.
+
+Each page's reads run through a pooled DatabaseManager in turn ("serial"), through
+AsyncDatabaseManager.read_all ("read_all", what the pages use) and as coroutines under
+asyncio.gather ("gather", on one long-running event loop). The query cache is off, so
+every load runs its SQL.
+
+Usage (from the repository root):
+    python -m benchmarks.async_reads --predictions 200000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from async_database import AsyncDatabaseManager, close_readers
+from benchmarks.summary_tables import DOCTORS, seed_database
+from configs import DB_READER_THREADS, ITEMS_PER_PAGE
+from connection_pool import close_pool
+from database import DatabaseManager
+
+DOCTOR_ID = 1
+PATIENT_ID = DOCTORS + 1
+
+
+# Page -> {read name: read(db_manager)}, each page's reads independent of one another
+PAGES = {
+    'doctor overview': {
+        'records': lambda db: db.get_patient_records(DOCTOR_ID, page_size=ITEMS_PER_PAGE),
+        'requests': lambda db: db.get_patient_requests(DOCTOR_ID, page_size=ITEMS_PER_PAGE),
+        'assigned': lambda db: db.get_assigned_patients(DOCTOR_ID),
+    },
+    'patient details': {
+        'risk_trend': lambda db: db.get_risk_trend(PATIENT_ID),
+        'history': lambda db: db.get_history_by_patient_id(PATIENT_ID, page_size=ITEMS_PER_PAGE),
+    },
+    'system overview': {
+        'totals': lambda db: db.get_system_totals(),
+        'doctors': lambda db: db.get_doctor_summaries(page_size=ITEMS_PER_PAGE),
+        'high_risk': lambda db: db.get_latest_predictions('High Risk', page_size=ITEMS_PER_PAGE),
+        'pending': lambda db: db.get_pending_doctors(page_size=ITEMS_PER_PAGE),
+    },
+}
+
+
+def _time(fn, repeats):
+    fn()  # warm-up: opens connections and reader threads, loads pages into SQLite's cache
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark concurrent dashboard reads.")
+    parser.add_argument('--predictions', type=int, default=200_000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_database(path, args.predictions)
+            db_manager = DatabaseManager(path, use_cache=False)
+            async_db = AsyncDatabaseManager(path, use_cache=False)
+
+        loop = asyncio.new_event_loop()
+
+        async def gather(reads):
+            return await asyncio.gather(*(async_db.run(read) for read in reads.values()))
+
+        print(f"{args.predictions:,} predictions, {DB_READER_THREADS} reader threads, {os.cpu_count()} CPU(s); "
+              f"median page load of {args.repeats}")
+        print(f"  {'page':<18}{'reads':>6}{'serial':>11}{'read_all':>11}{'gather':>11}")
+        for page, reads in PAGES.items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                serial_ms = _time(lambda: [read(db_manager) for read in reads.values()], args.repeats)
+                read_all_ms = _time(lambda: async_db.read_all(**reads), args.repeats)
+                gather_ms = _time(lambda: loop.run_until_complete(gather(reads)), args.repeats)
+            print(f"  {page:<18}{len(reads):>6}{serial_ms:>9.2f}ms{read_all_ms:>9.2f}ms{gather_ms:>9.2f}ms")
+
+        loop.close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            close_readers()
+            close_pool(path)
+
+
+if __name__ == "__main__":
+    main()
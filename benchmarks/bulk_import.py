@@ -0,0 +1,83 @@
+"""
+Bulk CSV import against the one-user-at-a-time create_user path.
+
+A CSV of N users is generated with one row in a hundred broken (unknown role, bad date,
+duplicate username, or a username already in the database), then imported into a fresh
+database. The per-user path is timed on a sample and extrapolated.
+
+Usage (from the repository root):
+    python -m benchmarks.bulk_import --users 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from bulk_import import import_users
+from database import DatabaseManager
+
+
+def make_csv(path, users):
+    """Writes `users` generated rows to `path`; every hundredth row has one of four defects."""
+    rows = []
+    for i in range(users):
+        row = {'username': f'user{i}', 'password': f'pw{i}', 'full_name': f'User {i}',
+               'role': 'doctor' if i % 10 == 0 else 'patient', 'id_number': f'ID{i:012d}', 'dob': '1980-05-17',
+               'status': 'pending_approval' if i % 10 == 0 else 'active'}
+        if i % 100 == 99:
+            defect = (i // 100) % 4
+            if defect == 0:
+                row['role'] = 'nurse'
+            elif defect == 1:
+                row['dob'] = '17/05/1980'
+            elif defect == 2:
+                row['username'] = f'user{i - 1}'
+            else:
+                row['username'] = 'existing'
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the bulk user import.")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--sample', type=int, default=2_000, help="Users created one at a time for comparison")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'users.csv')
+        make_csv(csv_path, args.users)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager = DatabaseManager(os.path.join(tmp, 'bulk.db'), use_pool=False)
+            db_manager.create_tables()
+            db_manager.create_user('existing', 'x', 'Existing User', 'patient', 'EXISTING', '1970-01-01')
+        start = time.perf_counter()
+        result = import_users(db_manager, csv_path)
+        bulk_seconds = time.perf_counter() - start
+        print(f"bulk import:  {result['message']} in {bulk_seconds:.2f}s "
+              f"({result['imported'] / bulk_seconds:,.0f} users/s)")
+        for row_number, message in result['errors'][:4]:
+            print(f"  line {row_number}: {message}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            single = DatabaseManager(os.path.join(tmp, 'single.db'), use_pool=False)
+            single.create_tables()
+        frame = pd.read_csv(csv_path, dtype=str, nrows=args.sample)
+        start = time.perf_counter()
+        for row in frame.itertuples():
+            single.create_user(row.username, row.password, row.full_name, row.role, row.id_number, row.dob, row.status)
+        per_user = (time.perf_counter() - start) / len(frame)
+        print(f"create_user:  {1 / per_user:,.0f} users/s on {len(frame)} users, "
+              f"so {per_user * args.users:.1f}s for {args.users:,}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.close()
+            single.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Multi-process contention benchmark for the SQLite storage profiles.
+
+N writer processes log predictions while M reader processes fetch patient histories,
+all against the same database file. Each profile gets a fresh database.
+
+Usage (from the repository root):
+    python -m benchmarks.db_contention --writers 4 --readers 8 --seconds 5
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from configs import DB_STORAGE_PROFILES
+from database import DatabaseManager
+from models import Prediction
+
+PATIENTS = 20
+PREDICTIONS_PER_PATIENT = 50
+
+
+def _prediction(doctor_id, patient_id):
+    return Prediction(
+        doctor_id=doctor_id, patient_id=patient_id, age=60, cancer_stage='II', tumor_size=4.0,
+        tumor_type='Lung', metastasis='No', treatment_type='Surgery', comorbidities='Hypertension',
+        predicted_class='Low Risk', prediction_probability=0.3,
+    )
+
+
+def seed_database(path, profile):
+    """One doctor and PATIENTS patients with PREDICTIONS_PER_PATIENT predictions each."""
+    db_manager = DatabaseManager(path, use_pool=False, profile=profile)
+    db_manager.create_tables()
+    db_manager.create_user('doctor', 'x', 'Doctor', 'doctor', 'D00001', '1975-01-01')
+    doctor_id = db_manager.get_user_for_authentication('doctor')['user_id']
+    patient_ids = []
+    for p in range(PATIENTS):
+        db_manager.create_user(f'patient{p}', 'x', f'Patient {p}', 'patient', f'P{p:05d}', '1960-01-01')
+        patient_ids.append(db_manager.get_user_for_authentication(f'patient{p}')['user_id'])
+    for patient_id in patient_ids:
+        for _ in range(PREDICTIONS_PER_PATIENT):
+            db_manager.log_prediction(_prediction(doctor_id, patient_id))
+    db_manager.close()
+    return doctor_id, patient_ids
+
+
+def _writer(path, profile, doctor_id, patient_ids, start_at, seconds, results):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(path, use_pool=False, profile=profile)
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = time.time() + seconds
+        written = failed = 0
+        i = 0
+        while time.time() < deadline:
+            result = db_manager.log_prediction(_prediction(doctor_id, patient_ids[i % len(patient_ids)]))
+            written += result['success']
+            failed += not result['success']
+            i += 1
+        db_manager.close()
+    results.put(('writer', written, failed, []))
+
+
+def _reader(path, profile, patient_ids, start_at, seconds, results):
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(path, use_pool=False, profile=profile, use_cache=False)
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = time.time() + seconds
+        latencies = []
+        failed = 0
+        i = 0
+        while time.time() < deadline:
+            start = time.perf_counter()
+            try:
+                db_manager.get_history_summary(patient_ids[i % len(patient_ids)])
+                latencies.append((time.perf_counter() - start) * 1e3)
+            except sqlite3.OperationalError:
+                failed += 1
+            i += 1
+        db_manager.close()
+    results.put(('reader', len(latencies), failed, latencies))
+
+
+def run_profile(profile, writers, readers, seconds):
+    """
+    Runs the contention scenario against a fresh database with the given profile.
+
+    Returns:
+        dict: Write throughput, failed operations and reader latency percentiles (ms).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            doctor_id, patient_ids = seed_database(path, profile)
+
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1.0  # let every process connect before the clock starts
+        processes = [
+            multiprocessing.Process(target=_writer, args=(path, profile, doctor_id, patient_ids, start_at, seconds, results))
+            for _ in range(writers)
+        ] + [
+            multiprocessing.Process(target=_reader, args=(path, profile, patient_ids, start_at, seconds, results))
+            for _ in range(readers)
+        ]
+        for p in processes:
+            p.start()
+        outcomes = [results.get() for _ in processes]
+        for p in processes:
+            p.join()
+
+    written = sum(ok for kind, ok, _, _ in outcomes if kind == 'writer')
+    write_failures = sum(failed for kind, _, failed, _ in outcomes if kind == 'writer')
+    reads = sum(ok for kind, ok, _, _ in outcomes if kind == 'reader')
+    read_failures = sum(failed for kind, _, failed, _ in outcomes if kind == 'reader')
+    latencies = np.concatenate([np.asarray(l) for kind, _, _, l in outcomes if kind == 'reader'] + [np.empty(0)])
+    return {
+        'writes_per_sec': written / seconds,
+        'write_failures': write_failures,
+        'reads_per_sec': reads / seconds,
+        'read_failures': read_failures,
+        'read_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'read_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SQLite storage profiles under concurrent writers and readers.")
+    parser.add_argument('--writers', type=int, default=4, help="Writer processes")
+    parser.add_argument('--readers', type=int, default=8, help="Reader processes")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Duration per profile")
+    parser.add_argument('--profiles', nargs='+', default=list(DB_STORAGE_PROFILES), choices=list(DB_STORAGE_PROFILES))
+    args = parser.parse_args(argv)
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile")
+    print(f"  {'profile':<12}{'writes/s':>10}{'w fail':>8}{'reads/s':>10}{'r fail':>8}{'read p50':>11}{'read p99':>11}")
+    for profile in args.profiles:
+        r = run_profile(profile, args.writers, args.readers, args.seconds)
+        print(f"  {profile:<12}{r['writes_per_sec']:>10.0f}{r['write_failures']:>8}{r['reads_per_sec']:>10.0f}"
+              f"{r['read_failures']:>8}{r['read_p50_ms']:>10.2f}ms{r['read_p99_ms']:>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Overhead of the opt-in database instrumentation on typical dashboard calls.
+
+Each call runs `--calls` times on a pooled manager without instrumentation and with it
+(counting, histograms and slow-statement checks; the periodic dump runs on its own
+thread and is left out). Disabled is the uninstrumented baseline itself: no method
+or connection is wrapped, which the benchmark asserts.
+
+Usage (from the repository root):
+    python -m benchmarks.db_metrics --predictions 10000 --calls 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.pagination import seed_database
+from configs import ITEMS_PER_PAGE
+from connection_pool import close_pool
+from database import DatabaseManager
+from db_metrics import InstrumentedConnection, disable_metrics, enable_metrics
+
+
+def calls(db_manager, doctor_id, patient_id):
+    return [
+        ('get_user_fullname', lambda: db_manager.get_user_fullname(doctor_id)),
+        ('get_history_summary page', lambda: db_manager.get_history_summary(patient_id, page_size=ITEMS_PER_PAGE)),
+        ('get_patient_records page', lambda: db_manager.get_patient_records(doctor_id, page_size=ITEMS_PER_PAGE)),
+        ('get_system_totals', db_manager.get_system_totals),
+    ]
+
+
+def _per_call_us(fn, count, repeats=5):
+    """Median over `repeats` runs of the mean time of `count` calls, in microseconds."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        samples.append((time.perf_counter() - start) / count * 1e6)
+    return float(np.median(samples))
+
+
+def _measure(path, doctor_id, patient_id, count):
+    db_manager = DatabaseManager(path, use_cache=False)
+    results = {label: _per_call_us(fn, count) for label, fn in calls(db_manager, doctor_id, patient_id)}
+    close_pool(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the overhead of database instrumentation.")
+    parser.add_argument('--predictions', type=int, default=10_000)
+    parser.add_argument('--calls', type=int, default=2_000, help="Calls per timing run")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            doctor_id = seed_database(path, args.predictions)
+            patient_id = DatabaseManager(path, use_pool=False).get_user_for_authentication('patient')['user_id']
+            original = DatabaseManager.get_user_fullname
+            baseline = _measure(path, doctor_id, patient_id, args.calls)
+            metrics = enable_metrics(DatabaseManager, dump=False)
+            with DatabaseManager(path)._connection() as conn:
+                assert isinstance(conn, InstrumentedConnection)
+            instrumented = _measure(path, doctor_id, patient_id, args.calls)
+            snap = metrics.snapshot()
+            disable_metrics(DatabaseManager)
+            assert DatabaseManager.get_user_fullname is original
+            disabled = _measure(path, doctor_id, patient_id, args.calls)
+
+        print(f"{args.predictions:,} predictions; mean per call (median of 5 runs of {args.calls:,})")
+        print(f"  {'call':<28}{'baseline':>11}{'disabled':>11}{'enabled':>11}{'overhead':>11}")
+        for label, base_us in baseline.items():
+            overhead = instrumented[label] - base_us
+            print(f"  {label:<28}{base_us:>9.1f}us{disabled[label]:>9.1f}us{instrumented[label]:>9.1f}us"
+                  f"{overhead:>+8.1f}us ({overhead / base_us:+.1%})")
+        print(f"\n{len(snap['methods'])} methods and {len(snap['statements'])} statements recorded, "
+              f"{sum(t['calls'] for t in snap['statements'].values()):,} statements run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Per-rerun database overhead with and without the shared connection pool.
+
+Every simulated session reruns the doctor dashboard the way Streamlit does: build a
+DatabaseManager, run the page's queries, and drop the manager again.
+
+Usage (from the repository root):
+    python -m benchmarks.db_pool --sessions 50 --reruns 40
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from connection_pool import close_pool, get_pool
+from database import DatabaseManager
+from models import Prediction
+
+
+def seed_database(path, doctors=10, patients_per_doctor=20, predictions_per_patient=5):
+    """A scratch database with assigned patients and a prediction history for each doctor."""
+    db_manager = DatabaseManager(path, use_pool=False)
+    db_manager.create_tables()
+    doctor_ids = []
+    for d in range(doctors):
+        db_manager.create_user(f'doctor{d}', 'x', f'Doctor {d}', 'doctor', f'D{d:05d}', '1975-01-01')
+        doctor_id = db_manager.get_user_for_authentication(f'doctor{d}')['user_id']
+        doctor_ids.append(doctor_id)
+        for p in range(patients_per_doctor):
+            username = f'patient{d}_{p}'
+            db_manager.create_user(username, 'x', f'Patient {d} {p}', 'patient', f'P{d:03d}{p:03d}', '1960-01-01')
+            patient_id = db_manager.get_user_for_authentication(username)['user_id']
+            db_manager.create_assignment_request(doctor_id, patient_id)
+            for _ in range(predictions_per_patient):
+                db_manager.log_prediction(Prediction(
+                    doctor_id=doctor_id, patient_id=patient_id, age=60, cancer_stage='II', tumor_size=4.0,
+                    tumor_type='Lung', metastasis='No', treatment_type='Surgery', comorbidities='Hypertension',
+                    predicted_class='Low Risk', prediction_probability=0.3,
+                ))
+        for request in db_manager.get_patient_requests(doctor_id):
+            db_manager.approve_patient_request(request.assignment_id)
+    db_manager.close()
+    return doctor_ids
+
+
+def simulate(path, doctor_ids, sessions, reruns, use_pool):
+    """
+    Runs `sessions` threads that each perform `reruns` dashboard reruns.
+
+    Returns:
+        dict: Per-rerun latency percentiles (ms), split into manager setup/teardown and the full rerun.
+    """
+    setup_ms = [[] for _ in range(sessions)]
+    rerun_ms = [[] for _ in range(sessions)]
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(i):
+        doctor_id = doctor_ids[i % len(doctor_ids)]
+        barrier.wait()
+        for _ in range(reruns):
+            start = time.perf_counter()
+            db_manager = DatabaseManager(path, use_pool=use_pool, use_cache=False)
+            created = time.perf_counter()
+            db_manager.get_assigned_patients(doctor_id)
+            db_manager.get_patient_records(doctor_id)
+            queried = time.perf_counter()
+            del db_manager  # end of the script run: the manager is garbage collected
+            end = time.perf_counter()
+            setup_ms[i].append(((created - start) + (end - queried)) * 1e3)
+            rerun_ms[i].append((end - start) * 1e3)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    with contextlib.redirect_stdout(io.StringIO()):  # DatabaseManager prints on every connect/close
+        for t in threads:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+    setup = np.concatenate([np.asarray(s) for s in setup_ms])
+    total = np.concatenate([np.asarray(r) for r in rerun_ms])
+    return {
+        'reruns': len(total),
+        'reruns_per_sec': len(total) / elapsed,
+        'setup_p50_ms': float(np.percentile(setup, 50)),
+        'setup_p99_ms': float(np.percentile(setup, 99)),
+        'rerun_p50_ms': float(np.percentile(total, 50)),
+        'rerun_p99_ms': float(np.percentile(total, 99)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-rerun database overhead with and without pooling.")
+    parser.add_argument('--sessions', type=int, default=50, help="Concurrent sessions (threads)")
+    parser.add_argument('--reruns', type=int, default=40, help="Reruns per session")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            doctor_ids = seed_database(path)
+
+        print(f"{args.sessions} sessions x {args.reruns} reruns")
+        print(f"  {'mode':<10}{'reruns/s':>10}{'setup p50':>12}{'setup p99':>12}{'rerun p50':>12}{'rerun p99':>12}")
+        for use_pool in (False, True):
+            r = simulate(path, doctor_ids, args.sessions, args.reruns, use_pool)
+            mode = 'pooled' if use_pool else 'unpooled'
+            print(f"  {mode:<10}{r['reruns_per_sec']:>10.0f}{r['setup_p50_ms']:>12.3f}{r['setup_p99_ms']:>12.3f}"
+                  f"{r['rerun_p50_ms']:>12.3f}{r['rerun_p99_ms']:>12.3f}")
+
+        stats = get_pool(path).stats()
+        print(f"\nPool: {stats['connections_opened']} connections opened for {stats['checkouts']} checkouts, "
+              f"{stats['waits']} waits (avg {stats['avg_wait_ms']:.2f} ms), {stats['overflow_opened']} overflow")
+        close_pool(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Per-stage latency benchmark for the prediction code path.
+
+Usage (from the repository root):
+    python -m benchmarks.inference_latency                    # run and compare with the stored baseline
+    python -m benchmarks.inference_latency --save-baseline    # run and store the results as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from database import DatabaseManager
+from feature_plan import reconstruct_raw_features
+from models import Prediction
+from utils import (read_model_artifacts, ordinal_encode, one_hot_encode, feature_selection, scale_features,
+                   classify_risk, to_float, SELECTED_FEATURES)
+
+RESULTS_PATH = 'benchmarks/results/inference_latency.json'
+BASELINE_PATH = 'benchmarks/baselines/inference_latency.json'
+
+BATCH_SIZES = [1, 10, 1_000, 100_000]
+# Timed repetitions per batch size, scaled down as batches grow
+REPEATS = {1: 300, 10: 200, 1_000: 30, 100_000: 5}
+# log_prediction writes one row per call, so it is timed per call on at most this many rows per batch
+MAX_LOGGED_ROWS = 200
+
+STAGES = [
+    'dataframe', 'ordinal_encode', 'one_hot_encode', 'feature_selection', 'scale_features',
+    'feature_plan', 'predict_proba', 'to_float', 'log_prediction',
+]
+
+
+def load_replay_rows():
+    """Raw feature rows recovered from the processed train and test sets."""
+    artifacts = read_model_artifacts()
+    frames = [pd.read_csv(f'dataset/processed/{name}.csv') for name in ('X_train_scaled', 'X_test_scaled')]
+    X = pd.concat(frames)[SELECTED_FEATURES].to_numpy()
+    return artifacts, reconstruct_raw_features(X, artifacts['feature_plan'])
+
+
+def _timed(timings, stage, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    timings.setdefault(stage, []).append((time.perf_counter() - start) * 1e3)
+    return result
+
+
+def run_batch(rows, artifacts, db_manager, doctor_id, patient_id, timings):
+    """Pushes one batch through every stage, appending per-stage wall times (ms) to `timings`."""
+    # Reference DataFrame pipeline, stage by stage
+    df = _timed(timings, 'dataframe', pd.DataFrame, rows)
+    df = _timed(timings, 'ordinal_encode', ordinal_encode, df, artifacts['label_encoders'])
+    df = _timed(timings, 'one_hot_encode', one_hot_encode, df, artifacts['ohe'])
+    df = _timed(timings, 'feature_selection', feature_selection, df)
+    _timed(timings, 'scale_features', scale_features, df, artifacts['scaler'])
+
+    # Compiled path used by the pages
+    X = _timed(timings, 'feature_plan', artifacts['feature_plan'].transform, rows)
+    probabilities = _timed(timings, 'predict_proba', artifacts['model'].predict_proba, X)[:, 1]
+    probabilities = _timed(timings, 'to_float', lambda p: [to_float(x) for x in p], probabilities)
+
+    for row, probability in zip(rows[:MAX_LOGGED_ROWS], probabilities):
+        prediction = Prediction(
+            doctor_id=doctor_id, patient_id=patient_id, age=row['Age'], cancer_stage=row['CancerStage'],
+            tumor_size=row['TumorSize'], tumor_type=row['TumorType'], metastasis=row['Metastasis'],
+            treatment_type=row['TreatmentType'], comorbidities=row['Comorbidities'],
+            predicted_class=classify_risk(probability), prediction_probability=probability,
+        )
+        _timed(timings, 'log_prediction', db_manager.log_prediction, prediction)
+
+
+def _benchmark_database(path):
+    """A scratch database with one doctor and one patient to log predictions against."""
+    db_manager = DatabaseManager(path)
+    db_manager.create_tables()
+    db_manager.create_user('bench_doctor', 'x', 'Bench Doctor', 'doctor', 'BENCH-D', '1980-01-01')
+    db_manager.create_user('bench_patient', 'x', 'Bench Patient', 'patient', 'BENCH-P', '1980-01-01')
+    ids = [db_manager.get_user_for_authentication(name)['user_id'] for name in ('bench_doctor', 'bench_patient')]
+    return db_manager, ids
+
+
+def run_benchmark(batch_sizes=BATCH_SIZES, repeat_scale=1.0):
+    """
+    Replays dataset rows through every stage at each batch size.
+
+    Returns:
+        dict: {batch_size: {stage: {"p50", "p95", "p99", "samples"}}} in milliseconds.
+    """
+    artifacts, replay = load_replay_rows()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_manager, (doctor_id, patient_id) = _benchmark_database(os.path.join(tmp, 'bench.db'))
+        for batch_size in batch_sizes:
+            repeats = max(1, int(REPEATS.get(batch_size, 10) * repeat_scale))
+            rows = [replay[i % len(replay)] for i in range(batch_size)]
+            run_batch(rows, artifacts, db_manager, doctor_id, patient_id, {})  # warm up
+            timings = {}
+            for _ in range(repeats):
+                run_batch(rows, artifacts, db_manager, doctor_id, patient_id, timings)
+            results[str(batch_size)] = {
+                stage: {
+                    'p50': float(np.percentile(timings[stage], 50)),
+                    'p95': float(np.percentile(timings[stage], 95)),
+                    'p99': float(np.percentile(timings[stage], 99)),
+                    'samples': len(timings[stage]),
+                }
+                for stage in STAGES
+            }
+        db_manager.close()
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance, min_delta_ms):
+    """Returns the list of (batch_size, stage, baseline_p50, current_p50) that regressed."""
+    regressions = []
+    for batch_size, stages in baseline['results'].items():
+        for stage, expected in stages.items():
+            current = results.get(batch_size, {}).get(stage)
+            if current is None:
+                continue
+            if current['p50'] > expected['p50'] * (1 + tolerance) and current['p50'] - expected['p50'] > min_delta_ms:
+                regressions.append((batch_size, stage, expected['p50'], current['p50']))
+    return regressions
+
+
+def print_report(results):
+    for batch_size, stages in results.items():
+        print(f"\nBatch size {batch_size}")
+        print(f"  {'stage':<20}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+        for stage, r in stages.items():
+            print(f"  {stage:<20}{r['p50']:>12.3f}{r['p95']:>12.3f}{r['p99']:>12.3f}")
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage inference latency benchmark.")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--repeat-scale', type=float, default=1.0, help="Multiply the number of timed repetitions")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative p50 slowdown (default: 25%%)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.batch_sizes, args.repeat_scale)
+    payload = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    print_report(results)
+    _write_json(args.output, payload)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, payload)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nMISSING BASELINE: {args.baseline} does not exist; run with --save-baseline to create one.")
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}:")
+        for batch_size, stage, expected, current in regressions:
+            print(f"  batch {batch_size:>7} {stage:<20} {expected:.3f} ms -> {current:.3f} ms")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Name search latency: the LIKE '%term%' scans the searches used to run, against the
+full-text name indexes they are answered from now.
+
+Users get Chinese names, either in characters or in pinyin. Each search is timed as the
+dashboards run it, for the first page, with terms of different lengths and frequencies,
+including one- and two-character given names. Every term must return exactly what LIKE returned.
+
+Usage (from the repository root):
+    python -m benchmarks.name_search --users 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from configs import ITEMS_PER_PAGE, UserRole
+from database import DatabaseManager
+from models import User
+
+SURNAMES = ['王', '李', '张', '刘', '陈', '杨', '黄', '赵', '吴', '周', '徐', '孙', '马', '朱', '胡', '郭', '何', '林', '罗', '高']
+SURNAMES_PINYIN = ['Wang', 'Li', 'Zhang', 'Liu', 'Chen', 'Yang', 'Huang', 'Zhao', 'Wu', 'Zhou',
+                   'Xu', 'Sun', 'Ma', 'Zhu', 'Hu', 'Guo', 'He', 'Lin', 'Luo', 'Gao']
+GIVEN = list('伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰飞鹏辉')
+GIVEN_PINYIN = ['Wei', 'Fang', 'Na', 'Min', 'Jing', 'Li', 'Qiang', 'Lei', 'Jun', 'Yang', 'Yong', 'Yan', 'Jie', 'Juan',
+                'Tao', 'Ming', 'Chao', 'Xiu', 'Xia', 'Ping', 'Gang', 'Gui', 'Ying', 'Hua', 'Yu', 'Lan', 'Fei', 'Peng', 'Hui']
+
+# (label, search term) for full-name searches. Only pinyin names have a username made from the
+# name, so for usernames the CJK terms measure searches that find nothing
+TERMS = [
+    ('CJK, given name', '明'),
+    ('CJK, 2-char given', '伟明'),
+    ('CJK, 2 chars', '张伟'),
+    ('CJK, 3 chars', '张伟明'),
+    ('pinyin, 2 chars', 'Zh'),
+    ('pinyin, inside', 'ei'),
+    ('pinyin, common', 'Wang'),
+    ('pinyin, long', 'Zhang Wei'),
+    ('no match', 'Smith'),
+]
+
+LIKE_SEARCH_BY_USERNAME = """
+    SELECT user_id, username, full_name, id_number, role, status, dob
+    FROM users WHERE username LIKE ? {seek}
+    ORDER BY user_id
+"""
+LIKE_SEARCH_DOCTORS = """
+    SELECT user_id, username, full_name, id_number, role, status, dob
+    FROM users WHERE role = ? AND full_name LIKE ? {seek}
+    ORDER BY user_id
+"""
+
+
+def _name(rng, i):
+    surname = int(rng.integers(len(SURNAMES)))
+    given = rng.integers(len(GIVEN), size=int(rng.integers(1, 3)))
+    if i % 2:
+        return SURNAMES[surname] + ''.join(GIVEN[g] for g in given)
+    return SURNAMES_PINYIN[surname] + ' ' + ''.join(GIVEN_PINYIN[g] for g in given)
+
+
+def seed_database(path, users, seed=0):
+    """`users` users with generated names, one in five of them doctors; the name indexes fill through their triggers."""
+    rng = np.random.default_rng(seed)
+    db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+    db_manager.create_tables()
+    conn = db_manager.conn
+    rows = []
+    for i in range(users):
+        name = _name(rng, i)
+        role = UserRole.DOCTOR.value if i % 5 == 0 else UserRole.PATIENT.value
+        username = f"{name.split(' ')[0].lower() if i % 2 == 0 else 'user'}{i}"
+        rows.append((username, 'x', name, role, 'active', f'ID{i:016d}', '1970-01-01'))
+        if len(rows) == 50_000 or i == users - 1:
+            conn.executemany(
+                "INSERT INTO users (username, password_hash, full_name, role, status, id_number, dob) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+            rows = []
+    return db_manager
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples)), result
+
+
+def _ids(page):
+    return [user.user_id for user in page.items], page.total
+
+
+def run(users, repeats):
+    """Times every search term with LIKE and with the name indexes, and counts result mismatches."""
+    with tempfile.TemporaryDirectory() as tmp:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager = seed_database(os.path.join(tmp, 'bench.db'), users)
+
+        results = []
+        searches = [
+            ('doctors', lambda t: db_manager.search_available_by_doctor_name(t, page_size=ITEMS_PER_PAGE),
+             lambda t: db_manager._select(LIKE_SEARCH_DOCTORS, (UserRole.DOCTOR.value, f'%{t}%'), User, ['user_id'],
+                                          page_size=ITEMS_PER_PAGE)),
+            ('usernames', lambda t: db_manager.search_by_username(t.lower().replace(' ', ''), page_size=ITEMS_PER_PAGE),
+             lambda t: db_manager._select(LIKE_SEARCH_BY_USERNAME, (f"%{t.lower().replace(' ', '')}%",), User,
+                                          ['user_id'], page_size=ITEMS_PER_PAGE)),
+        ]
+        for search, indexed, like in searches:
+            for label, term in TERMS:
+                like_ms, like_page = _time(lambda: like(term), repeats)
+                fts_ms, fts_page = _time(lambda: indexed(term), repeats)
+                mismatch = _ids(like_page) != _ids(fts_page)
+                results.append((search, label, term, like_ms, fts_ms, fts_page.total, fts_page.total_is_exact, mismatch))
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark name searches with LIKE scans against the full-text indexes.")
+    parser.add_argument('--users', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for users in args.users:
+        print(f"{users:,} users, first page of {ITEMS_PER_PAGE} (median of {args.repeats})")
+        print(f"  {'search':<11}{'term':<18}{'LIKE':>11}{'indexed':>11}{'matches':>9}")
+        mismatches = 0
+        for search, label, term, like_ms, fts_ms, total, exact, mismatch in run(users, args.repeats):
+            mismatches += mismatch
+            print(f"  {search:<11}{label:<18}{like_ms:>9.2f}ms{fts_ms:>9.2f}ms{total:>8}{'' if exact else '+'}"
+                  + ("  MISMATCH" if mismatch else ""))
+        print(f"  {mismatches} result mismatches\n")
+
+
+if __name__ == "__main__":
+    main()
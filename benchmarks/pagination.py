@@ -0,0 +1,90 @@
+"""
+Page-load latency of a doctor's prediction list: the full fetch the dashboards used to
+slice in Python, against keyset pages at increasing depth.
+
+Usage (from the repository root):
+    python -m benchmarks.pagination --predictions 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from configs import ITEMS_PER_PAGE
+from database import DatabaseManager
+
+
+def seed_database(path, predictions):
+    """One doctor, one patient and `predictions` predictions, one second apart."""
+    db_manager = DatabaseManager(path, use_pool=False)
+    db_manager.create_tables()
+    db_manager.create_user('doctor', 'x', 'Doctor', 'doctor', 'D00001', '1975-01-01')
+    db_manager.create_user('patient', 'x', 'Patient', 'patient', 'P00001', '1960-01-01')
+    doctor_id = db_manager.get_user_for_authentication('doctor')['user_id']
+    patient_id = db_manager.get_user_for_authentication('patient')['user_id']
+    conn = db_manager.conn
+    conn.executemany(
+        """
+        INSERT INTO predictions (doctor_id, patient_id, age, cancer_stage, tumor_size, tumor_type, metastasis,
+                                 treatment_type, comorbidities, predicted_class, prediction_probability,
+                                 prediction_timestamp)
+        VALUES (?, ?, 60, 'II', 4.0, 'Lung', 'No', 'Surgery', 'Hypertension', 'Low Risk', 0.3,
+                datetime('2020-01-01', '+' || ? || ' seconds'))
+        """,
+        ((doctor_id, patient_id, i) for i in range(predictions)),
+    )
+    conn.commit()
+    db_manager.close()
+    return doctor_id
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark keyset pagination against full fetches.")
+    parser.add_argument('--predictions', type=int, default=1_000_000, help="Predictions logged by the doctor")
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 10, 100, 1000], help="Page numbers to time")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            doctor_id = seed_database(path, args.predictions)
+            db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+
+        print(f"{args.predictions:,} predictions, {ITEMS_PER_PAGE} per page (median of {args.repeats})")
+        full_ms = _time(lambda: db_manager.get_patient_records(doctor_id), max(1, args.repeats // 2))
+        print(f"  {'full fetch + slice':<22}{full_ms:>10.2f} ms")
+
+        # Walk forward once to record each depth's cursor, as the cursor stack in session state does
+        cursors = {1: None}
+        page, number = db_manager.get_patient_records(doctor_id, page_size=ITEMS_PER_PAGE), 1
+        while number < max(args.depths) and page.next_cursor is not None:
+            number += 1
+            cursors[number] = page.next_cursor
+            page = db_manager.get_patient_records(doctor_id, cursor=page.next_cursor, page_size=ITEMS_PER_PAGE)
+
+        for depth in args.depths:
+            if depth not in cursors:
+                continue
+            ms = _time(lambda: db_manager.get_patient_records(doctor_id, cursor=cursors[depth],
+                                                              page_size=ITEMS_PER_PAGE), args.repeats)
+            print(f"  {f'keyset page {depth}':<22}{ms:>10.2f} ms")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Prediction inserts per second in each write mode, with concurrent writers.
+
+Every writer thread logs `--writes` predictions through DatabaseManager.log_prediction,
+the way doctor sessions and batch scoring do. Async mode is timed up to the final flush,
+so its rate counts committed rows, not just queued ones.
+
+Usage (from the repository root):
+    python -m benchmarks.prediction_writer --threads 1 8 32 --writes 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from configs import DB_STORAGE_PROFILES, PREDICTION_WRITE_MODES
+from connection_pool import close_pool
+from database import DatabaseManager
+from models import Prediction
+from prediction_writer import close_writers, get_writer
+
+
+def seed_database(path):
+    """One doctor and one patient."""
+    db_manager = DatabaseManager(path, use_pool=False)
+    db_manager.create_tables()
+    db_manager.create_user('doctor', 'x', 'Doctor', 'doctor', 'D00001', '1975-01-01')
+    db_manager.create_user('patient', 'x', 'Patient', 'patient', 'P00001', '1960-01-01')
+    doctor_id = db_manager.get_user_for_authentication('doctor')['user_id']
+    patient_id = db_manager.get_user_for_authentication('patient')['user_id']
+    db_manager.close()
+    return doctor_id, patient_id
+
+
+def simulate(path, profile, mode, threads, writes, doctor_id, patient_id):
+    """
+    Runs `threads` writers logging `writes` predictions each.
+
+    Returns:
+        dict: Inserts per second, per-call latency percentiles (ms) and the writer's average batch.
+    """
+    prediction = Prediction(
+        doctor_id=doctor_id, patient_id=patient_id, age=60, cancer_stage='II', tumor_size=4.0,
+        tumor_type='Lung', metastasis='No', treatment_type='Surgery', comorbidities='Hypertension',
+        predicted_class='Low Risk', prediction_probability=0.3,
+    )
+    latencies = [[] for _ in range(threads)]
+    failures = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def writer(i):
+        db_manager = DatabaseManager(path, profile=profile, use_cache=False, write_mode=mode)
+        barrier.wait()
+        for _ in range(writes):
+            start = time.perf_counter()
+            result = db_manager.log_prediction(prediction)
+            latencies[i].append((time.perf_counter() - start) * 1e3)
+            failures[i] += not result['success']
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    avg_batch = 1.0
+    if mode != 'sync':
+        shared = get_writer(path, mode, profile)
+        shared.flush()
+        avg_batch = shared.stats()['avg_batch']
+    elapsed = time.perf_counter() - start
+    close_writers()
+    latencies = np.concatenate(latencies)
+    return {
+        'inserts_per_sec': (len(latencies) - sum(failures)) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'avg_batch': avg_batch,
+        'failures': sum(failures),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prediction inserts in each write mode.")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--writes', type=int, default=500, help="Predictions logged per thread")
+    parser.add_argument('--profiles', nargs='+', default=list(DB_STORAGE_PROFILES), choices=list(DB_STORAGE_PROFILES))
+    parser.add_argument('--modes', nargs='+', default=PREDICTION_WRITE_MODES, choices=PREDICTION_WRITE_MODES)
+    args = parser.parse_args(argv)
+
+    for profile in args.profiles:
+        print(f"profile {profile}, {args.writes} predictions per thread")
+        print(f"  {'threads':<9}{'mode':<8}{'inserts/s':>11}{'p50':>11}{'p99':>11}{'avg batch':>11}")
+        for threads in args.threads:
+            for mode in args.modes:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, 'bench.db')
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        doctor_id, patient_id = seed_database(path)
+                        r = simulate(path, profile, mode, threads, args.writes, doctor_id, patient_id)
+                        close_pool(path, profile)
+                failed = f"  ({r['failures']} failed)" if r['failures'] else ""
+                print(f"  {threads:<9}{mode:<8}{r['inserts_per_sec']:>11,.0f}{r['p50_ms']:>9.3f}ms"
+                      f"{r['p99_ms']:>9.3f}ms{r['avg_batch']:>11.1f}{failed}")
+
+
+if __name__ == "__main__":
+    main()
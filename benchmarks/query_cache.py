@@ -0,0 +1,91 @@
+"""
+Doctor dashboard reruns with and without the query cache, at several write rates.
+
+Every rerun builds a pooled DatabaseManager and runs the My Dashboard and Patient Requests
+queries for one of the doctors. Every `--write-every` reruns a prediction is logged,
+which invalidates the cached predictions reads of all doctors.
+
+Usage (from the repository root):
+    python -m benchmarks.query_cache --reruns 5000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.db_pool import seed_database
+from configs import ITEMS_PER_PAGE
+from connection_pool import close_pool
+from database import DatabaseManager
+from models import Prediction
+from query_cache import get_cache
+
+
+def simulate(path, doctor_ids, reruns, write_every, use_cache):
+    """
+    Runs `reruns` dashboard reruns, cycling through the doctors.
+
+    Returns:
+        dict: Rerun latency percentiles (ms) and the cache hit rate.
+    """
+    cache = get_cache(path)
+    cache.clear()
+    hits, lookups = cache.hits, cache.hits + cache.misses
+    latencies = []
+    for i in range(reruns):
+        doctor_id = doctor_ids[i % len(doctor_ids)]
+        start = time.perf_counter()
+        db_manager = DatabaseManager(path, use_cache=use_cache)
+        db_manager.get_user_fullname(doctor_id)
+        db_manager.get_assigned_patients(doctor_id)
+        db_manager.get_patient_records(doctor_id, page_size=ITEMS_PER_PAGE)
+        db_manager.get_patient_requests(doctor_id, page_size=ITEMS_PER_PAGE)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        if write_every and i % write_every == write_every - 1:
+            patient_id = db_manager.get_assigned_patients(doctor_id)[0].user_id
+            db_manager.log_prediction(Prediction(
+                doctor_id=doctor_id, patient_id=patient_id, age=60, cancer_stage='II', tumor_size=4.0,
+                tumor_type='Lung', metastasis='No', treatment_type='Surgery', comorbidities='Hypertension',
+                predicted_class='Low Risk', prediction_probability=0.3,
+            ))
+    latencies = np.asarray(latencies)
+    lookups = cache.hits + cache.misses - lookups
+    return {
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'reruns_per_sec': len(latencies) / (latencies.sum() / 1e3),
+        'hit_rate': (cache.hits - hits) / lookups if lookups else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dashboard reruns with and without the query cache.")
+    parser.add_argument('--reruns', type=int, default=5000)
+    parser.add_argument('--write-every', type=int, nargs='+', default=[0, 100, 10, 1],
+                        help="Log a prediction every N reruns (0: never)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            doctor_ids = seed_database(path)
+
+        print(f"{args.reruns} reruns over {len(doctor_ids)} doctors")
+        print(f"  {'writes':<16}{'mode':<10}{'reruns/s':>10}{'p50':>10}{'p99':>10}{'hit rate':>10}")
+        for write_every in args.write_every:
+            label = f"every {write_every}" if write_every else "none"
+            for use_cache in (False, True):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    r = simulate(path, doctor_ids, args.reruns, write_every, use_cache)
+                mode = 'cached' if use_cache else 'uncached'
+                hit_rate = f"{r['hit_rate']:.1%}" if use_cache else "-"
+                print(f"  {label:<16}{mode:<10}{r['reruns_per_sec']:>10.0f}{r['p50_ms']:>8.3f}ms{r['p99_ms']:>8.3f}ms{hit_rate:>10}")
+        close_pool(path)
+
+
+if __name__ == "__main__":
+    main()
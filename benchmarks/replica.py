@@ -0,0 +1,118 @@
+"""
+Online snapshot throughput, and what a snapshot running in the background costs live writes.
+
+Throughput is the time to copy an idle database at several backup step sizes ("all" is one
+step). Writer impact is the latency of sync-mode log_prediction calls, issued by one thread
+every `--write-interval` seconds, while nothing else runs, during an incremental snapshot with
+the configured step size and pause, and during a one-step copy. Under the default profile
+(rollback journal) writes landing between steps restart the copy, so the restarts and the
+one-step fallback are reported; under the production profile (WAL) the copy reads one
+pinned snapshot.
+
+Usage (from the repository root):
+    python -m benchmarks.replica --predictions 200000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.summary_tables import seed_database
+from configs import DB_SNAPSHOT_PAGES_PER_STEP, DB_SNAPSHOT_STEP_PAUSE, DB_STORAGE_PROFILES
+from connection_pool import close_pool, connect
+from database import DatabaseManager
+from models import Prediction
+from replica import snapshot
+
+PREDICTION = Prediction(
+    doctor_id=1, patient_id=60, age=60, cancer_stage='II', tumor_size=4.0, tumor_type='Lung', metastasis='No',
+    treatment_type='Surgery', comorbidities='Hypertension', predicted_class='Low Risk', prediction_probability=0.3,
+)
+
+
+def writes_during(path, profile, action, interval):
+    """
+    Runs `action()` while a thread logs a prediction every `interval` seconds.
+
+    Returns:
+        (action's result, write latencies in ms, failed writes)
+    """
+    db_manager = DatabaseManager(path, profile=profile, use_cache=False)
+    latencies, failures = [], [0]
+    stop = threading.Event()
+
+    def writer():
+        # A writer that never pauses would starve every reader under a rollback journal
+        while not stop.wait(interval):
+            start = time.perf_counter()
+            result = db_manager.log_prediction(PREDICTION)
+            latencies.append((time.perf_counter() - start) * 1e3)
+            failures[0] += not result['success']
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.2)  # let the writer settle in
+    del latencies[:]
+    try:
+        result = action()
+    finally:
+        stop.set()
+        thread.join()
+    close_pool(path, profile)
+    return result, np.array(latencies), failures[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark online snapshots of the database.")
+    parser.add_argument('--predictions', type=int, default=200_000)
+    parser.add_argument('--steps', type=int, nargs='+', default=[64, 256, 1024, -1], help="Pages per step; -1 copies all at once")
+    parser.add_argument('--write-interval', type=float, default=0.01, help="Seconds between logged predictions")
+    parser.add_argument('--profiles', nargs='+', default=list(DB_STORAGE_PROFILES), choices=list(DB_STORAGE_PROFILES))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        out = os.path.join(tmp, 'bench.replica.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_database(path, args.predictions)
+
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"{args.predictions:,} predictions, {size_mb:,.1f} MB")
+        print("idle database, no pause between steps")
+        print(f"  {'pages/step':>10}{'steps':>8}{'seconds':>10}{'MB/s':>9}")
+        for pages in args.steps:
+            stats = snapshot(path, out, pages=pages, pause=0)
+            print(f"  {'all' if pages < 0 else pages:>10}{stats['steps']:>8}{stats['seconds']:>10.2f}"
+                  f"{stats['bytes'] / 2**20 / stats['seconds']:>9,.0f}")
+
+        for profile in args.profiles:
+            conn = connect(path, profile)  # applies the profile's journal mode to the file
+            conn.close()
+            print(f"\nprofile {profile}: writes during each phase "
+                  f"({DB_SNAPSHOT_PAGES_PER_STEP} pages/step, {DB_SNAPSHOT_STEP_PAUSE * 1e3:g} ms pause)")
+            print(f"  {'phase':<14}{'writes':>8}{'p50':>10}{'p99':>10}{'max':>10}{'failed':>8}"
+                  f"{'copy':>9}{'restarts':>10}")
+            phases = [
+                ('idle', lambda: time.sleep(1.0)),
+                ('incremental', lambda: snapshot(path, out, profile)),
+                ('one step', lambda: snapshot(path, out, profile, pages=-1)),
+            ]
+            for label, action in phases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stats, latencies, failed = writes_during(path, profile, action, args.write_interval)
+                copy = restarts = ""
+                if stats:
+                    copy = f"{stats['seconds']:.2f}s"
+                    restarts = f"{stats['restarts']}" + (" +1step" if stats['fallback'] else "")
+                print(f"  {label:<14}{len(latencies):>8,}{np.percentile(latencies, 50):>8.2f}ms"
+                      f"{np.percentile(latencies, 99):>8.2f}ms{latencies.max():>8.1f}ms{failed:>8}"
+                      f"{copy:>9}{restarts:>10}")
+
+
+if __name__ == "__main__":
+    main()
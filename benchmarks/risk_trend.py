@@ -0,0 +1,78 @@
+"""
+Building a patient's risk-trend chart data: the old path through Prediction objects
+against the columnar get_risk_trend and its chunked stream.
+
+The old path fetches the full history as Prediction objects, builds a DataFrame from
+them, converts and sorts the timestamps, and keeps one column. Memory is the peak traced
+allocation (tracemalloc) while building, traced in a separate call; the stream keeps
+only one chunk at a time.
+
+Usage (from the repository root):
+    python -m benchmarks.risk_trend --predictions 1000 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.pagination import seed_database
+from configs import FRAME_CHUNK_SIZE
+from database import DatabaseManager
+
+
+def old_chart_data(db_manager, patient_id):
+    chart_data = pd.DataFrame(db_manager.get_history_by_patient_id(patient_id))
+    chart_data['prediction_timestamp'] = pd.to_datetime(chart_data['prediction_timestamp'])
+    chart_data = chart_data.sort_values(by='prediction_timestamp')
+    chart_data.set_index('prediction_timestamp', inplace=True)
+    return chart_data[['prediction_probability']]
+
+
+def streamed_max(db_manager, patient_id):
+    """An aggregate over the stream that never holds more than one chunk."""
+    return max(frame['prediction_probability'].max() for frame in db_manager.iter_risk_trend(patient_id))
+
+
+def _measure(fn):
+    """Returns (seconds, peak MB) of one call; memory is traced in a second call, as tracing slows Python code down."""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the columnar risk-trend query.")
+    parser.add_argument('--predictions', type=int, nargs='+', default=[1_000, 100_000],
+                        help="History lengths of the charted patient")
+    args = parser.parse_args(argv)
+
+    print(f"chunks of {FRAME_CHUNK_SIZE:,} rows; time (peak traced memory)")
+    print(f"  {'history':>10}{'objects':>22}{'get_risk_trend':>22}{'iter_risk_trend':>22}")
+    for predictions in args.predictions:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            with contextlib.redirect_stdout(io.StringIO()):
+                seed_database(path, predictions)
+                db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+            patient_id = db_manager.get_user_for_authentication('patient')['user_id']
+            cells = []
+            for fn in (old_chart_data, DatabaseManager.get_risk_trend, streamed_max):
+                seconds, peak_mb = _measure(lambda: fn(db_manager, patient_id))
+                cells.append(f"{seconds * 1e3:,.0f}ms ({peak_mb:,.1f}MB)")
+            print(f"  {predictions:>10,}" + "".join(f"{cell:>22}" for cell in cells))
+            with contextlib.redirect_stdout(io.StringIO()):
+                db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Memory and construction time of prediction rows read from the database.
+
+Reads `--predictions` rows with get_predictions_after as Prediction objects, with and
+without reading their (lazily parsed) timestamps, and in columnar mode. Memory is the
+traced allocation of the result (a tracemalloc snapshot); times are the median of
+`--repeats` reads.
+
+Usage (from the repository root):
+    python -m benchmarks.row_models --predictions 100000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.pagination import seed_database
+from database import DatabaseManager
+
+
+def _measure(fn, repeats):
+    """Returns (median seconds, bytes held by the result)."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return float(np.median(samples)), held
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prediction row construction and memory.")
+    parser.add_argument('--predictions', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed_database(path, args.predictions)
+            db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+
+        def read_and_touch_dates():
+            predictions = db_manager.get_predictions_after(0)
+            for p in predictions:
+                p.prediction_timestamp
+            return predictions
+
+        cases = [
+            ('objects', lambda: db_manager.get_predictions_after(0)),
+            ('objects, dates read', read_and_touch_dates),
+            ('columnar', lambda: db_manager.get_predictions_after(0, columnar=True)),
+        ]
+
+        print(f"{args.predictions:,} predictions (median of {args.repeats})")
+        print(f"  {'result':<22}{'read':>10}{'memory':>12}{'per row':>10}")
+        for label, fn in cases:
+            seconds, held = _measure(fn, args.repeats)
+            print(f"  {label:<22}{seconds * 1e3:>8.0f}ms{held / 2**20:>10.1f}MB{held / args.predictions:>9.0f}B")
+        with contextlib.redirect_stdout(io.StringIO()):
+            db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
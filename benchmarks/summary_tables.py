@@ -0,0 +1,120 @@
+"""
+System Overview load time from the summary tables against aggregating the raw tables,
+and what keeping the summaries costs on writes.
+
+For each history size, 50 doctors and 5,000 patients share `predictions` predictions. The
+overview reads the system totals, a page of doctor summaries and a page of high-risk
+patients; the raw equivalent runs the summary definitions' GROUP BY queries instead.
+Write cost is the time to insert the predictions with and without the summary triggers.
+
+Usage (from the repository root):
+    python -m benchmarks.summary_tables --predictions 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from configs import ITEMS_PER_PAGE
+from database import DatabaseManager
+from summary_tables import LATEST_PREDICTIONS, SUMMARY_TABLES, check_summaries
+
+DOCTORS = 50
+PATIENTS = 5_000
+
+
+def seed_database(path, predictions, summaries=True, seconds_apart=1):
+    """Logs the predictions `seconds_apart` seconds apart from 2020-01-01; returns the seconds spent inserting them."""
+    db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+    db_manager.create_tables()
+    conn = db_manager.conn
+    if not summaries:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_summary_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+    conn.executemany(
+        "INSERT INTO users (username, password_hash, full_name, role, status, id_number) VALUES (?, 'x', ?, ?, 'active', ?)",
+        [(f'doctor{i}', f'Doctor {i}', 'doctor', f'D{i:08d}') for i in range(DOCTORS)]
+        + [(f'patient{i}', f'Patient {i}', 'patient', f'P{i:08d}') for i in range(PATIENTS)],
+    )
+    conn.executemany("INSERT INTO doctor_patient_assignments (doctor_id, patient_id, status) VALUES (?, ?, 'active')",
+                     [(1 + i % DOCTORS, 1 + DOCTORS + i) for i in range(PATIENTS)])
+    conn.commit()
+    rng = np.random.default_rng(0)
+    probabilities = rng.random(predictions)
+    classes = np.where(probabilities >= 0.6, 'High Risk', np.where(probabilities < 0.4, 'Low Risk', 'Medium Risk'))
+    rows = ((1 + i % DOCTORS, 1 + DOCTORS + i % PATIENTS, str(classes[i]), float(probabilities[i]), i * seconds_apart)
+            for i in range(predictions))
+    start = time.perf_counter()
+    conn.executemany(
+        """
+        INSERT INTO predictions (doctor_id, patient_id, age, cancer_stage, tumor_size, tumor_type, metastasis,
+                                 treatment_type, comorbidities, predicted_class, prediction_probability,
+                                 prediction_timestamp)
+        VALUES (?, ?, 60, 'II', 4.0, 'Lung', 'No', 'Surgery', 'Hypertension', ?, ?,
+                datetime('2020-01-01', '+' || ? || ' seconds'))
+        """,
+        rows,
+    )
+    conn.commit()
+    seconds = time.perf_counter() - start
+    db_manager.close()
+    return seconds
+
+
+def overview(db_manager):
+    db_manager.get_system_totals()
+    db_manager.get_doctor_summaries(page_size=ITEMS_PER_PAGE)
+    db_manager.get_latest_predictions('High Risk', page_size=ITEMS_PER_PAGE)
+
+
+def raw_overview(conn):
+    queries = {table: query for table, _, _, query in SUMMARY_TABLES}
+    conn.execute(queries['system_totals']).fetchall()
+    conn.execute(queries['doctor_risk_counts']).fetchall()
+    conn.execute(queries['doctor_assignment_counts']).fetchall()
+    conn.execute(f"SELECT * FROM ({LATEST_PREDICTIONS}) WHERE predicted_class = 'High Risk' "
+                 f"ORDER BY patient_id LIMIT {ITEMS_PER_PAGE}").fetchall()
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return float(np.median(samples))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the System Overview summary tables.")
+    parser.add_argument('--predictions', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{DOCTORS} doctors, {PATIENTS:,} patients (median of {args.repeats})")
+    print(f"  {'predictions':>12}{'summaries':>12}{'raw':>12}{'insert/s':>12}{'no triggers':>13}{'check':>10}")
+    for predictions in args.predictions:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            with contextlib.redirect_stdout(io.StringIO()):
+                bare_seconds = seed_database(os.path.join(tmp, 'bare.db'), predictions, summaries=False)
+                seconds = seed_database(path, predictions)
+                db_manager = DatabaseManager(path, use_pool=False, use_cache=False)
+            summary_ms = _time(lambda: overview(db_manager), args.repeats)
+            raw_ms = _time(lambda: raw_overview(db_manager.conn), max(1, args.repeats // 2))
+            start = time.perf_counter()
+            report = check_summaries(db_manager.conn)
+            check_seconds = time.perf_counter() - start
+            assert not any(missing or extra for missing, extra in report.values())
+            print(f"  {predictions:>12,}{summary_ms:>10.2f}ms{raw_ms:>10.0f}ms{predictions / seconds:>12,.0f}"
+                  f"{predictions / bare_seconds:>13,.0f}{check_seconds:>9.1f}s")
+            with contextlib.redirect_stdout(io.StringIO()):
+                db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
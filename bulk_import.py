@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import time
+
+import pandas as pd
+
+from configs import DB_PATH, BULK_IMPORT_COLUMNS, BULK_IMPORT_FIELD_LENGTHS, UserRole, UserStatus
+from database import DatabaseManager
+
+# Account statuses the users table accepts (its CHECK constraint)
+USER_STATUSES = [UserStatus.ACTIVE.value, UserStatus.PENDING_APPROVAL.value]
+USER_ROLES = [r.value for r in UserRole]
+
+
+def read_users_csv(source):
+    """Reads a user CSV (a path or an uploaded file) with every column as text, so IDs keep their leading zeros."""
+    return pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+
+
+def validate_users(frame):
+    """
+    Checks every row of a user import against the users table's constraints, column by column.
+
+    Rows are numbered as CSV lines (the header is line 1). Usernames and ID numbers already
+    taken in the database are checked by DatabaseManager.bulk_create_users, inside its transaction.
+
+    Returns:
+        tuple: (DataFrame of the valid rows with a `row_number` column and a normalized `dob`,
+                list of (row_number, message) for the rejected ones).
+    """
+    missing = [column for column in BULK_IMPORT_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    frame = frame.copy()
+    frame['row_number'] = frame.index + 2
+    for column in BULK_IMPORT_COLUMNS + ['status']:
+        frame[column] = frame[column].astype(str).str.strip() if column in frame.columns else ''
+    frame['status'] = frame['status'].where(frame['status'] != '', UserStatus.ACTIVE.value)
+    dob = pd.to_datetime(frame['dob'], format='%Y-%m-%d', errors='coerce')
+
+    checks = [(frame[column] == '', f"{column} is required") for column in BULK_IMPORT_COLUMNS if column != 'dob']
+    checks += [(frame[column].str.len() > length, f"{column} is longer than {length} characters")
+               for column, length in BULK_IMPORT_FIELD_LENGTHS.items()]
+    checks += [
+        (~frame['role'].isin(USER_ROLES), f"role must be one of {', '.join(USER_ROLES)}"),
+        (~frame['status'].isin(USER_STATUSES), f"status must be one of {', '.join(USER_STATUSES)}"),
+        ((frame['dob'] != '') & dob.isna(), "dob must be a YYYY-MM-DD date"),
+        (frame['username'].duplicated(), "username repeats an earlier row"),
+        (frame['id_number'].duplicated(), "id_number repeats an earlier row"),
+    ]
+
+    messages = pd.Series('', index=frame.index)
+    for mask, message in checks:
+        messages = messages.where(~mask, messages + '; ' + message)
+    messages = messages.str.removeprefix('; ')
+    invalid = messages != ''
+
+    valid = frame[~invalid].copy()
+    valid['dob'] = dob[~invalid].dt.strftime('%Y-%m-%d').astype(object).where(dob[~invalid].notna(), None)
+    errors = list(zip(frame.loc[invalid, 'row_number'].tolist(), messages[invalid].tolist()))
+    return valid, errors
+
+
+def import_users(db_manager, source):
+    """
+    Imports users from a CSV in one transaction: invalid rows are reported, the rest are inserted.
+
+    Returns:
+        dict: {"success", "message", "imported", "errors"}, errors being (row_number, message) pairs.
+    """
+    try:
+        frame = read_users_csv(source)
+        valid, errors = validate_users(frame)
+    except (ValueError, pd.errors.ParserError) as e:
+        return {"success": False, "message": f"Could not read the file: {e}", "imported": 0, "errors": []}
+
+    # Same unsalted SHA-256 as create_user; it costs well under a microsecond per password
+    password_hashes = [hashlib.sha256(password.encode()).hexdigest() for password in valid['password']]
+    columns = [valid[column].tolist() for column in ('row_number', 'username', 'full_name', 'role', 'status', 'id_number', 'dob')]
+    row_numbers, usernames, full_names, roles, statuses, id_numbers, dobs = columns
+    rows = list(zip(row_numbers, usernames, password_hashes, full_names, roles, statuses, id_numbers, dobs))
+    result = db_manager.bulk_create_users(rows)
+
+    errors = sorted(errors + result['errors'])
+    imported = result['imported']
+    message = f"Imported {imported} of {len(frame)} users." + (f" {len(errors)} row(s) rejected." if errors else "")
+    return {"success": result['success'], "message": message if result['success'] else result['message'],
+            "imported": imported, "errors": errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import users from a CSV file in one transaction.")
+    parser.add_argument('csv', help=f"CSV with the columns {', '.join(BULK_IMPORT_COLUMNS)} (and optionally status)")
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.db, use_pool=False)
+    start = time.perf_counter()
+    result = import_users(db_manager, args.csv)
+    print(f"{result['message']} ({time.perf_counter() - start:.2f}s)")
+    for row_number, message in result['errors'][:50]:
+        print(f"  line {row_number}: {message}")
+    if len(result['errors']) > 50:
+        print(f"  ... and {len(result['errors']) - 50} more")
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,35 @@ from enum import Enum
 # --- Database ---
 # The path to the SQLite database file
 DB_PATH = 'database/app_database.db'
+# Connections shared by every session in a server process (see connection_pool.py)
+DB_POOL_SIZE = 8  # persistent connections per database file
+DB_POOL_TIMEOUT = 5.0  # seconds to wait for a free connection before opening a temporary one
+DB_POOL_HEALTH_CHECK_INTERVAL = 30  # seconds a connection may sit idle before it is re-validated
+
+# Storage profile applied to every new connection. 'default' keeps SQLite's rollback journal;
+# 'production' switches to WAL so readers never block the writer and vice versa.
+DB_STORAGE_PROFILE = 'default'
+DB_STORAGE_PROFILES = {
+    'default': {
+        'busy_timeout': 5000,  # ms to wait on a locked database before failing
+    },
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',  # durable across application crashes; an OS crash may lose the last commits
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,  # bytes of the file read through the OS page cache
+        'cache_size': -64 * 1024,  # negative values are KiB: 64 MB page cache per connection
+        'wal_autocheckpoint': 1000,  # pages
+        'checkpoint_interval': 60,  # seconds between passive checkpoints run by the pool
+    },
+}
+
+
+# --- Model Artifacts ---
+# Directory holding the pickled model and preprocessing artifacts
+MODEL_DIR = 'models/'
+# Single-file bundle exported from those pickles by `python model_bundle.py export`
+MODEL_BUNDLE_PATH = 'models/model_bundle.bin'
 
 
 # --- User Roles ---
@@ -26,6 +55,114 @@ class UserStatus(Enum):
 # Defines the probability threshold for classifying predictions
 LOW_RISK_THRESHOLD = 0.4
 HIGH_RISK_THRESHOLD = 0.6
+# The classes utils.classify_risk assigns, lowest risk first
+RISK_CLASSES = ['Low Risk', 'Medium Risk', 'High Risk']
+
+# --- Prediction Form Options ---
+# The values a doctor can choose for each model input (mirrors the CHECK constraints on 'predictions')
+CANCER_STAGES = ["I", "II", "III", "IV"]
+TUMOR_TYPES = ["Stomach", "Lung", "Breast", "Cervical", "Liver", "Colorectal"]
+METASTASIS_OPTIONS = ["No", "Yes"]
+TREATMENT_TYPES = ["Radiation", "Chemotherapy", "Surgery", "Targeted Therapy", "Immunotherapy"]
+COMORBIDITIES = [
+    "No Comorbidities",
+    "Diabetes, Hepatitis B",
+    "Hepatitis B",
+    "Hypertension",
+    "Diabetes, Hypertension",
+    "Diabetes, Hepatitis B",
+    "Hypertension, Hepatitis B"
+]
+TUMOR_SIZE_RANGE = (0.1, 20.0)
+
+# --- Risk Lookup Table ---
+# Serve predictions from the precomputed table built by `python risk_table.py build`
+USE_RISK_TABLE = False
+RISK_TABLE_PATH = 'models/risk_table.npy'
+RISK_TABLE_AGE_RANGE = (0, 120)
+RISK_TABLE_SIZE_STEP = 0.1
+
+# --- Inference Server ---
+# Score through the shared daemon started with `python inference_server.py serve`;
+# pages fall back to in-process scoring whenever it is unreachable
+USE_INFERENCE_SERVER = False
+INFERENCE_SOCKET_PATH = '/tmp/cancer_inference.sock'
+INFERENCE_BATCH_WINDOW_MS = 2
+INFERENCE_MAX_BATCH_ROWS = 4096
+INFERENCE_TIMEOUT = 2.0  # seconds
+
+# --- Prediction Cache ---
+# Memoizes probabilities per normalized feature tuple and model hash
+PREDICTION_CACHE_SIZE = 10_000  # entries; 0 disables caching
+PREDICTION_CACHE_TTL = 3600  # seconds
+
+# --- Similar Patients Index ---
+# Built with `python similar_patients.py build`; new predictions are appended as they are logged
+SIMILAR_INDEX_PATH = 'models/similar_patients.idx'
+SIMILAR_PATIENTS_K = 5
+
+# --- Bulk Import ---
+# Columns a user CSV must have; `status` is optional and defaults to active
+BULK_IMPORT_COLUMNS = ['username', 'password', 'full_name', 'role', 'id_number', 'dob']
+# Declared widths of the users table's text columns, which SQLite itself does not enforce
+BULK_IMPORT_FIELD_LENGTHS = {'username': 20, 'full_name': 30, 'id_number': 18}
+
+# --- Prediction Writes ---
+# How DatabaseManager.log_prediction commits (see prediction_writer.PredictionWriter):
+# 'sync' commits each prediction on its own; 'group' shares one commit between concurrent writers;
+# 'async' returns once queued and commits in the background, so a crash can lose the last batch
+# and a just-logged prediction can take up to the flush interval to show up in the lists
+PREDICTION_WRITE_MODES = ['sync', 'group', 'async']
+PREDICTION_WRITE_MODE = 'sync'
+PREDICTION_WRITER_BATCH_SIZE = 500  # predictions per transaction at most
+PREDICTION_WRITER_FLUSH_INTERVAL = 0.05  # seconds an async batch waits to fill up
+PREDICTION_WRITER_QUEUE_SIZE = 10000  # queued predictions before writers have to wait
+PREDICTION_WRITER_PUT_TIMEOUT = 5.0  # seconds a writer waits for room before failing
+
+# --- Query Cache ---
+# Read results shared by every session in the server process; writes invalidate them through per-table versions
+QUERY_CACHE_SIZE = 512
 
 # --- Pagination ---
-ITEMS_PER_PAGE = 10
\ No newline at end of file
+ITEMS_PER_PAGE = 10
+# List totals are counted up to this many rows and shown as "N+" beyond it, so page loads stay flat on large tables
+PAGINATION_COUNT_LIMIT = 1000
+
+# --- Analytics Frames ---
+# Rows fetched per DataFrame chunk by the columnar chart queries
+FRAME_CHUNK_SIZE = 50_000
+
+# --- Concurrent Reads ---
+# Reader threads per database file for AsyncDatabaseManager; each keeps its own connection
+DB_READER_THREADS = 4
+DB_READ_TIMEOUT = 30.0  # seconds AsyncDatabaseManager.read_all waits for its reads before raising TimeoutError
+
+# --- Analytics Replica ---
+# A read-only copy of the database, refreshed in the background with SQLite's online backup API (see replica.py).
+# Analytics and report reads go to it while it is at most DB_REPLICA_MAX_STALENESS seconds old, else to the database
+DB_REPLICA_ENABLED = False
+DB_REPLICA_REFRESH_INTERVAL = 300  # seconds between snapshots
+DB_REPLICA_MAX_STALENESS = 900  # seconds
+DB_SNAPSHOT_PAGES_PER_STEP = 256  # database pages copied per backup step
+DB_SNAPSHOT_STEP_PAUSE = 0.002  # seconds between steps, letting writers in
+DB_SNAPSHOT_MAX_RESTARTS = 3  # restarts by concurrent writes (rollback journal only) before copying the rest in one step
+
+# --- Database Instrumentation ---
+# Opt-in call counts, rows and latency histograms for every DatabaseManager method and SQL statement
+# (see db_metrics.py). When off, no method or connection is wrapped
+DB_METRICS_ENABLED = False
+DB_METRICS_LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+DB_METRICS_MAX_STATEMENTS = 500  # distinct statements tracked; any further ones are counted together
+DB_SLOW_QUERY_MS = 100  # statements slower than this are logged with their query plan
+DB_SLOW_QUERY_LOG_PATH = 'logs/slow_queries.log'
+DB_METRICS_DUMP_PATH = 'logs/db_metrics.jsonl'  # one JSON snapshot per line
+DB_METRICS_DUMP_INTERVAL = 60  # seconds between snapshots written to the dump file
+DB_METRICS_LOG_MAX_BYTES = 5 * 2**20  # log and dump files are rotated at this size
+DB_METRICS_LOG_BACKUPS = 3
+
+# --- Prediction Archive ---
+# Predictions older than DB_ARCHIVE_AFTER_DAYS are moved out of the hot table into one archive database file per
+# year, next to the database (e.g. app_database.archive_2023.db), by `python archive.py run` (see archive.py).
+# History lists read an archive only once a page reaches past a patient's or doctor's hot predictions
+DB_ARCHIVE_AFTER_DAYS = 365
+DB_ARCHIVE_BATCH_SIZE = 5000  # predictions moved per transaction; writers wait at most one batch
@@ -0,0 +1,225 @@
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from configs import (DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_HEALTH_CHECK_INTERVAL, DB_STORAGE_PROFILE,
+                     DB_STORAGE_PROFILES)
+from db_metrics import connection_factory
+
+# PRAGMAs a storage profile may set, in the order they are applied
+PROFILE_PRAGMAS = ['journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'wal_autocheckpoint']
+
+
+def connect(db_path=DB_PATH, profile=DB_STORAGE_PROFILE, check_same_thread=True):
+    """Opens a connection configured with the given storage profile (see configs.DB_STORAGE_PROFILES)."""
+    settings = DB_STORAGE_PROFILES[profile]
+    conn = sqlite3.connect(db_path, timeout=settings.get('busy_timeout', 5000) / 1000, check_same_thread=check_same_thread,
+                           factory=connection_factory())
+    conn.row_factory = sqlite3.Row             # Set row factory to return rows as dictionaries
+    conn.execute("PRAGMA foreign_keys = ON;")  # Enable foreign key constraints
+    for pragma in PROFILE_PRAGMAS:
+        if pragma in settings:
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]};")
+    return conn
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of SQLite connections to one database file.
+
+    Up to `size` connections are kept open and handed out one borrower at a time.
+    When all of them are busy for longer than `timeout` seconds, a temporary
+    overflow connection is opened instead of failing, and closed when returned.
+    Connections that sat idle longer than `health_check_interval` seconds are
+    validated with a trivial query before being handed out, and replaced if broken.
+    Under a WAL profile with a `checkpoint_interval`, a returned connection runs a
+    passive checkpoint whenever that interval has elapsed.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 health_check_interval=DB_POOL_HEALTH_CHECK_INTERVAL, profile=DB_STORAGE_PROFILE):
+        self.db_path = db_path
+        self.profile = profile
+        self.checkpoint_interval = DB_STORAGE_PROFILES[profile].get('checkpoint_interval')
+        self._last_checkpoint = time.monotonic()
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()  # (connection, returned_at); LIFO keeps the warmest connections in use
+        # Reentrant: the first connections are opened, and counted by _connect, with the lock held
+        self._lock = threading.RLock()
+        self._open = 0
+        self._overflow = set()
+        self._closed = False
+        # Statistics
+        self.connections_opened = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.overflow_opened = 0
+        self.health_checks = 0
+        self.health_check_failures = 0
+        self.checkpoints = 0
+
+    def _connect(self):
+        # Connections move between Streamlit script threads, but only one thread uses a connection at a time
+        conn = connect(self.db_path, self.profile, check_same_thread=False)
+        with self._lock:
+            self.connections_opened += 1
+        print("Database connection established.")
+        return conn
+
+    def _is_healthy(self, conn):
+        self.health_checks += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            self.health_check_failures += 1
+            return False
+
+    def acquire(self):
+        """Checks out a connection, waiting up to `timeout` seconds before opening an overflow connection."""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        with self._lock:
+            self.checkouts += 1
+            if self._idle.empty() and self._open < self.size:
+                self._open += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._open -= 1
+                    raise
+
+        try:
+            conn, returned_at = self._idle.get_nowait()
+        except queue.Empty:
+            start = time.perf_counter()
+            try:
+                conn, returned_at = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                conn = None
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += time.perf_counter() - start
+                if conn is None:
+                    self.overflow_opened += 1
+            if conn is None:
+                conn = self._connect()
+                self._overflow.add(id(conn))
+                return conn
+
+        if time.monotonic() - returned_at > self.health_check_interval and not self._is_healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                # The closed connection no longer counts towards the pool, or every failure would shrink it
+                with self._lock:
+                    self._open -= 1
+                raise
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything its borrower left uncommitted."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            pass
+        self._maybe_checkpoint(conn)
+        if id(conn) in self._overflow:
+            self._overflow.discard(id(conn))
+            conn.close()
+            return
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._open -= 1
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def _maybe_checkpoint(self, conn):
+        """Runs a passive WAL checkpoint if `checkpoint_interval` has elapsed since the last one."""
+        if not self.checkpoint_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+                return
+            self._last_checkpoint = time.monotonic()
+        try:
+            # PASSIVE never waits for readers or writers; it copies what it can and returns
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE);").fetchone()
+            self.checkpoints += 1
+        except sqlite3.Error as e:
+            print(f"WAL checkpoint failed: {e}")
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for the duration of a `with` block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Pool size, usage and health-check counters."""
+        with self._lock:
+            idle = self._idle.qsize()
+            return {
+                'profile': self.profile,
+                'size': self.size,
+                'open': self._open,
+                'idle': idle,
+                'in_use': self._open - idle + len(self._overflow),
+                'connections_opened': self.connections_opened,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'avg_wait_ms': self.wait_seconds / self.waits * 1e3 if self.waits else 0.0,
+                'overflow_opened': self.overflow_opened,
+                'health_checks': self.health_checks,
+                'health_check_failures': self.health_check_failures,
+                'checkpoints': self.checkpoints,
+            }
+
+    def close(self):
+        """Closes every idle connection; connections still checked out are closed when returned."""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._open -= 1
+
+
+# --- Process-wide Registry ---
+# One pool per database file and storage profile, shared by every session in the server process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH, profile=DB_STORAGE_PROFILE):
+    """Returns the shared pool for `db_path`, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get((db_path, profile))
+        if pool is None:
+            pool = _pools[(db_path, profile)] = ConnectionPool(db_path, profile=profile)
+        return pool
+
+
+def close_pool(db_path=DB_PATH, profile=DB_STORAGE_PROFILE):
+    """Closes and forgets the shared pool for `db_path`, if any."""
+    with _pools_lock:
+        pool = _pools.pop((db_path, profile), None)
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,465 @@
+import argparse
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import types
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from configs import (DB_METRICS_DUMP_INTERVAL, DB_METRICS_DUMP_PATH, DB_METRICS_LATENCY_BUCKETS_MS,
+                     DB_METRICS_LOG_BACKUPS, DB_METRICS_LOG_MAX_BYTES, DB_METRICS_MAX_STATEMENTS, DB_SLOW_QUERY_LOG_PATH,
+                     DB_SLOW_QUERY_MS)
+
+# Statements beyond DB_METRICS_MAX_STATEMENTS distinct ones are counted under this key
+OTHER_STATEMENTS = '(other statements)'
+SLOW_LOG_ENTRIES = 100  # most recent slow statements kept for snapshots
+
+
+class _Timing:
+    """Call count, errors, rows and a wall-time histogram of one method or statement."""
+    __slots__ = ('calls', 'errors', 'rows', 'seconds', 'max_seconds', 'buckets')
+
+    def __init__(self, bucket_count):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * bucket_count
+
+    def snapshot(self, bounds_ms):
+        total_ms = self.seconds * 1e3
+
+        def percentile(q):
+            # Upper bound of the bucket holding the q-th call, capped at (and past the last bound, equal to) the maximum
+            rank, seen, max_ms = q * self.calls, 0, self.max_seconds * 1e3
+            for bound, count in zip(bounds_ms, self.buckets):
+                seen += count
+                if seen >= rank:
+                    return min(bound, max_ms)
+            return max_ms
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': total_ms,
+            'avg_ms': total_ms / self.calls if self.calls else 0.0,
+            'max_ms': self.max_seconds * 1e3,
+            'p50_ms': percentile(0.5) if self.calls else 0.0,
+            'p95_ms': percentile(0.95) if self.calls else 0.0,
+            'p99_ms': percentile(0.99) if self.calls else 0.0,
+            'histogram': self.buckets.copy(),
+        }
+
+
+class QueryMetrics:
+    """
+    Thread-safe statistics of DatabaseManager calls and the SQL statements they run.
+
+    Methods and statements each get a call count, error count, rows returned and a
+    wall-time histogram over `bucket_bounds_ms` (plus an overflow bucket). Statements
+    are keyed by their whitespace-normalized SQL, so the same query issued from
+    different methods is counted once. Statements slower than `slow_query_ms` are
+    logged with their EXPLAIN QUERY PLAN and the method that ran them; parameters
+    are never logged, as they include password hashes.
+    """
+
+    def __init__(self, slow_query_ms=DB_SLOW_QUERY_MS, bucket_bounds_ms=DB_METRICS_LATENCY_BUCKETS_MS,
+                 max_statements=DB_METRICS_MAX_STATEMENTS, slow_log=None):
+        self.slow_query_ms = slow_query_ms
+        self.bucket_bounds_ms = list(bucket_bounds_ms)
+        self._bounds = [bound / 1e3 for bound in self.bucket_bounds_ms]
+        self.max_statements = max_statements
+        self.slow_log = slow_log  # logging.Logger for slow statements, or None to keep them in memory only
+        self._methods = {}
+        self._statements = {}
+        self._keys = {}  # raw SQL -> statement key
+        self._slow = deque(maxlen=SLOW_LOG_ENTRIES)
+        self._lock = threading.Lock()
+        self._current = threading.local()  # the DatabaseManager method running on this thread
+        self.started = time.time()
+
+    def _add(self, table, key, seconds, rows, failed):
+        timing = table.get(key)
+        if timing is None:
+            timing = table[key] = _Timing(len(self._bounds) + 1)
+        timing.calls += 1
+        timing.errors += failed
+        timing.rows += rows
+        timing.seconds += seconds
+        if seconds > timing.max_seconds:
+            timing.max_seconds = seconds
+        timing.buckets[bisect.bisect_left(self._bounds, seconds)] += 1
+
+    def record_method(self, name, seconds, rows, failed=False):
+        with self._lock:
+            self._add(self._methods, name, seconds, rows, failed)
+
+    def statement_key(self, sql):
+        key = self._keys.get(sql)
+        if key is None:
+            key = ' '.join(sql.split())
+            with self._lock:
+                if key not in self._statements and len(self._statements) >= self.max_statements:
+                    key = OTHER_STATEMENTS
+                if len(self._keys) < self.max_statements * 4:
+                    self._keys[sql] = key
+        return key
+
+    def record_statement(self, conn, sql, params, seconds, rows, failed=False):
+        """Counts one statement; a slow one is explained on `conn` and logged (params=None skips the plan)."""
+        key = self.statement_key(sql)
+        with self._lock:
+            self._add(self._statements, key, seconds, rows, failed)
+        if seconds * 1e3 >= self.slow_query_ms:
+            self._log_slow(conn, key, sql, params, seconds, rows)
+
+    def _log_slow(self, conn, key, sql, params, seconds, rows):
+        plan = []
+        if params is not None:
+            try:
+                # A plain cursor, so the EXPLAIN itself is not counted
+                explain = sqlite3.Cursor(conn)
+                explain.row_factory = None
+                plan = [row[3] for row in explain.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"(not explained: {e})"]
+        entry = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(seconds * 1e3, 3),
+            'rows': rows,
+            'method': getattr(self._current, 'method', None),
+            'sql': key,
+            'plan': plan,
+        }
+        with self._lock:
+            self._slow.append(entry)
+        if self.slow_log is not None:
+            self.slow_log.warning(json.dumps(entry))
+
+    def snapshot(self):
+        """Every method's and statement's statistics, the latency bucket bounds and the recent slow statements."""
+        with self._lock:
+            return {
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'uptime_s': round(time.time() - self.started, 1),
+                'bucket_bounds_ms': self.bucket_bounds_ms,
+                'slow_query_ms': self.slow_query_ms,
+                'methods': {name: t.snapshot(self.bucket_bounds_ms) for name, t in self._methods.items()},
+                'statements': {sql: t.snapshot(self.bucket_bounds_ms) for sql, t in self._statements.items()},
+                'slow_statements': list(self._slow),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._methods.clear()
+            self._statements.clear()
+            self._keys.clear()
+            self._slow.clear()
+            self.started = time.time()
+
+
+# --- Instrumented Connections ---
+# Opened by connection_pool.connect while metrics are enabled. A statement is timed from execute()
+# through every fetch until its rows run out, the cursor runs another statement, or it is closed
+# or dropped; statements that return no rows (writes, DDL) are counted as soon as they ran.
+
+class InstrumentedCursor(sqlite3.Cursor):
+    __slots__ = ('_sql', '_params', '_seconds', '_rows')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sql = None
+
+    def _finish(self, failed=False):
+        sql = self._sql
+        if sql is None:
+            return
+        self._sql = None
+        metrics = _metrics
+        if metrics is not None:
+            metrics.record_statement(self.connection, sql, self._params, self._seconds, self._rows, failed)
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            self._sql, self._params, self._seconds, self._rows = sql, None, time.perf_counter() - start, 0
+            self._finish(failed=True)
+            raise
+        self._sql, self._params, self._seconds, self._rows = sql, parameters, time.perf_counter() - start, 0
+        if self.description is None:
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            failed = True
+            raise
+        finally:
+            # The parameters were consumed, so a slow executemany is logged without a plan
+            self._sql, self._params, self._seconds = sql, None, time.perf_counter() - start
+            self._rows = max(self.rowcount, 0)
+            self._finish(failed)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._sql is not None:
+            self._seconds += time.perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        if self._sql is not None:
+            self._seconds += time.perf_counter() - start
+            self._rows += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._sql is not None:
+            self._seconds += time.perf_counter() - start
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Connection.execute() does not go through cursor(), so both shortcuts are overridden
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """The sqlite3 connection class for new connections: instrumented while metrics are enabled."""
+    return InstrumentedConnection if _metrics is not None else sqlite3.Connection
+
+
+# --- Instrumented Methods ---
+
+def _rows_returned(result):
+    if result is None or isinstance(result, types.GeneratorType):
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    items = getattr(result, 'items', None)
+    if isinstance(items, list):  # Page
+        return len(items)
+    if isinstance(result, dict):
+        if 'success' in result:  # a write's outcome
+            return 0
+        first = next(iter(result.values()), None)
+        return len(first) if isinstance(first, tuple) else len(result)  # columnar reads hold one tuple per column
+    if hasattr(result, 'shape'):  # DataFrame
+        return len(result)
+    return 1
+
+
+def _instrument(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        metrics = _metrics
+        if metrics is None:
+            return method(*args, **kwargs)
+        current = metrics._current
+        outer = getattr(current, 'method', None)
+        current.method = name if outer is None else outer  # slow statements are blamed on the outermost call
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except Exception:
+            metrics.record_method(name, time.perf_counter() - start, 0, failed=True)
+            raise
+        finally:
+            current.method = outer
+        metrics.record_method(name, time.perf_counter() - start, _rows_returned(result))
+        return result
+    wrapper._instrumented = method
+    return wrapper
+
+
+def instrument_methods(cls):
+    """Wraps every public method of `cls` to be counted and timed (idempotent)."""
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith('_') and isinstance(attr, types.FunctionType) and not hasattr(attr, '_instrumented'):
+            setattr(cls, name, _instrument(name, attr))
+
+
+def uninstrument_methods(cls):
+    """Restores the methods wrapped by instrument_methods."""
+    for name, attr in list(vars(cls).items()):
+        if hasattr(attr, '_instrumented'):
+            setattr(cls, name, attr._instrumented)
+
+
+# --- Periodic Dump ---
+
+def _rotating_logger(name, path):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=DB_METRICS_LOG_MAX_BYTES, backupCount=DB_METRICS_LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+class MetricsDumper:
+    """A daemon thread appending a metrics snapshot to a rotating JSON-lines file every `interval` seconds."""
+
+    def __init__(self, metrics, path=DB_METRICS_DUMP_PATH, interval=DB_METRICS_DUMP_INTERVAL):
+        self.metrics = metrics
+        self.interval = interval
+        self._logger = _rotating_logger('db_metrics.dump', path)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='db-metrics-dump', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        self._logger.info(json.dumps(self.metrics.snapshot()))
+
+    def close(self):
+        """Stops the thread after writing a final snapshot."""
+        self._stop.set()
+        self._thread.join()
+        self.dump()
+
+
+# --- Process-wide Registry ---
+# One collector per server process; None while metrics are disabled
+_metrics = None
+_dumper = None
+_metrics_lock = threading.Lock()
+
+
+def enable_metrics(manager_class, dump=True, slow_query_ms=DB_SLOW_QUERY_MS):
+    """
+    Starts collecting: wraps the public methods of `manager_class`, instruments connections
+    opened from now on and, with `dump`, starts the periodic dump and the slow-statement log file.
+    Connections already open (e.g. idle in a pool) keep running uninstrumented statements.
+    """
+    global _metrics, _dumper
+    with _metrics_lock:
+        if _metrics is None:
+            slow_log = _rotating_logger('db_metrics.slow', DB_SLOW_QUERY_LOG_PATH) if dump else None
+            _metrics = QueryMetrics(slow_query_ms=slow_query_ms, slow_log=slow_log)
+            if dump:
+                _dumper = MetricsDumper(_metrics)
+        instrument_methods(manager_class)
+        return _metrics
+
+
+def disable_metrics(manager_class):
+    """Restores `manager_class`'s methods, stops the dump after a final snapshot and drops the collector."""
+    global _metrics, _dumper
+    with _metrics_lock:
+        uninstrument_methods(manager_class)
+        if _dumper is not None:
+            _dumper.close()
+            _dumper = None
+        _metrics = None
+
+
+def get_metrics():
+    """The active collector, or None while metrics are disabled."""
+    return _metrics
+
+
+def snapshot():
+    """The active collector's snapshot, or None while metrics are disabled."""
+    metrics = _metrics
+    return metrics.snapshot() if metrics is not None else None
+
+
+@atexit.register
+def _dump_on_exit():
+    if _dumper is not None:
+        _dumper.close()
+
+
+# --- Report ---
+
+def _last_snapshot(path):
+    last = None
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                last = line
+    if last is None:
+        raise SystemExit(f"No snapshots in {path}.")
+    return json.loads(last)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the latest database metrics snapshot.")
+    parser.add_argument('--file', default=DB_METRICS_DUMP_PATH)
+    parser.add_argument('--top', type=int, default=15, help="Methods and statements to list, by total time")
+    args = parser.parse_args(argv)
+
+    snap = _last_snapshot(args.file)
+    print(f"Snapshot {snap['time']} ({snap['uptime_s']:,.0f}s of collection)")
+    for section, width in (('methods', 34), ('statements', 70)):
+        entries = sorted(snap[section].items(), key=lambda item: item[1]['total_ms'], reverse=True)[:args.top]
+        print(f"\n{section.capitalize()} by total time")
+        print(f"  {'name':<{width}}{'calls':>9}{'rows':>11}{'total':>12}{'avg':>10}{'p95':>10}{'max':>10}")
+        for name, t in entries:
+            name = name if len(name) <= width - 2 else name[:width - 5] + '...'
+            print(f"  {name:<{width}}{t['calls']:>9,}{t['rows']:>11,}{t['total_ms']:>10,.0f}ms"
+                  f"{t['avg_ms']:>8.2f}ms{t['p95_ms']:>8.1f}ms{t['max_ms']:>8.1f}ms")
+    slow = snap['slow_statements']
+    print(f"\n{len(slow)} recent statement(s) slower than {snap['slow_query_ms']}ms")
+    for entry in slow[-5:]:
+        print(f"  {entry['time']}  {entry['ms']:.1f}ms  {entry['method'] or '-'}: {entry['sql'][:80]}")
+        for step in entry['plan']:
+            print(f"      {step}")
+
+
+if __name__ == "__main__":
+    main()
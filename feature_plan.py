@@ -0,0 +1,215 @@
+import numpy as np
+
+# Raw inputs collected by the prediction form, in the order used by the batch paths
+INPUT_FEATURES = ['Age', 'CancerStage', 'TumorSize', 'TumorType', 'Metastasis', 'TreatmentType', 'Comorbidities']
+
+
+class FeaturePlan:
+    """
+    A compiled mapping from raw patient features to the model's input matrix.
+
+    The plan is built once from the fitted encoders and scaler and then fills a
+    preallocated float32 matrix column by column, without any intermediate DataFrames.
+    """
+
+    def __init__(self, columns, numeric, categorical):
+        """
+        Args:
+            columns (list[str]): Output columns, in the exact order the model expects.
+            numeric (list[tuple]): (source, output_index, mean, scale) for every standardized feature.
+            categorical (dict): source -> (output_indices, {raw value: encoded row}, strict).
+                Unknown values raise a ValueError when strict, otherwise they encode as zeros.
+        """
+        self.columns = list(columns)
+        self.numeric = [(src, int(idx), float(mean), float(scale)) for src, idx, mean, scale in numeric]
+        self.categorical = {}
+        self._encoders = {}
+        for src, (indices, table, strict) in categorical.items():
+            indices = np.asarray(indices, dtype=np.intp)
+            table = {value: np.asarray(row, dtype=np.float64) for value, row in table.items()}
+            self.categorical[src] = (indices, table, bool(strict))
+            # Code lookup plus the encoded rows; code -1 (unknown) selects the trailing all-zero row
+            codes = {value: i for i, value in enumerate(table)}
+            rows = np.zeros((len(table) + 1, len(indices)), dtype=np.float64)
+            for i, row in enumerate(table.values()):
+                rows[i] = row
+            self._encoders[src] = (codes, rows)
+
+        # Columns not produced by any encoder stay at zero, as in utils.feature_selection
+        filled = {idx for _, idx, _, _ in self.numeric}
+        for indices, _, _ in self.categorical.values():
+            filled.update(indices.tolist())
+        self.constant_zero = np.array([i for i in range(len(self.columns)) if i not in filled], dtype=np.intp)
+
+    @property
+    def sources(self):
+        """The raw feature names this plan reads."""
+        return [src for src, _, _, _ in self.numeric] + list(self.categorical)
+
+    def transform(self, features, out=None):
+        """
+        Encodes raw features into a float32 matrix of shape (n_rows, len(columns)).
+
+        Args:
+            features: A single feature dict, a list of feature dicts, a DataFrame,
+                or a dict mapping each raw feature name to a column array.
+            out (np.ndarray, optional): A preallocated float32 matrix to fill in place.
+        """
+        columns, n_rows = self._as_columns(features)
+        if out is None:
+            out = np.empty((n_rows, len(self.columns)), dtype=np.float32)
+        elif out.shape != (n_rows, len(self.columns)) or out.dtype != np.float32:
+            raise ValueError(f"Output buffer must be float32 with shape {(n_rows, len(self.columns))}.")
+
+        # Standardize in float64 first (same arithmetic as StandardScaler), then narrow to float32
+        for src, idx, mean, scale in self.numeric:
+            values = np.asarray(columns[src], dtype=np.float64)
+            out[:, idx] = (values - mean) / scale
+
+        # Map raw labels to codes with one dict lookup each, then gather the encoded rows
+        for src, (indices, _, strict) in self.categorical.items():
+            lookup, rows = self._encoders[src]
+            values = columns[src]
+            codes = np.fromiter((lookup.get(value, -1) for value in values), dtype=np.intp, count=n_rows)
+            if strict and (codes < 0).any():
+                unseen = values[int(np.argmax(codes < 0))]
+                raise ValueError(f"{src} contains previously unseen label: {unseen!r}")
+            out[:, indices] = rows[codes]
+
+        out[:, self.constant_zero] = 0.0
+        return out
+
+    def _as_columns(self, features):
+        """Normalizes the supported input shapes into {source: 1-D array} plus a row count."""
+        if isinstance(features, dict):
+            columns = {src: np.atleast_1d(np.asarray(features[src], dtype=object if src in self.categorical else None)) for src in self.sources}
+        elif isinstance(features, (list, tuple)):
+            columns = {src: [row[src] for row in features] for src in self.sources}
+        else:
+            # DataFrame or any other column-addressable container
+            columns = {src: np.asarray(features[src]) for src in self.sources}
+        n_rows = len(next(iter(columns.values())))
+        return columns, n_rows
+
+    def to_params(self):
+        """Returns the plan as plain Python data, suitable for serialization."""
+        return {
+            'columns': list(self.columns),
+            'numeric': [list(step) for step in self.numeric],
+            'categorical': {
+                src: [indices.tolist(), [[value, row.tolist()] for value, row in table.items()], strict]
+                for src, (indices, table, strict) in self.categorical.items()
+            },
+        }
+
+    @classmethod
+    def from_params(cls, params):
+        """Rebuilds a plan from the output of `to_params`."""
+        categorical = {
+            src: (indices, {value: row for value, row in table}, strict)
+            for src, (indices, table, strict) in params['categorical'].items()
+        }
+        return cls(params['columns'], params['numeric'], categorical)
+
+
+def compile_feature_plan(label_encoders, ohe_dict, scaler, columns):
+    """
+    Compiles the fitted sklearn encoders and scaler into a FeaturePlan.
+
+    Args:
+        label_encoders (dict): Column name -> fitted LabelEncoder (ordinal features).
+        ohe_dict (dict): Column name -> fitted OneHotEncoder.
+        scaler (StandardScaler): Scaler fitted on the numeric features.
+        columns (list[str]): Model input columns, in order.
+    """
+    position = {col: i for i, col in enumerate(columns)}
+
+    # --- Numeric features ---
+    numeric_names = list(getattr(scaler, 'feature_names_in_', ['Age', 'TumorSize']))
+    numeric = [
+        (name, position[name], scaler.mean_[i], scaler.scale_[i])
+        for i, name in enumerate(numeric_names) if name in position
+    ]
+
+    categorical = {}
+
+    # --- Ordinal features: the encoded value is the label's index ---
+    for col, encoder in label_encoders.items():
+        if col in position:
+            table = {label: [float(code)] for code, label in enumerate(encoder.classes_)}
+            categorical[col] = ([position[col]], table, True)
+
+    # --- One-hot features: only the dummy columns the model actually uses ---
+    for col, ohe in ohe_dict.items():
+        used = [(name, position[name]) for name in ohe.get_feature_names_out([col]) if name in position]
+        if not used:
+            continue
+        prefix = f"{col}_"
+        categories = [name[len(prefix):] for name, _ in used]
+        table = {
+            category: [1.0 if category == used_category else 0.0 for used_category in categories]
+            for category in ohe.categories_[0]
+        }
+        categorical[col] = ([idx for _, idx in used], table, ohe.handle_unknown == 'error')
+
+    return FeaturePlan(columns, numeric, categorical)
+
+
+def reconstruct_raw_features(X_scaled, plan):
+    """
+    Recovers raw feature rows from an already preprocessed matrix (e.g. X_test_scaled.csv).
+
+    Dropped one-hot categories cannot be told apart, so rows encoded as all zeros
+    cycle through the matching raw values to exercise as many labels as possible.
+    """
+    X = np.asarray(X_scaled, dtype=np.float64)
+    rows = [{} for _ in range(len(X))]
+
+    for src, idx, mean, scale in plan.numeric:
+        raw = X[:, idx] * scale + mean
+        raw = np.rint(raw).astype(int) if src == 'Age' else np.round(raw, 1)
+        for row, value in zip(rows, raw.tolist()):
+            row[src] = value
+
+    for src, (indices, table, _) in plan.categorical.items():
+        by_encoding = {}
+        for value, encoded in table.items():
+            by_encoding.setdefault(tuple(encoded.tolist()), []).append(value)
+        for i, row in enumerate(rows):
+            candidates = by_encoding[tuple(np.rint(X[i, indices]).tolist())]
+            row[src] = candidates[i % len(candidates)]
+    return rows
+
+
+def check_parity(X_path='dataset/processed/X_test_scaled.csv'):
+    """
+    Verifies the compiled plan against the reference DataFrame pipeline.
+
+    Raw rows are reconstructed from the processed test set, pushed through both
+    `utils.preprocess_dataframe` and the compiled plan, and compared bit for bit.
+    """
+    import pandas as pd
+    from utils import read_model_artifacts, preprocess_dataframe
+
+    artifacts = read_model_artifacts()
+    plan = artifacts['feature_plan']
+    X_test = pd.read_csv(X_path)
+    rows = reconstruct_raw_features(X_test[plan.columns].to_numpy(), plan)
+
+    reference = preprocess_dataframe(pd.DataFrame(rows), artifacts)[plan.columns].to_numpy(dtype=np.float32)
+    compiled = plan.transform(rows)
+    bitwise_equal = np.array_equal(reference.view(np.uint32), compiled.view(np.uint32))
+
+    drift = np.abs(compiled - X_test[plan.columns].to_numpy(dtype=np.float32)).max()
+    model = artifacts['model']
+    same_probabilities = np.array_equal(model.predict_proba(reference), model.predict_proba(compiled))
+
+    print(f"Rows checked: {len(rows)}")
+    print(f"Bit-identical to reference pipeline: {bitwise_equal}")
+    print(f"Identical model probabilities: {same_probabilities}")
+    print(f"Max abs difference from {X_path}: {drift:.3e}")
+    return bitwise_equal and same_probabilities
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if check_parity() else 1)
@@ -0,0 +1,308 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from configs import INFERENCE_SOCKET_PATH, INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH_ROWS, INFERENCE_TIMEOUT
+
+# --- Wire Protocol ---
+# Every message is a 4-byte big-endian length followed by a UTF-8 JSON body.
+#   request:  {"rows": [{feature dict}, ...]}
+#   response: {"probabilities": [float, ...]} or {"error": "message"}
+_LENGTH = struct.Struct('>I')
+
+
+def _send(sock, payload):
+    body = json.dumps(payload).encode()
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer.")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return json.loads(_recv_exact(sock, length))
+
+
+class _PendingRequest:
+    """A request waiting in the batch queue for its slice of the batched result."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.done = threading.Event()
+        self.probabilities = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for a short window and scores them with one model call.
+
+    The first request opens a batch; anything arriving within `window_ms` (up to
+    `max_rows` rows) joins it. A window of 0 scores each request on its own.
+    """
+
+    def __init__(self, artifacts, window_ms=INFERENCE_BATCH_WINDOW_MS, max_rows=INFERENCE_MAX_BATCH_ROWS):
+        self.artifacts = artifacts
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def predict(self, rows, timeout=INFERENCE_TIMEOUT):
+        """Blocks until the batch containing `rows` has been scored, or raises TimeoutError."""
+        request = _PendingRequest(rows)
+        self.queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for the model.")
+        if request.error:
+            raise ValueError(request.error)
+        return request.probabilities
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            try:
+                n_rows = len(batch[0].rows)
+                deadline = time.perf_counter() + self.window
+                while n_rows < self.max_rows:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        request = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(request)
+                    n_rows += len(request.rows)
+                self._score(batch)
+            except Exception:
+                # This is the only scoring thread: fail the batch rather than let it die
+                for request in batch:
+                    if not request.done.is_set():
+                        request.error = "Invalid input features."
+                        request.done.set()
+
+    def _score(self, batch):
+        rows = [row for request in batch for row in request.rows]
+        try:
+            X = self.artifacts['feature_plan'].transform(rows)
+            probabilities = self.artifacts['model'].predict_proba(X)[:, 1].tolist()
+        except Exception:
+            # One bad request must not fail its neighbours: score them one by one to isolate it
+            if len(batch) > 1:
+                for request in batch:
+                    self._score([request])
+                return
+            batch[0].error = "Invalid input features."
+            batch[0].done.set()
+            return
+
+        self.batches += 1
+        self.rows += len(rows)
+        offset = 0
+        for request in batch:
+            request.probabilities = probabilities[offset:offset + len(request.rows)]
+            offset += len(request.rows)
+            request.done.set()
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves requests on one client connection until the client disconnects."""
+
+    def handle(self):
+        while True:
+            try:
+                message = _recv(self.request)
+            except (ConnectionError, OSError):
+                return
+            except ValueError:
+                # The length prefix was read, so the stream is still framed; only this body was bad
+                _send(self.request, {'error': "Request is not valid JSON."})
+                continue
+            rows = message.get('rows') if isinstance(message, dict) else None
+            if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+                _send(self.request, {'error': "Malformed request: 'rows' must be a non-empty list of objects."})
+                continue
+            try:
+                probabilities = self.server.batcher.predict(rows)
+                _send(self.request, {'probabilities': probabilities})
+            except (TypeError, ValueError, TimeoutError) as e:
+                _send(self.request, {'error': str(e) or "Malformed request."})
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix domain socket server that shares one copy of the model across all clients."""
+
+    daemon_threads = True
+    # Every Streamlit script thread holds its own connection; accept bursts of new ones
+    request_queue_size = 256
+
+    def __init__(self, socket_path, artifacts, window_ms=INFERENCE_BATCH_WINDOW_MS, max_rows=INFERENCE_MAX_BATCH_ROWS):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.batcher = MicroBatcher(artifacts, window_ms, max_rows)
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class InferenceClient:
+    """
+    Client for the inference server. Each thread keeps its own persistent connection.
+
+    Methods return None instead of raising when the server is unreachable, so callers
+    can fall back to in-process scoring.
+    """
+
+    def __init__(self, socket_path=INFERENCE_SOCKET_PATH, timeout=INFERENCE_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def predict_proba(self, rows):
+        """Returns the positive-class probability for each feature dict, or None on failure."""
+        try:
+            sock = self._connection()
+            _send(sock, {'rows': rows})
+            response = _recv(sock)
+        except (OSError, ConnectionError, ValueError):
+            self._reset()
+            return None
+        if 'error' in response:
+            return None
+        return np.asarray(response['probabilities'])
+
+    def predict_one(self, features):
+        """Returns the positive-class probability for a single feature dict, or None on failure."""
+        probabilities = self.predict_proba([features])
+        return None if probabilities is None else float(probabilities[0])
+
+
+def serve(socket_path=INFERENCE_SOCKET_PATH, window_ms=INFERENCE_BATCH_WINDOW_MS, max_rows=INFERENCE_MAX_BATCH_ROWS):
+    """Loads the artifacts once and serves predictions until interrupted."""
+    from model_bundle import load_bundle_artifacts
+    from utils import read_model_artifacts
+    artifacts = load_bundle_artifacts() or read_model_artifacts()
+
+    with InferenceServer(socket_path, artifacts, window_ms, max_rows) as server:
+        print(f"Inference server listening on {socket_path} (batch window {window_ms} ms, max {max_rows} rows).")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            batcher = server.batcher
+            print(f"Served {batcher.rows} rows in {batcher.batches} batches.")
+
+
+# --- Load Test ---
+_SAMPLE_ROWS = [
+    {'Age': 30 + i % 50, 'CancerStage': ['I', 'II', 'III', 'IV'][i % 4], 'TumorSize': 0.5 + (i % 40) / 2,
+     'TumorType': ['Stomach', 'Lung', 'Breast'][i % 3], 'Metastasis': ['No', 'Yes'][i % 2],
+     'TreatmentType': ['Radiation', 'Surgery'][i % 2], 'Comorbidities': 'Hypertension'}
+    for i in range(256)
+]
+
+
+def load_test(socket_path=INFERENCE_SOCKET_PATH, clients=50, requests_per_client=200):
+    """
+    Simulates many doctors submitting single-row predictions at once.
+
+    Returns:
+        dict: Throughput (requests/sec) and latency percentiles in milliseconds.
+    """
+    client = InferenceClient(socket_path)
+    latencies = [[] for _ in range(clients)]
+    failures = [0] * clients
+    start_barrier = threading.Barrier(clients + 1)
+
+    def doctor(i):
+        start_barrier.wait()
+        for j in range(requests_per_client):
+            row = _SAMPLE_ROWS[(i * requests_per_client + j) % len(_SAMPLE_ROWS)]
+            start = time.perf_counter()
+            if client.predict_one(row) is None:
+                failures[i] += 1
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=doctor, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.asarray(l) for l in latencies]) * 1e3
+    return {
+        'requests': len(all_latencies),
+        'failures': sum(failures),
+        'throughput': len(all_latencies) / elapsed,
+        'p50_ms': float(np.percentile(all_latencies, 50)),
+        'p99_ms': float(np.percentile(all_latencies, 99)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared local inference server for the cancer risk model.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help="Run the inference daemon")
+    serve_parser.add_argument('--socket', default=INFERENCE_SOCKET_PATH)
+    serve_parser.add_argument('--window-ms', type=float, default=INFERENCE_BATCH_WINDOW_MS)
+    serve_parser.add_argument('--max-rows', type=int, default=INFERENCE_MAX_BATCH_ROWS)
+
+    test_parser = subparsers.add_parser('loadtest', help="Measure throughput and latency against a running server")
+    test_parser.add_argument('--socket', default=INFERENCE_SOCKET_PATH)
+    test_parser.add_argument('--clients', type=int, default=50)
+    test_parser.add_argument('--requests', type=int, default=200, help="Requests per client")
+
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        serve(args.socket, args.window_ms, args.max_rows)
+    else:
+        r = load_test(args.socket, args.clients, args.requests)
+        print(f"{r['requests']} requests from {args.clients} clients ({r['failures']} failed)")
+        print(f"Throughput: {r['throughput']:.0f} req/s, p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import textwrap
+
+from configs import DB_PATH
+from summary_tables import REBUILD_STATEMENTS
+
+def _add(table, keys, count_column, delta):
+    """A trigger statement adding `delta` to the counter row of `table` identified by `keys` (column -> SQL value)."""
+    return (f"INSERT INTO {table} ({', '.join(keys)}, {count_column}) VALUES ({', '.join(keys.values())}, {delta}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {count_column} = {count_column} + excluded.{count_column};")
+
+
+def _prediction_counted(row, delta):
+    """Trigger statements counting prediction `row` ('new' or 'old') in or out of the summary tables."""
+    statements = [
+        _add('doctor_risk_counts', {'doctor_id': f'{row}.doctor_id', 'predicted_class': f'{row}.predicted_class'},
+             'predictions', delta),
+        _add('system_totals', {'name': f"'predictions.class:' || {row}.predicted_class"}, 'value', delta),
+    ]
+    if delta > 0:
+        # Replace the patient's latest prediction only if this one is newer
+        statements.append(f"""
+            INSERT INTO patient_latest_prediction (patient_id, prediction_id, doctor_id, prediction_timestamp,
+                                                   predicted_class, prediction_probability)
+            VALUES ({row}.patient_id, {row}.prediction_id, {row}.doctor_id, {row}.prediction_timestamp,
+                    {row}.predicted_class, {row}.prediction_probability)
+            ON CONFLICT (patient_id) DO UPDATE SET
+                prediction_id = excluded.prediction_id, doctor_id = excluded.doctor_id,
+                prediction_timestamp = excluded.prediction_timestamp, predicted_class = excluded.predicted_class,
+                prediction_probability = excluded.prediction_probability
+            WHERE (excluded.prediction_timestamp, excluded.prediction_id) > (prediction_timestamp, prediction_id);""")
+    else:
+        # If it was the latest, fall back to the patient's next newest prediction (one index seek)
+        statements.append(f"""
+            DELETE FROM patient_latest_prediction WHERE patient_id = {row}.patient_id AND prediction_id = {row}.prediction_id;""")
+        statements.append(f"""
+            INSERT INTO patient_latest_prediction (patient_id, prediction_id, doctor_id, prediction_timestamp,
+                                                   predicted_class, prediction_probability)
+            SELECT patient_id, prediction_id, doctor_id, prediction_timestamp, predicted_class, prediction_probability
+            FROM predictions
+            WHERE patient_id = {row}.patient_id
+              AND NOT EXISTS (SELECT 1 FROM patient_latest_prediction WHERE patient_id = {row}.patient_id)
+            ORDER BY prediction_timestamp DESC, prediction_id DESC
+            LIMIT 1;""")
+    return statements
+
+
+def _assignment_counted(row, delta):
+    return [
+        _add('doctor_assignment_counts', {'doctor_id': f'{row}.doctor_id', 'status': f'{row}.status'}, 'assignments', delta),
+        _add('system_totals', {'name': f"'assignments.status:' || {row}.status"}, 'value', delta),
+    ]
+
+
+def _user_counted(row, delta):
+    return [
+        _add('system_totals', {'name': f"'users.role:' || {row}.role"}, 'value', delta),
+        _add('system_totals', {'name': f"'users.status:' || {row}.status"}, 'value', delta),
+    ]
+
+
+def _latest_counted(row, delta):
+    return [_add('system_totals', {'name': f"'patients.latest:' || {row}.predicted_class"}, 'value', delta)]
+
+
+def _summary_trigger(table, event, body, when=None):
+    """A trigger named {table}_summary_{insert|delete|update} running the `body` statements after `event`, optionally only `when`."""
+    body = "\n".join(textwrap.indent(textwrap.dedent(statement).strip(), '    ') for statement in body)
+    condition = f" WHEN {when}" if when else ""
+    return (f"CREATE TRIGGER IF NOT EXISTS {table}_summary_{event.split()[0].lower()} AFTER {event} ON {table}{condition} "
+            f"BEGIN\n{body}\nEND")
+
+
+def _summary_triggers(table, counted, columns):
+    """INSERT, DELETE and UPDATE OF `columns` triggers on `table` applying `counted(row, delta)`."""
+    return [
+        _summary_trigger(table, 'INSERT', counted('new', 1)),
+        _summary_trigger(table, 'DELETE', counted('old', -1)),
+        _summary_trigger(table, f"UPDATE OF {', '.join(columns)}", counted('old', -1) + counted('new', 1)),
+    ]
+
+
+# --- Short Name Search ---
+# Names are indexed up to this many characters by the one- and two-character substring index
+NAME_GRAM_MAX_LENGTH = 128
+
+
+def _name_grams(names):
+    """A statement indexing every one- and two-character substring of `names`, a query yielding (field, name, user_id)."""
+    return f"""
+        INSERT OR IGNORE INTO users_name_grams (field, gram, user_id)
+        SELECT f.field, lower(substr(f.name, p.n, g.len)), f.user_id
+        FROM ({names}) AS f
+        JOIN (SELECT 1 AS len UNION ALL SELECT 2) AS g
+        JOIN name_gram_positions p ON p.n <= length(f.name) - g.len + 1
+    """
+
+
+# Indexes the names of the users added after user_id :after (bulk_create_users fills the index in one pass)
+INDEX_USER_NAMES_AFTER = _name_grams(
+    "SELECT 'username' AS field, username AS name, user_id FROM users WHERE user_id > :after "
+    "UNION ALL SELECT 'full_name', full_name, user_id FROM users WHERE user_id > :after")
+_INDEX_NEW_USER_NAMES = _name_grams(
+    "SELECT 'username' AS field, new.username AS name, new.user_id AS user_id "
+    "UNION ALL SELECT 'full_name', new.full_name, new.user_id")
+
+
+# --- Migrations ---
+# Ordered (version, name, statements). Applied versions are recorded in `schema_migrations`;
+# never edit a released migration, append a new one instead.
+MIGRATIONS = [
+    (1, 'dashboard indexes', [
+        # A doctor/patient pair has at most one assignment; keep the active one (or the oldest request) of any duplicates
+        """
+        DELETE FROM doctor_patient_assignments WHERE assignment_id NOT IN (
+            SELECT assignment_id FROM (
+                SELECT assignment_id, ROW_NUMBER() OVER (
+                    PARTITION BY doctor_id, patient_id ORDER BY status = 'active' DESC, assignment_id
+                ) AS rn
+                FROM doctor_patient_assignments
+            ) WHERE rn = 1
+        )
+        """,
+        # create_assignment_request, and the doctor side of the ON DELETE CASCADE
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_assignments_doctor_patient ON doctor_patient_assignments(doctor_id, patient_id)",
+        # get_assigned_patients / get_patient_requests: doctor + status, with patient_id for the join
+        "CREATE INDEX IF NOT EXISTS idx_assignments_doctor_status ON doctor_patient_assignments(doctor_id, status, patient_id)",
+        # find_available_doctors (NOT IN subquery), and the patient side of the ON DELETE CASCADE
+        "CREATE INDEX IF NOT EXISTS idx_assignments_patient ON doctor_patient_assignments(patient_id, doctor_id)",
+        # get_patient_records: a doctor's predictions, newest first, without a sort step
+        "CREATE INDEX IF NOT EXISTS idx_predictions_doctor_time ON predictions(doctor_id, prediction_timestamp DESC)",
+        # get_history_summary / get_history_by_patient_id / get_history_by_doctor
+        "CREATE INDEX IF NOT EXISTS idx_predictions_patient_time ON predictions(patient_id, prediction_timestamp DESC)",
+        # get_pending_doctors / find_available_doctors
+        "CREATE INDEX IF NOT EXISTS idx_users_role_status ON users(role, status)",
+    ]),
+    (2, 'keyset pagination tie-breakers', [
+        # Keyset pages order by (timestamp, id) and requests by assignment_id; the indexes must match to avoid a sort
+        "DROP INDEX IF EXISTS idx_predictions_doctor_time",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_doctor_time ON predictions(doctor_id, prediction_timestamp DESC, prediction_id DESC)",
+        "DROP INDEX IF EXISTS idx_predictions_patient_time",
+        "CREATE INDEX IF NOT EXISTS idx_predictions_patient_time ON predictions(patient_id, prediction_timestamp DESC, prediction_id DESC)",
+        "DROP INDEX IF EXISTS idx_assignments_doctor_status",
+        "CREATE INDEX IF NOT EXISTS idx_assignments_doctor_status ON doctor_patient_assignments(doctor_id, status, assignment_id, patient_id)",
+    ]),
+    (3, 'name search indexes', [
+        # Full-text indexes over the users' names, stored as external content (no copy of the names themselves).
+        # Trigrams answer substring searches of three or more characters, in any script;
+        # the word-prefix index answers the shorter ones.
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_name_trigram USING fts5("
+        "username, full_name, content='users', content_rowid='user_id', tokenize='trigram')",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_name_prefix USING fts5("
+        "username, full_name, content='users', content_rowid='user_id', prefix='1 2')",
+        # Keep both indexes in step with the users table
+        """
+        CREATE TRIGGER IF NOT EXISTS users_name_search_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_name_trigram(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+            INSERT INTO users_name_prefix(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_name_search_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_name_trigram(users_name_trigram, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+            INSERT INTO users_name_prefix(users_name_prefix, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_name_search_update AFTER UPDATE OF username, full_name ON users BEGIN
+            INSERT INTO users_name_trigram(users_name_trigram, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+            INSERT INTO users_name_prefix(users_name_prefix, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+            INSERT INTO users_name_trigram(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+            INSERT INTO users_name_prefix(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+        END
+        """,
+        # Index the users that already exist
+        "INSERT INTO users_name_trigram(users_name_trigram) VALUES ('rebuild')",
+        "INSERT INTO users_name_prefix(users_name_prefix) VALUES ('rebuild')",
+    ]),
+    (4, 'table version counters', [
+        # One counter per table, bumped in the same transaction as every write to it. The query cache
+        # compares them to tell which cached reads are stale, whichever process or connection wrote.
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name  TEXT PRIMARY KEY,
+            version     INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO table_versions (table_name) VALUES ('users'), ('doctor_patient_assignments'), ('predictions')",
+        *[f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+        END
+        """ for table in ('users', 'doctor_patient_assignments', 'predictions') for event in ('INSERT', 'UPDATE', 'DELETE')],
+    ]),
+    (5, 'dashboard summary tables', [
+        # Aggregates the dashboards read instead of scanning predictions and assignments. Triggers keep
+        # them exact in the same transaction as every write (cascaded deletes included);
+        # `python summary_tables.py check` recomputes them from scratch and reports any difference.
+        """
+        CREATE TABLE IF NOT EXISTS doctor_risk_counts (
+            doctor_id       INTEGER NOT NULL,
+            predicted_class TEXT NOT NULL,
+            predictions     INTEGER NOT NULL,
+            PRIMARY KEY (doctor_id, predicted_class)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS doctor_assignment_counts (
+            doctor_id   INTEGER NOT NULL,
+            status      TEXT NOT NULL,
+            assignments INTEGER NOT NULL,
+            PRIMARY KEY (doctor_id, status)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS patient_latest_prediction (
+            patient_id              INTEGER PRIMARY KEY,
+            prediction_id           INTEGER NOT NULL,
+            doctor_id               INTEGER NOT NULL,
+            prediction_timestamp    DATETIME,
+            predicted_class         TEXT NOT NULL,
+            prediction_probability  REAL NOT NULL
+        )
+        """,
+        # Patients whose latest prediction is in a risk class, in patient order
+        "CREATE INDEX IF NOT EXISTS idx_latest_prediction_class ON patient_latest_prediction(predicted_class)",
+        # System-wide counters, named '<what>:<value>' (e.g. 'users.role:doctor', 'predictions.class:High Risk')
+        """
+        CREATE TABLE IF NOT EXISTS system_totals (
+            name    TEXT PRIMARY KEY,
+            value   INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        *_summary_triggers('predictions', _prediction_counted,
+                           ['doctor_id', 'patient_id', 'prediction_timestamp', 'predicted_class', 'prediction_probability']),
+        *_summary_triggers('doctor_patient_assignments', _assignment_counted, ['doctor_id', 'status']),
+        *_summary_triggers('users', _user_counted, ['role', 'status']),
+        *_summary_triggers('patient_latest_prediction', _latest_counted, ['predicted_class']),
+        # Summarize the rows that already exist
+        *REBUILD_STATEMENTS,
+    ]),
+    (6, 'prediction archive', [
+        # Old predictions move to one archive file per year (see archive.py); these tables, kept in the
+        # main database, say where they went without opening the archives.
+        # One row per archive file, named relative to the database's directory
+        """
+        CREATE TABLE IF NOT EXISTS prediction_archives (
+            year                INTEGER PRIMARY KEY,
+            file                TEXT NOT NULL,
+            predictions         INTEGER NOT NULL DEFAULT 0,
+            oldest              DATETIME,
+            newest              DATETIME,
+            first_prediction_id INTEGER,
+            last_prediction_id  INTEGER
+        )
+        """,
+        # Archived predictions per patient, year and doctor: the history lists' totals, and which
+        # archives hold any of a patient's or doctor's predictions
+        """
+        CREATE TABLE IF NOT EXISTS archived_prediction_counts (
+            patient_id  INTEGER NOT NULL,
+            year        INTEGER NOT NULL,
+            doctor_id   INTEGER NOT NULL,
+            predictions INTEGER NOT NULL,
+            PRIMARY KEY (patient_id, year, doctor_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_archived_counts_doctor ON archived_prediction_counts(doctor_id, year)",
+        # Set by the archival job while it deletes the predictions it has copied to an archive
+        """
+        CREATE TABLE IF NOT EXISTS archive_state (
+            id      INTEGER PRIMARY KEY CHECK (id = 1),
+            moving  INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO archive_state (id) VALUES (1)",
+        # Archived predictions stay counted in the summary tables, so moving them is not a delete
+        "DROP TRIGGER IF EXISTS predictions_summary_delete",
+        _summary_trigger('predictions', 'DELETE', _prediction_counted('old', -1),
+                         when="(SELECT moving FROM archive_state) = 0"),
+    ]),
+    (7, 'short name search index', [
+        # Every one- and two-character substring of each name, lower-cased: searches of one or two
+        # characters (a Chinese given name such as 明 or 小明) look their term up here, matching anywhere
+        # in the name like LIKE '%term%'. It replaces the word-prefix index, which only matched the
+        # start of a word. Longer terms stay on the trigram index.
+        "CREATE TABLE IF NOT EXISTS name_gram_positions (n INTEGER PRIMARY KEY)",
+        f"""
+        INSERT OR IGNORE INTO name_gram_positions (n)
+        WITH RECURSIVE positions(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM positions WHERE n < {NAME_GRAM_MAX_LENGTH})
+        SELECT n FROM positions
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS users_name_grams (
+            field   TEXT NOT NULL CHECK(field IN ('username', 'full_name')),
+            gram    TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (field, gram, user_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_users_name_grams_user ON users_name_grams(user_id)",
+        "DROP TRIGGER IF EXISTS users_name_search_insert",
+        "DROP TRIGGER IF EXISTS users_name_search_delete",
+        "DROP TRIGGER IF EXISTS users_name_search_update",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS users_name_search_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_name_trigram(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+            {_INDEX_NEW_USER_NAMES.strip()};
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_name_search_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_name_trigram(users_name_trigram, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+            DELETE FROM users_name_grams WHERE user_id = old.user_id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS users_name_search_update AFTER UPDATE OF username, full_name ON users BEGIN
+            INSERT INTO users_name_trigram(users_name_trigram, rowid, username, full_name)
+                VALUES ('delete', old.user_id, old.username, old.full_name);
+            INSERT INTO users_name_trigram(rowid, username, full_name) VALUES (new.user_id, new.username, new.full_name);
+            DELETE FROM users_name_grams WHERE user_id = old.user_id;
+            {_INDEX_NEW_USER_NAMES.strip()};
+        END
+        """,
+        "DROP TABLE IF EXISTS users_name_prefix",
+        # Index the users that already exist
+        INDEX_USER_NAMES_AFTER.replace(':after', '0'),
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            name        TEXT NOT NULL,
+            applied_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+
+def current_version(conn):
+    """Returns the highest applied migration version (0 for a database that was never migrated)."""
+    _ensure_version_table(conn)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()[0]
+
+
+def apply_migrations(conn, migrations=MIGRATIONS):
+    """
+    Applies every migration newer than the database's version, in order.
+
+    Each migration runs in its own IMMEDIATE transaction and re-checks the version
+    inside it, so several processes starting at once apply each migration exactly once.
+
+    Returns:
+        list[int]: The versions applied by this call.
+    """
+    _ensure_version_table(conn)
+    applied = []
+    for version, name, statements in sorted(migrations, key=lambda m: m[0]):
+        if version <= current_version(conn):
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            already = conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone()
+            if not already:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+                applied.append(version)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        if not already:
+            print(f"Applied migration {version}: {name}")
+    return applied
+
+
+# --- Query Plan Check ---
+# DatabaseManager methods that run on every dashboard render, with the arguments to call them with.
+# Paginated list methods are checked both for the first page and for a page after a keyset cursor.
+# Name searches are checked with a trigram-length term and a short (Chinese given name) term. The full user listing is excluded: it scans by design.
+_PAGE = {'page_size': 10}
+_AFTER_PREDICTION = {'page_size': 10, 'cursor': ('2100-01-01 00:00:00', 1_000_000)}
+_AFTER_ID = {'page_size': 10, 'cursor': (0,)}
+HOT_QUERIES = [
+    ('get_user_fullname', lambda ids: (ids['doctor'],), {}),
+    ('get_user_for_authentication', lambda ids: ('check_doctor',), {}),
+    ('get_pending_doctors', lambda ids: (), {}),
+    ('get_pending_doctors', lambda ids: (), _AFTER_ID),
+    ('get_history_summary', lambda ids: (ids['patient'],), {}),
+    ('get_history_summary', lambda ids: (ids['patient'],), _AFTER_PREDICTION),
+    ('get_patient_details', lambda ids: (1,), {}),
+    ('get_history_by_patient_id', lambda ids: (ids['patient'],), {}),
+    ('get_history_by_patient_id', lambda ids: (ids['patient'],), _AFTER_PREDICTION),
+    ('get_risk_trend', lambda ids: (ids['patient'],), {}),
+    ('find_available_doctors', lambda ids: (ids['patient'],), {}),
+    ('find_available_doctors', lambda ids: (ids['patient'],), _AFTER_ID),
+    ('get_assigned_patients', lambda ids: (ids['doctor'],), {}),
+    ('get_patient_by_id', lambda ids: (ids['patient'],), {}),
+    ('get_patient_records', lambda ids: (ids['doctor'],), {}),
+    ('get_patient_records', lambda ids: (ids['doctor'],), _PAGE),
+    ('get_patient_records', lambda ids: (ids['doctor'],), _AFTER_PREDICTION),
+    ('get_patient_requests', lambda ids: (ids['doctor'],), {}),
+    ('get_patient_requests', lambda ids: (ids['doctor'],), _AFTER_ID),
+    ('search_by_username', lambda ids: ('check',), _PAGE),
+    ('search_by_username', lambda ids: ('ch',), _AFTER_ID),
+    ('search_by_username', lambda ids: ('明',), _PAGE),
+    ('search_patients_by_name', lambda ids: (ids['doctor'], 'Patient'), _PAGE),
+    ('search_patients_by_name', lambda ids: (ids['doctor'], 'Pa'), _AFTER_PREDICTION),
+    ('search_patients_by_name', lambda ids: (ids['doctor'], '小明'), _PAGE),
+    ('search_available_by_doctor_name', lambda ids: ('Doctor',), _PAGE),
+    ('search_available_by_doctor_name', lambda ids: ('Do',), _AFTER_ID),
+    ('search_available_by_doctor_name', lambda ids: ('小明',), _PAGE),
+    ('search_available_by_doctor_name', lambda ids: ('明',), _AFTER_ID),
+    ('search_requests_by_patient_name', lambda ids: (ids['doctor'], 'Patient'), _PAGE),
+    ('search_requests_by_patient_name', lambda ids: (ids['doctor'], 'Pa'), _AFTER_ID),
+    ('search_requests_by_patient_name', lambda ids: (ids['doctor'], '明'), _PAGE),
+    ('get_history_by_doctor', lambda ids: (ids['patient'], 'Doctor'), _PAGE),
+    ('get_history_by_doctor', lambda ids: (ids['patient'], 'Do'), _AFTER_PREDICTION),
+    ('get_history_by_doctor', lambda ids: (ids['patient'], '小明'), _PAGE),
+    ('get_system_totals', lambda ids: (), {}),
+    ('get_doctor_summaries', lambda ids: (), _PAGE),
+    ('get_doctor_summaries', lambda ids: (), _AFTER_ID),
+    ('get_latest_predictions', lambda ids: ('Low Risk',), _PAGE),
+    ('get_latest_predictions', lambda ids: ('Low Risk',), _AFTER_ID),
+]
+
+
+# Tables whose size does not grow with the data (one row per counter or archive year), so reading them whole is fine
+BOUNDED_TABLES = ['system_totals', 'prediction_archives']
+
+
+def _plan_problems(conn, sql):
+    """Lists the full scans and temporary sorts in the query plan of one statement."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    # Scanning a subquery's result (as in a capped COUNT) reads no table by itself,
+    # and a full-text table "scanned" with a MATCH constraint (":M") is an index lookup
+    return [row[3] for row in plan
+            if (row[3].startswith('SCAN') and not row[3].startswith('SCAN (subquery')
+                and not ('VIRTUAL TABLE' in row[3] and ':M' in row[3])
+                and row[3].split()[1] not in BOUNDED_TABLES)
+            or 'TEMP B-TREE' in row[3]]
+
+
+def check_query_plans():
+    """
+    Runs every hot DatabaseManager method against a migrated scratch database,
+    captures the SQL it executes and checks its EXPLAIN QUERY PLAN.
+
+    Returns:
+        dict: method call label -> list of (sql, problems); empty problem lists pass.
+    """
+    from database import DatabaseManager
+    from models import Prediction
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(os.path.join(tmp, 'plan_check.db'), use_pool=False, use_cache=False)
+        db_manager.create_tables()
+        db_manager.create_user('check_doctor', 'x', 'Check Doctor', 'doctor', 'CHECK-D', '1980-01-01')
+        db_manager.create_user('check_patient', 'x', 'Check Patient', 'patient', 'CHECK-P', '1980-01-01')
+        ids = {role: db_manager.get_user_for_authentication(f'check_{role}')['user_id'] for role in ('doctor', 'patient')}
+        db_manager.create_assignment_request(ids['doctor'], ids['patient'])
+        db_manager.log_prediction(Prediction(
+            doctor_id=ids['doctor'], patient_id=ids['patient'], age=50, cancer_stage='I', tumor_size=1.0,
+            tumor_type='Lung', metastasis='No', treatment_type='Surgery', comorbidities='Hypertension',
+            predicted_class='Low Risk', prediction_probability=0.1,
+        ))
+
+        conn = db_manager.conn
+        for method, make_args, kwargs in HOT_QUERIES:
+            statements = []
+            conn.set_trace_callback(statements.append)
+            args = make_args(ids)
+            getattr(db_manager, method)(*args, **kwargs)
+            conn.set_trace_callback(None)
+            # Search terms are part of the label: each method is checked with a long and a short one
+            terms = [repr(arg) for arg in args if isinstance(arg, str)]
+            label = method + (f" {', '.join(terms)}" if terms else "") + (f" ({', '.join(kwargs)})" if kwargs else "")
+            report[label] = [(sql, _plan_problems(conn, sql)) for sql in statements
+                             if sql.lstrip().upper().startswith('SELECT')]
+        db_manager.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage schema migrations and check query plans.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    status = subparsers.add_parser('status', help="Show applied and pending migrations")
+    status.add_argument('--db', default=DB_PATH)
+    migrate = subparsers.add_parser('migrate', help="Apply pending migrations")
+    migrate.add_argument('--db', default=DB_PATH)
+    subparsers.add_parser('check', help="Fail if a hot dashboard query scans a table or sorts in a temp b-tree")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'check':
+        report = check_query_plans()
+        failures = 0
+        for method, statements in report.items():
+            problems = [p for _, plan in statements for p in plan]
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok':<6}{method}" + (f": {'; '.join(problems)}" if problems else ""))
+        print(f"\n{len(report) - failures}/{len(report)} hot queries use indexes only.")
+        raise SystemExit(1 if failures else 0)
+
+    conn = sqlite3.connect(args.db)
+    if args.command == 'migrate':
+        applied = apply_migrations(conn)
+        print(f"Applied {len(applied)} migration(s); schema version {current_version(conn)}.")
+    else:
+        version = current_version(conn)
+        for number, name, _ in MIGRATIONS:
+            print(f"{'applied' if number <= version else 'pending':<9}{number:>4}  {name}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
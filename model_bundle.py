@@ -0,0 +1,241 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from configs import MODEL_DIR, MODEL_BUNDLE_PATH as BUNDLE_PATH
+from feature_plan import FeaturePlan
+from tree_ensemble import TreeEnsemble
+
+SOURCE_FILES = ['XGB_cancer.pkl', 'label_encoders.pkl', 'one_hot_encoders.pkl', 'scaler.pkl']
+
+# --- File Layout ---
+# MAGIC | <format_version: u32> <header_length: u32> | JSON header | padding | 64-byte aligned arrays
+# Array offsets in the header are relative to the start of the (aligned) data section.
+MAGIC = b'CRPBNDL\x00'
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<II')
+
+
+def _align(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _sha256_file(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def source_fingerprint(model_dir=MODEL_DIR):
+    """SHA-256 over the pickled artifacts; identifies the model when it is loaded from the pickles."""
+    digest = hashlib.sha256()
+    for name in SOURCE_FILES:
+        digest.update(_sha256_file(os.path.join(model_dir, name)).encode())
+    return digest.hexdigest()
+
+
+def artifact_mtimes(model_dir=MODEL_DIR, path=BUNDLE_PATH):
+    """Modification times of the pickles and the bundle (None if absent); changes whenever an artifact is replaced."""
+    paths = [os.path.join(model_dir, name) for name in SOURCE_FILES] + [path]
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in paths)
+
+
+def _content_hash(header, data):
+    """Hash over the header (minus the hash field itself) and the raw data section."""
+    digest = hashlib.sha256(json.dumps({k: v for k, v in header.items() if k != 'content_sha256'}, sort_keys=True).encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """A memory-mapped, single-file view of the model and its preprocessing parameters."""
+
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a model bundle.")
+        version, header_length = _PREFIX.unpack_from(self._mmap, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model bundle version {version} (expected {FORMAT_VERSION}).")
+
+        header_start = len(MAGIC) + _PREFIX.size
+        self.header = json.loads(self._mmap[header_start:header_start + header_length])
+        self._data_offset = _align(header_start + header_length)
+        self.content_hash = self.header['content_sha256']
+        self.feature_plan = FeaturePlan.from_params(self.header['feature_plan'])
+        # The ensemble is evaluated in NumPy straight from the mapped node arrays; xgboost is never imported
+        tree_arrays = {name.split('/', 1)[1]: self.array(name) for name in self.header['arrays'] if name.startswith('trees/')}
+        self.model = TreeEnsemble.from_arrays(tree_arrays, self.header['model']['params'])
+
+    def array(self, name):
+        """Returns a zero-copy, read-only view of a stored array."""
+        spec = self.header['arrays'][name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        view = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=self._data_offset + spec['offset'])
+        return view.reshape(spec['shape'])
+
+    def verify(self):
+        """Recomputes the content hash over the whole file."""
+        return _content_hash(self.header, self._mmap[self._data_offset:]) == self.content_hash
+
+    def is_current(self, model_dir=MODEL_DIR):
+        """True if the bundle was exported from the pickles currently in `model_dir`."""
+        sources = self.header['sources']
+        return all(
+            os.path.exists(os.path.join(model_dir, name)) and _sha256_file(os.path.join(model_dir, name)) == digest
+            for name, digest in sources.items()
+        )
+
+    def artifacts(self):
+        """Returns the artifacts dict used by the prediction code paths."""
+        return {
+            'model': self.model,
+            'feature_plan': self.feature_plan,
+            'model_hash': self.content_hash,
+        }
+
+
+def export_bundle(artifacts, path=BUNDLE_PATH, model_dir=MODEL_DIR):
+    """
+    Writes the pickled artifacts as a single bundle file.
+
+    Args:
+        artifacts (dict): Output of `utils.read_model_artifacts`.
+        path (str): Destination file; written atomically.
+    """
+    ensemble = TreeEnsemble.from_xgboost(artifacts['model'].get_booster())
+    arrays = {f"trees/{name}": arr for name, arr in ensemble.arrays().items()}
+
+    # Lay out the data section
+    specs, chunks, offset = {}, [], 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        specs[name] = {'offset': offset, 'dtype': arr.dtype.str, 'shape': list(arr.shape)}
+        padded = _align(arr.nbytes)
+        chunks.append(arr.tobytes() + b'\x00' * (padded - arr.nbytes))
+        offset += padded
+    data = b''.join(chunks)
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'model': {'kind': 'tree-ensemble', 'classes': [0, 1], 'params': ensemble.params()},
+        'feature_plan': artifacts['feature_plan'].to_params(),
+        'arrays': specs,
+        'sources': {name: _sha256_file(os.path.join(model_dir, name)) for name in SOURCE_FILES},
+    }
+    header['content_sha256'] = _content_hash(header, data)
+    header_bytes = json.dumps(header).encode()
+
+    prefix = MAGIC + _PREFIX.pack(FORMAT_VERSION, len(header_bytes)) + header_bytes
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix + b'\x00' * (_align(len(prefix)) - len(prefix)))
+        f.write(data)
+    os.replace(tmp_path, path)
+    return header['content_sha256']
+
+
+def load_bundle_artifacts(path=BUNDLE_PATH):
+    """Returns artifacts from the bundle, or None if it is missing or out of date with the pickles."""
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = ModelBundle(path)
+    except (ValueError, KeyError, struct.error) as e:
+        # Older format versions and truncated files fall back to the pickles until re-exported
+        print(f"Cannot read model bundle {path} ({e}); re-run `python model_bundle.py export`.")
+        return None
+    if not bundle.is_current():
+        print(f"Model bundle {path} is out of date; re-run `python model_bundle.py export`.")
+        return None
+    return bundle.artifacts()
+
+
+# --- Cold Start Measurement ---
+_SAMPLE_FEATURES = {
+    'Age': 52, 'CancerStage': 'II', 'TumorSize': 5.0, 'TumorType': 'Lung',
+    'Metastasis': 'No', 'TreatmentType': 'Chemotherapy', 'Comorbidities': 'Hypertension'
+}
+
+
+def _rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _cold_start(mode):
+    """Loads the artifacts the given way and makes one prediction; prints timings as JSON."""
+    import pandas, streamlit  # noqa: F401,E401 -- already imported by every page, so excluded from the measurement
+    rss_before = _rss_kb()
+    start = time.perf_counter()
+    if mode == 'pickles':
+        from utils import read_model_artifacts
+        artifacts = read_model_artifacts()
+    else:
+        artifacts = ModelBundle(BUNDLE_PATH).artifacts()
+    loaded = time.perf_counter()
+    artifacts['model'].predict_proba(artifacts['feature_plan'].transform(_SAMPLE_FEATURES))
+    done = time.perf_counter()
+    print(json.dumps({
+        'load_ms': (loaded - start) * 1e3,
+        'first_prediction_ms': (done - loaded) * 1e3,
+        'rss_delta_mb': (_rss_kb() - rss_before) / 1024,
+    }))
+
+
+def compare_cold_start(runs=5):
+    """Measures load time, first-prediction time and resident memory in fresh processes."""
+    results = {}
+    for mode in ('pickles', 'bundle'):
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-W', 'ignore', __file__, '_cold_start', mode],
+                                 capture_output=True, text=True, check=True)
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        results[mode] = {key: float(np.median([s[key] for s in samples])) for key in samples[0]}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and inspect the single-file model bundle.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('export', help="Export the current pickles into a bundle")
+    subparsers.add_parser('verify', help="Check the bundle's content hash and source pickles")
+    bench = subparsers.add_parser('bench', help="Compare cold start of pickles vs bundle")
+    bench.add_argument('--runs', type=int, default=5)
+    cold = subparsers.add_parser('_cold_start')
+    cold.add_argument('mode', choices=['pickles', 'bundle'])
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        from utils import read_model_artifacts
+        content_hash = export_bundle(read_model_artifacts())
+        print(f"Exported {BUNDLE_PATH} ({os.path.getsize(BUNDLE_PATH) / 1024:.1f} KB, sha256 {content_hash[:16]}...)")
+    elif args.command == 'verify':
+        bundle = ModelBundle(BUNDLE_PATH)
+        print(f"Content hash valid: {bundle.verify()}")
+        print(f"Matches current pickles: {bundle.is_current()}")
+    elif args.command == 'bench':
+        results = compare_cold_start(args.runs)
+        print(f"{'':10}{'load (ms)':>12}{'1st pred (ms)':>16}{'RSS (MB)':>12}")
+        for mode, r in results.items():
+            print(f"{mode:10}{r['load_ms']:>12.1f}{r['first_prediction_ms']:>16.1f}{r['rss_delta_mb']:>12.1f}")
+    else:
+        _cold_start(args.mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,52 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from datetime import datetime, date
 
 
-@dataclass
+class _ParsedOnRead:
+    """
+    Wraps a slot that the database fills with a date string, parsing it on first read.
+
+    Most rows are only listed, counted or cached, so parsing every date as rows are
+    built is wasted work; the parsed value replaces the string in the slot.
+    """
+
+    def __init__(self, slot, parse):
+        self.slot = slot
+        self.parse = parse
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = self.slot.__get__(obj, owner)
+        if isinstance(value, str):
+            value = self.parse(value)
+            self.slot.__set__(obj, value)
+        return value
+
+    def __set__(self, obj, value):
+        self.slot.__set__(obj, value)
+
+
+def _parse_on_read(**parsers):
+    """Class decorator: parses the given string fields of a slotted dataclass on first read."""
+    def decorate(cls):
+        for name, parse in parsers.items():
+            setattr(cls, name, _ParsedOnRead(cls.__dict__[name], parse))
+        return cls
+    return decorate
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _parse_timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+@_parse_on_read(dob=_parse_date)
+@dataclass(slots=True)
 class User:
     """Data class representing a user in 'users' table."""
     username: str
@@ -14,16 +57,7 @@ class User:
     dob: date
     user_id: Optional[int] = None # Auto-incremented primary key
 
-    def __post_init__(self):
-        """
-        This method is called after the dataclass is initialized.
-        It ensures that the 'dob' attribute is a date object.
-        """
-        # Convert string date to date object if necessary
-        if isinstance(self.dob, str):
-            self.dob = datetime.strptime(self.dob, '%Y-%m-%d').date()
-
-@dataclass
+@dataclass(slots=True)
 class Assignment:
     """Data class representing a doctor-patient assignment."""
     doctor_id: int
@@ -35,7 +69,8 @@ class Assignment:
     patient_username: Optional[str] = None
     doctor_username: Optional[str] = None
 
-@dataclass
+@_parse_on_read(prediction_timestamp=_parse_timestamp)
+@dataclass(slots=True)
 class Prediction:
     """Data class representing a cancer risk prediction made by a doctor."""
     doctor_id: int
@@ -54,11 +89,34 @@ class Prediction:
     patient_name: Optional[str] = None
     doctor_name: Optional[str] = None
 
-    def __post_init__(self):
-        """
-        This method is called after the dataclass is initialized.
-        It ensures that the 'prediction_timestamp' attribute is a date object.
-        """
-        # Convert string date to date object if necessary
-        if isinstance(self.prediction_timestamp, str):
-            self.prediction_timestamp = datetime.strptime(self.prediction_timestamp, '%Y-%m-%d %H:%M:%S')
\ No newline at end of file
+@dataclass(slots=True)
+class DoctorSummary:
+    """Per-doctor prediction and assignment counts, read from the summary tables."""
+    doctor_id: int
+    doctor_name: str
+    low_risk: int = 0
+    medium_risk: int = 0
+    high_risk: int = 0
+    requested: int = 0 # Patient requests waiting for approval
+    active: int = 0 # Assigned patients
+
+@_parse_on_read(prediction_timestamp=_parse_timestamp)
+@dataclass(slots=True)
+class LatestPrediction:
+    """A patient's most recent prediction, read from 'patient_latest_prediction'."""
+    patient_id: int
+    prediction_id: int
+    doctor_id: int
+    prediction_timestamp: Optional[datetime]
+    predicted_class: str
+    prediction_probability: float
+    patient_name: Optional[str] = None
+    doctor_name: Optional[str] = None
+
+@dataclass(slots=True)
+class Page:
+    """One page of a keyset-paginated list."""
+    items: list = field(default_factory=list)
+    total: int = 0  # Matching rows, counted up to PAGINATION_COUNT_LIMIT
+    total_is_exact: bool = True  # False when `total` was capped
+    next_cursor: Optional[tuple] = None  # Pass back as `cursor` to fetch the following page; None on the last page
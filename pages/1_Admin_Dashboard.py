@@ -1,8 +1,10 @@
 import streamlit as st
 from database import DatabaseManager
-from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination
-from configs import UserRole, UserStatus, ITEMS_PER_PAGE
+from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination, get_page_cursor
+from configs import UserRole, UserStatus, ITEMS_PER_PAGE, BULK_IMPORT_COLUMNS, RISK_CLASSES
+from bulk_import import import_users
 import datetime
+import pandas as pd
 
 # --- Initialize Connection and UI Rendering ---
 page = render_sidebar_and_auth(UserRole.ADMIN)
@@ -19,6 +21,8 @@ if 'show_add_user_form' not in st.session_state:
     st.session_state.show_add_user_form = False
 if 'user_to_edit' not in st.session_state:
     st.session_state.user_to_edit = None
+if 'show_import_form' not in st.session_state:
+    st.session_state.show_import_form = False
 
 def clear_user_form_notifications():
     if "user_form_error" in st.session_state:
@@ -91,6 +95,40 @@ def show_add_user_form():
         
     st.divider()
 
+# --- Function to handle the "Import Users" form submission ---
+def show_import_users_form():
+    """Imports users from an uploaded CSV file in one transaction and keeps the rejected rows for display."""
+    st.divider()
+
+    with st.form("import_users_form"):
+        st.subheader("📥 Import Users from CSV")
+        st.caption(f"Columns: {', '.join(BULK_IMPORT_COLUMNS)}, and optionally status (defaults to active). Dates as YYYY-MM-DD.")
+        uploaded = st.file_uploader("CSV file", type="csv", label_visibility="collapsed")
+
+        col1, col2, _ = st.columns([1.5, 1, 4])
+        with col1:
+            import_clicked = st.form_submit_button("Import", use_container_width=True, type="primary")
+        with col2:
+            cancel_clicked = st.form_submit_button("Cancel", use_container_width=True)
+
+        if import_clicked and uploaded is not None:
+            result = import_users(db_manager, uploaded)
+            st.session_state.admin_notification = {"message": result["message"], "icon": "✅" if result["success"] else "❌"}
+            st.session_state.import_errors = result["errors"]
+            st.session_state.show_import_form = False
+            reset_pagination()
+            st.rerun()
+
+        if cancel_clicked:
+            st.session_state.show_import_form = False
+            st.rerun()
+
+    st.divider()
+
+def selected_ids(prefix, items):
+    """IDs of the items on the current page whose selection checkbox is ticked."""
+    return [item.user_id for item in items if st.session_state.get(f"{prefix}_{item.user_id}")]
+
 def show_edit_user_form(user):
     st.divider()
 
@@ -172,52 +210,66 @@ if page == "User Management":
     if 'page_number' not in st.session_state:
         st.session_state.page_number = 0
 
-    # Add user button and search bar
-    col1, col2, col3 = st.columns([4, 2, 3])
+    # Import and add user buttons and search bar
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 3])
     with col2:
+        if st.button("📥 Import CSV", use_container_width=True):
+            st.session_state.show_import_form = True
+            st.rerun()
+    with col3:
         if st.button("＋ Add Users", use_container_width=True):
             st.session_state['show_add_user_form'] = True
             st.rerun()
-    with col3:
+    with col4:
         search_query = st.text_input("Search by Username", placeholder="🔍 Search by Username", label_visibility="collapsed", on_change=reset_pagination)
 
     # Show the form if the button was clicked
-    if st.session_state.show_add_user_form:
+    if st.session_state.show_import_form:
+        show_import_users_form()
+    elif st.session_state.show_add_user_form:
         show_add_user_form()
     elif st.session_state.get('action') == 'edit' and st.session_state.get('user_to_edit'):
         show_edit_user_form(st.session_state.user_to_edit)
 
+    # Rows rejected by the last import
+    if st.session_state.get("import_errors"):
+        with st.expander(f"⚠️ {len(st.session_state.import_errors)} row(s) rejected by the last import", expanded=True):
+            st.dataframe(pd.DataFrame(st.session_state.import_errors, columns=["CSV Line", "Problem"]),
+                         hide_index=True, use_container_width=True)
+            if st.button("Dismiss"):
+                del st.session_state.import_errors
+                st.rerun()
+
     st.divider()
 
+    # Fetch only the current page, seeking from the page's cursor
     if search_query:
-        users = db_manager.search_by_username(search_query)
+        users = db_manager.search_by_username(search_query, cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
     else:
-        users = db_manager.get_all_users()
+        users = db_manager.get_all_users(cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
 
-    if users:
-        # Slice the users list for pagination
-        start_index = st.session_state.page_number * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-
-        users_to_display = users[start_index:end_index]
+    # An empty page past the first one is handled by render_pagination
+    if users.items or st.session_state.page_number > 0:
+        users_to_display = users.items
 
         # Display header
-        cols = st.columns([1, 2, 3, 2, 3, 2])
-        headers = ["ID", "Username", "Full Name", "Role", "Status", "Actions"]
+        cols = st.columns([0.5, 1, 2, 3, 2, 3, 2])
+        headers = ["", "ID", "Username", "Full Name", "Role", "Status", "Actions"]
         for col, header in zip(cols, headers):
             col.markdown(f"**{header}**")
         st.divider()
 
         # Display user data
         for user in users_to_display:
-            cols = st.columns([1, 2, 3, 2, 3, 2])
-            cols[0].write(user.user_id)
-            cols[1].write(user.username)
-            cols[2].write(user.full_name)
-            cols[3].write(user.role)
-            cols[4].write(user.status)
-
-            with cols[5]:
+            cols = st.columns([0.5, 1, 2, 3, 2, 3, 2])
+            cols[0].checkbox("Select", key=f"select_user_{user.user_id}", label_visibility="collapsed")
+            cols[1].write(user.user_id)
+            cols[2].write(user.username)
+            cols[3].write(user.full_name)
+            cols[4].write(user.role)
+            cols[5].write(user.status)
+
+            with cols[6]:
                 action_cols = st.columns(2)
                 # if action_cols[0].button("👁️", key=f"view_{user.user_id}", help="View User Details"):
                 #     pass
@@ -229,9 +281,17 @@ if page == "User Management":
                     result = db_manager.delete_user(user.user_id)
                     st.session_state.admin_notification = {"message": result.get("message"), "icon": "✅" if result.get("success") else "❌"}
                     st.rerun()
+
+        # Bulk actions on the selected users of this page
+        selected = selected_ids("select_user", users_to_display)
+        if selected:
+            if st.button(f"🗑️ Delete {len(selected)} selected", type="primary"):
+                result = db_manager.delete_users(selected)
+                st.session_state.admin_notification = {"message": result.get("message"), "icon": "✅" if result.get("success") else "❌"}
+                st.rerun()
             
         # Render pagination controls
-        render_pagination(len(users), ITEMS_PER_PAGE)
+        render_pagination(users, ITEMS_PER_PAGE)
 
     else:
         st.info("No users found.")
@@ -242,31 +302,28 @@ elif page == "Doctor Approvals":
     if 'page_number' not in st.session_state:
         st.session_state.page_number = 0
     
-    pending_doctors = db_manager.get_pending_doctors()
-    if not pending_doctors:
+    pending_doctors = db_manager.get_pending_doctors(cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
+    if not pending_doctors.items and st.session_state.page_number == 0:
         st.info("No pending doctor approvals.")
     else:
-        # Slice the pending_doctors list for pagination
-        start_index = st.session_state.page_number * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-
-        doctor_to_display = pending_doctors[start_index:end_index]
+        doctor_to_display = pending_doctors.items
 
         # Display header
-        cols = st.columns([1, 2, 3, 3, 2])
-        headers = ["ID", "Username", "Full Name", "ID Number", "Actions"]
+        cols = st.columns([0.5, 1, 2, 3, 3, 2])
+        headers = ["", "ID", "Username", "Full Name", "ID Number", "Actions"]
         for col, header in zip(cols, headers):
             col.markdown(f"**{header}**")
 
         # Display doctor data
         for doctor in doctor_to_display:
-            cols = st.columns([1, 2, 3, 3, 2])
-            cols[0].markdown(f"**{doctor.user_id}**")
-            cols[1].markdown(f"**{doctor.username}**")
-            cols[2].markdown(f"**{doctor.full_name}**")
-            cols[3].markdown(f"**{doctor.id_number}**")
+            cols = st.columns([0.5, 1, 2, 3, 3, 2])
+            cols[0].checkbox("Select", key=f"select_doctor_{doctor.user_id}", label_visibility="collapsed")
+            cols[1].markdown(f"**{doctor.user_id}**")
+            cols[2].markdown(f"**{doctor.username}**")
+            cols[3].markdown(f"**{doctor.full_name}**")
+            cols[4].markdown(f"**{doctor.id_number}**")
 
-            with cols[4]:
+            with cols[5]:
                 action_cols = st.columns(2)
                 with action_cols[0]:
                     if st.button("✔️", key=f"approve_{doctor.user_id}", use_container_width=True, help="Approve Doctor"):
@@ -279,7 +336,69 @@ elif page == "Doctor Approvals":
                         st.session_state.admin_notification = {"message": f"Registration for Dr. {doctor.full_name} has been rejected.", "icon": "ℹ️"}
                         st.rerun()
 
+        # Bulk actions on the selected doctors of this page
+        selected = selected_ids("select_doctor", doctor_to_display)
+        if selected:
+            bulk_cols = st.columns([2, 2, 4])
+            if bulk_cols[0].button(f"✔️ Approve {len(selected)} selected", use_container_width=True, type="primary"):
+                result = db_manager.approve_doctors(selected)
+                st.session_state.admin_notification = {"message": result.get("message"), "icon": "✅"}
+                st.rerun()
+            if bulk_cols[1].button(f"❌ Reject {len(selected)} selected", use_container_width=True):
+                result = db_manager.reject_doctors(selected)
+                st.session_state.admin_notification = {"message": result.get("message"), "icon": "ℹ️"}
+                st.rerun()
+
         st.divider()
 
         # Render pagination controls
-        render_pagination(len(pending_doctors), ITEMS_PER_PAGE)
\ No newline at end of file
+        render_pagination(pending_doctors, ITEMS_PER_PAGE)
+
+elif page == "System Overview":
+    # Everything here is read from the trigger-maintained summary tables, never from the raw predictions
+    totals = db_manager.get_system_totals()
+
+    def total(prefix, value=None):
+        """One counter, or the sum of every counter under `prefix` when no value is given."""
+        if value is not None:
+            return totals.get(f"{prefix}:{value}", 0)
+        return sum(count for name, count in totals.items() if name.startswith(prefix + ':'))
+
+    # --- System-wide totals ---
+    cols = st.columns(4)
+    cols[0].metric("Users", f"{total('users.role'):,}")
+    cols[1].metric("Doctors", f"{total('users.role', UserRole.DOCTOR.value):,}")
+    cols[2].metric("Patients", f"{total('users.role', UserRole.PATIENT.value):,}")
+    cols[3].metric("Predictions", f"{total('predictions.class'):,}")
+    cols = st.columns(4)
+    cols[0].metric("Active Assignments", f"{total('assignments.status', UserStatus.ACTIVE.value):,}")
+    cols[1].metric("Pending Requests", f"{total('assignments.status', UserStatus.REQUESTED.value):,}")
+    cols[2].metric("Pending Doctor Approvals", f"{total('users.status', UserStatus.PENDING_APPROVAL.value):,}")
+
+    # --- Risk distribution ---
+    st.subheader("Risk Distribution")
+    st.bar_chart(pd.DataFrame({
+        "All Predictions": [total('predictions.class', risk) for risk in RISK_CLASSES],
+        "Patients (Latest Prediction)": [total('patients.latest', risk) for risk in RISK_CLASSES],
+    }, index=RISK_CLASSES), stack=False)
+
+    st.divider()
+
+    # --- Paged details ---
+    view = st.selectbox("Show", ["Doctors"] + [f"Patients at {risk} (latest prediction)" for risk in reversed(RISK_CLASSES)],
+                        on_change=reset_pagination)
+    if view == "Doctors":
+        summaries = db_manager.get_doctor_summaries(cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
+        rows = [{"ID": s.doctor_id, "Doctor": s.doctor_name, "Low Risk": s.low_risk, "Medium Risk": s.medium_risk,
+                 "High Risk": s.high_risk, "Patients": s.active, "Pending Requests": s.requested} for s in summaries.items]
+    else:
+        risk = next(risk for risk in RISK_CLASSES if f" {risk} " in view)
+        summaries = db_manager.get_latest_predictions(risk, cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
+        rows = [{"Patient ID": p.patient_id, "Patient": p.patient_name, "Assessed by": f"Dr. {p.doctor_name}",
+                 "Date": p.prediction_timestamp, "Probability": f"{p.prediction_probability:.1%}"} for p in summaries.items]
+
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    elif st.session_state.get('page_number', 0) == 0:
+        st.info("Nothing to show yet.")
+    render_pagination(summaries, ITEMS_PER_PAGE)
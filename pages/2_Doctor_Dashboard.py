@@ -1,15 +1,32 @@
 import streamlit as st
 from database import DatabaseManager
-from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination
-from configs import UserRole, HIGH_RISK_THRESHOLD, LOW_RISK_THRESHOLD, ITEMS_PER_PAGE
+from async_database import AsyncDatabaseManager
+from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination, get_page_cursor
+from configs import (UserRole, ITEMS_PER_PAGE, USE_RISK_TABLE, USE_INFERENCE_SERVER, CANCER_STAGES, TUMOR_TYPES, METASTASIS_OPTIONS,
+                     TREATMENT_TYPES, COMORBIDITIES, TUMOR_SIZE_RANGE)
 from models import Prediction
-import pandas as pd
-from utils import load_model_artifacts, preprocess_for_prediction, to_float, highlight_risk, calculate_age, get_risk_emoji
+from risk_table import load_risk_table
+from inference_server import InferenceClient
+from prediction_cache import PredictionCache, normalize_features, prediction_key
+from similar_patients import load_similar_patients_index
+from utils import (load_model_artifacts, preprocess_for_prediction, classify_risk, to_float, highlight_risk, calculate_age, get_risk_emoji,
+                   score_treatment_options)
 
 
 # --- Initialize Connection and UI Rendering ---
 page = render_sidebar_and_auth(UserRole.DOCTOR)
 db_manager = DatabaseManager()
+async_db = AsyncDatabaseManager()
+
+@st.cache_resource
+def get_inference_client():
+    """One client per server process; each script thread keeps its own socket connection."""
+    return InferenceClient()
+
+@st.cache_resource
+def get_prediction_cache():
+    """One prediction cache shared by every session in this server process."""
+    return PredictionCache()
 
 # Details for viewing a specific patient's history function
 def show_patient_details(patient_id, patient_name):
@@ -19,35 +36,33 @@ def show_patient_details(patient_id, patient_name):
     if st.button("← Back to Main Dashboard"):
         st.session_state.viewing_patient_id = None
         st.session_state.viewing_patient_name = None
+        reset_pagination()
         st.rerun()
 
     st.divider()
 
-    patient_history = db_manager.get_history_by_patient_id(patient_id)
-    if not patient_history:
+    # The chart and the current page of the table are independent, so both are read at once on the reader threads
+    cursor = get_page_cursor()
+    reads = async_db.read_all(
+        risk_trend=lambda db: db.get_risk_trend(patient_id),  # Sorted oldest first by the database
+        history_page=lambda db: db.get_history_by_patient_id(patient_id, cursor=cursor, page_size=ITEMS_PER_PAGE),
+    )
+    risk_trend, history_page = reads['risk_trend'], reads['history_page']
+    if risk_trend.empty:
         st.info("No prediction history found for this patient.")
         return
 
     # --- Create and Display the Visualization ---
     st.subheader("Risk Trend Over Time")
-    chart_data = pd.DataFrame(patient_history)
-    chart_data['prediction_timestamp'] = pd.to_datetime(chart_data['prediction_timestamp'])
-    chart_data = chart_data.sort_values(by='prediction_timestamp') # Ensure data is sorted for the chart
-    chart_data.set_index('prediction_timestamp', inplace=True)
-    chart_data = chart_data[['prediction_probability']].rename(columns={'prediction_probability': 'Risk Probability'})
+    chart_data = risk_trend.rename(columns={'prediction_probability': 'Risk Probability'})
     
     st.line_chart(chart_data)
     
     # --- Display the Detailed Table ---
     st.subheader("Detailed History")
 
-    # 1. Slice the patient_history for pagination
-    start_index = st.session_state.page_number * ITEMS_PER_PAGE
-    end_index = start_index + ITEMS_PER_PAGE
-    history_to_display = patient_history[start_index:end_index]
-
-    # 2. Loop over the sliced list
-    for record in patient_history:
+    # 1. Loop over the current page of the history
+    for record in history_page.items:
         emoji = get_risk_emoji(record.predicted_class)
         summary_title = (
             f"{emoji} {record.prediction_timestamp.strftime('%Y-%m-%d %H:%M:%S')} / "
@@ -74,8 +89,8 @@ def show_patient_details(patient_id, patient_name):
                 st.markdown(f"**Comorbidities:** {record.comorbidities}")
             st.divider()
             
-    # 3. Render pagination controls
-    render_pagination(total_items=len(patient_history), items_per_page=ITEMS_PER_PAGE)
+    # 2. Render pagination controls
+    render_pagination(history_page, ITEMS_PER_PAGE)
 
 # --- Page Content ---
 if page == "My Dashboard":
@@ -102,20 +117,19 @@ if page == "My Dashboard":
 
         st.divider()
 
+        # Fetch only the current page, seeking from the page's cursor
         if search_query:
-            predictions = db_manager.search_patients_by_name(st.session_state['user_id'], search_query)
+            predictions = db_manager.search_patients_by_name(st.session_state['user_id'], search_query,
+                                                             cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
         else:
-            predictions = db_manager.get_patient_records(st.session_state['user_id'])
+            predictions = db_manager.get_patient_records(st.session_state['user_id'],
+                                                         cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
 
-        if not predictions:
+        if not predictions.items and st.session_state.page_number == 0:
             st.info("No patient records found.")
             st.stop()
         else:
-            # Slice the predictions for pagination
-            start_index = st.session_state.page_number * ITEMS_PER_PAGE
-            end_index = start_index + ITEMS_PER_PAGE
-
-            predictions_to_display = predictions[start_index:end_index]
+            predictions_to_display = predictions.items
 
             # Headers for the predictions table
             cols = st.columns([3, 2.5, 2.5, 2, 1])
@@ -141,10 +155,11 @@ if page == "My Dashboard":
                     if st.button("👁️", key=f"details_{pred.prediction_id}", help="View Patient's Full History and Trend"):
                         st.session_state.viewing_patient_id = pred.patient_id
                         st.session_state.viewing_patient_name = pred.patient_name
+                        reset_pagination()
                         st.rerun()
 
             # Render pagination controls
-            render_pagination(total_items=len(predictions), items_per_page=ITEMS_PER_PAGE)
+            render_pagination(predictions, ITEMS_PER_PAGE)
 
 elif page == "Predict":
     st.write("Use the form below to make a new prediction for a patient.")
@@ -157,20 +172,14 @@ elif page == "Predict":
         with st.form("prediction_form"):
             st.write(f"Creating new prediction record for **{patient_name}**")
             st.write("Please fill out the following details for the prediction:")
-            cancer_stage = st.selectbox("Cancer Stage", ["I", "II", "III", "IV"])
-            tumor_size = st.number_input("Tumor Size (cm)", 0.1, 20.0, 5.0)
-            tumor_type = st.selectbox("Tumor Type", ["Stomach", "Lung", "Breast", "Cervical", "Liver", "Colorectal"])
-            metastasis = st.selectbox("Metastasis", ["No", "Yes"])
-            treatment_type = st.selectbox("Treatment Type", ["Radiation", "Chemotherapy", "Surgery", "Targeted Therapy", "Immunotherapy"])
-            comorbidities = st.selectbox("Comorbidities", [
-                "No Comorbidities",
-                "Diabetes, Hepatitis B",
-                "Hepatitis B",
-                "Hypertension",
-                "Diabetes, Hypertension",
-                "Diabetes, Hepatitis B",
-                "Hypertension, Hepatitis B"
-            ])
+            cancer_stage = st.selectbox("Cancer Stage", CANCER_STAGES)
+            tumor_size = st.number_input("Tumor Size (cm)", *TUMOR_SIZE_RANGE, 5.0)
+            tumor_type = st.selectbox("Tumor Type", TUMOR_TYPES)
+            metastasis = st.selectbox("Metastasis", METASTASIS_OPTIONS)
+            treatment_type = st.selectbox("Treatment Type", TREATMENT_TYPES)
+            comorbidities = st.selectbox("Comorbidities", COMORBIDITIES)
+            compare_treatments = st.checkbox("Compare all treatment types")
+            compare_comorbidities = st.checkbox("Also compare comorbidities", help="Only used when comparing treatment types.")
 
             if st.form_submit_button("Submit Prediction"):
                 # 1. Calculate age from patient id
@@ -183,8 +192,8 @@ elif page == "Predict":
                     st.error("System Error: Unable to calculate age from patient details. Please check the patient's date of birth.")
                     st.stop()
 
-                # 2. Collect inputs
-                features = {
+                # 2. Collect inputs, normalized once so the cache key and every scorer see the same values
+                features = normalize_features({
                     'Age': calculated_age,
                     'CancerStage': cancer_stage,
                     'TumorSize': tumor_size,
@@ -192,28 +201,52 @@ elif page == "Predict":
                     'Metastasis': metastasis,
                     'TreatmentType': treatment_type,
                     'Comorbidities': comorbidities
-                }
-                
-                df = pd.DataFrame([features])
-                
+                })
+
                 # 3. Load model artifacts
                 artifacts = load_model_artifacts()
                 if not artifacts:
                     st.error("System Error: Model artifacts not found.")
                     st.stop()
 
-                # 4. Preprocess inputs
-                df = preprocess_for_prediction(df, artifacts)
-                if df is None:
-                    st.error("System Error: Error in preprocessing data. Please check your inputs.")
-                    st.stop()
-
-                # 5. Load model and make prediction
-                model = artifacts['model']
-                probability = model.predict_proba(df)[0][1]
-                predicted_class = "High Risk" if probability >= HIGH_RISK_THRESHOLD else ("Low Risk" if probability < LOW_RISK_THRESHOLD else "Medium Risk")
-
-                # 6. Log prediction to database
+                # Treatment what-if: every scenario (including the selected one) is scored in one batch
+                what_if = None
+                if compare_treatments:
+                    what_if = score_treatment_options(features, artifacts, vary_comorbidities=compare_comorbidities)
+
+                # 4. Serve repeated inputs from the shared prediction cache (exact model scores only)
+                prediction_cache = get_prediction_cache()
+                cache_key = prediction_key(features, artifacts['model_hash'])
+                probability = prediction_cache.get(cache_key)
+
+                # 5. Look up the precomputed risk table when enabled (None if missing, stale or out of range).
+                # Table values are approximate, so they are not cached under the exact model's key.
+                from_table = False
+                if probability is None and USE_RISK_TABLE:
+                    risk_table = load_risk_table()
+                    probability = risk_table.lookup(features) if risk_table else None
+                    from_table = probability is not None
+
+                # 6. Otherwise ask the shared inference server when enabled (None if unreachable)
+                if probability is None and USE_INFERENCE_SERVER:
+                    probability = get_inference_client().predict_one(features)
+
+                # 7. Fall back to in-process scoring (reusing the what-if batch when it was scored)
+                if probability is None and what_if is not None:
+                    selected = what_if[(what_if['TreatmentType'] == treatment_type) & (what_if['Comorbidities'] == comorbidities)]
+                    probability = selected['prediction_probability'].iloc[0]
+                if probability is None:
+                    X = preprocess_for_prediction(features, artifacts)
+                    if X is None:
+                        st.error("System Error: Error in preprocessing data. Please check your inputs.")
+                        st.stop()
+                    probability = artifacts['model'].predict_proba(X)[0][1]
+
+                if not from_table:
+                    prediction_cache.put(cache_key, probability)
+                predicted_class = classify_risk(probability)
+
+                # 8. Log prediction to database
                 preds = Prediction(
                     prediction_id=None,  # Auto-incremented by the database
                     prediction_timestamp=None,  # Auto-generated by the database
@@ -230,10 +263,10 @@ elif page == "Predict":
                     prediction_probability=probability
                 )
 
-                # 7. Convert probability to float
+                # 9. Convert probability to float
                 preds.prediction_probability = to_float(probability)
 
-                # 8. Log the prediction
+                # 10. Log the prediction
                 result = db_manager.log_prediction(preds)
                 if result['success']:
                     st.success(f"Prediction for **{patient_name}**: {predicted_class} (Probability: {probability:.2f})")
@@ -241,6 +274,32 @@ elif page == "Predict":
                 else:
                     st.error(result['message'])
 
+                # 11. Show the ranked treatment comparison
+                if what_if is not None:
+                    st.markdown("**Treatment Comparison** (lowest risk first)")
+                    comparison = what_if.rename(columns={
+                        'TreatmentType': 'Treatment Type',
+                        'prediction_probability': 'Probability',
+                        'predicted_class': 'Predicted Class',
+                    })
+                    if not compare_comorbidities:
+                        comparison = comparison.drop(columns='Comorbidities')
+                    comparison.insert(0, 'Rank', range(1, len(comparison) + 1))
+                    st.dataframe(
+                        comparison.style.map(highlight_risk, subset=['Predicted Class']).format({'Probability': '{:.2f}'}),
+                        hide_index=True, use_container_width=True,
+                    )
+
+                # 12. Show the most similar historical cases (after indexing the prediction just logged)
+                similar_index = load_similar_patients_index()
+                if similar_index is not None:
+                    similar_index.sync(db_manager, artifacts['feature_plan'])
+                    st.markdown("**Similar Historical Patients**")
+                    st.dataframe(
+                        similar_index.similar_patients(features, artifacts, exclude_patient_id=patient_id_to_predict),
+                        hide_index=True, use_container_width=True,
+                    )
+
 elif page == "Patient Requests":
     # --- Display notification of actions taken on this page ---
     if "patient_request_notification" in st.session_state:
@@ -259,20 +318,19 @@ elif page == "Patient Requests":
 
     st.divider()
 
+    # Fetch only the current page, seeking from the page's cursor
     if search_query:
-        patient_requests = db_manager.search_requests_by_patient_name(st.session_state['user_id'], search_query)
+        patient_requests = db_manager.search_requests_by_patient_name(st.session_state['user_id'], search_query,
+                                                                      cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
     else:
-        patient_requests = db_manager.get_patient_requests(st.session_state['user_id'])
+        patient_requests = db_manager.get_patient_requests(st.session_state['user_id'],
+                                                           cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
 
-    if not patient_requests:
+    if not patient_requests.items and st.session_state.page_number == 0:
         st.info("No patient requests found.")
         st.stop()
     else:
-        # Slice the patient requests for pagination
-        start_index = st.session_state.page_number * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-
-        requests_to_display = patient_requests[start_index:end_index]
+        requests_to_display = patient_requests.items
 
         # Headers for the patient requests table
         cols = st.columns([2, 3, 3, 2])
@@ -312,6 +370,6 @@ elif page == "Patient Requests":
         st.divider()
 
         # Render pagination controls
-        render_pagination(total_items=len(patient_requests), items_per_page=ITEMS_PER_PAGE)
+        render_pagination(patient_requests, ITEMS_PER_PAGE)
 else:
     st.error("Invalid page selected. Please check your navigation.")
\ No newline at end of file
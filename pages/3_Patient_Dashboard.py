@@ -1,6 +1,6 @@
 import streamlit as st
 from database import DatabaseManager
-from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination
+from ui_components import render_sidebar_and_auth, reset_pagination, render_pagination, get_page_cursor
 from configs import UserRole, ITEMS_PER_PAGE
 from utils import highlight_risk
 
@@ -21,21 +21,20 @@ if page == "My Dashboard":
 
     st.divider()
 
+    # Fetch only the current page, seeking from the page's cursor
     if search_query:
-        history = db_manager.get_history_by_doctor(st.session_state['user_id'], search_query)
+        history = db_manager.get_history_by_doctor(st.session_state['user_id'], search_query,
+                                                   cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
     else:
-        history = db_manager.get_history_summary(st.session_state['user_id'])
+        history = db_manager.get_history_summary(st.session_state['user_id'],
+                                                 cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
 
-    if not history:
+    if not history.items and st.session_state.page_number == 0:
         st.info("No history found.")
         st.stop()
 
     else:
-        # Slice the history for pagination
-        start_index = st.session_state.page_number * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-
-        history_to_display = history[start_index:end_index]
+        history_to_display = history.items
 
         # Headers for the history table
         cols = st.columns([3, 2, 2, 2])
@@ -53,7 +52,7 @@ if page == "My Dashboard":
             cols[3].write(f"{record.prediction_probability:.2%}")
 
         # Render pagination controls
-        render_pagination(len(history), ITEMS_PER_PAGE)
+        render_pagination(history, ITEMS_PER_PAGE)
 
 elif page == "Find Doctor":
     # --- Display notification of actions taken on this page ---
@@ -75,20 +74,18 @@ elif page == "Find Doctor":
 
     # --- Fetch available doctors based on search query or default ---
     if search_query:
-        available_doctors = db_manager.search_available_by_doctor_name(search_query)
+        available_doctors = db_manager.search_available_by_doctor_name(search_query,
+                                                                       cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
     else:
-        available_doctors = db_manager.find_available_doctors(st.session_state['user_id'])
+        available_doctors = db_manager.find_available_doctors(st.session_state['user_id'],
+                                                              cursor=get_page_cursor(), page_size=ITEMS_PER_PAGE)
     
     # --- Display available doctors ---
-    if not available_doctors:
+    if not available_doctors.items and st.session_state.page_number == 0:
         st.info("No doctors available at this time. Please check back later.")
         st.stop()
     else:
-        # Slice the available doctors for pagination
-        start_index = st.session_state.page_number * ITEMS_PER_PAGE
-        end_index = start_index + ITEMS_PER_PAGE
-
-        doctors_to_display = available_doctors[start_index:end_index]
+        doctors_to_display = available_doctors.items
 
         cols = st.columns([2, 3, 2])
         # Headers for the doctor list
@@ -117,4 +114,4 @@ elif page == "Find Doctor":
                     st.rerun()
 
         # Render pagination controls
-        render_pagination(len(available_doctors), ITEMS_PER_PAGE)
\ No newline at end of file
+        render_pagination(available_doctors, ITEMS_PER_PAGE)
\ No newline at end of file
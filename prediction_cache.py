@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from configs import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL
+from feature_plan import INPUT_FEATURES
+
+
+def normalize_features(features):
+    """
+    Canonical form of one set of raw model inputs: int age, float size, stripped labels.
+
+    Callers score the normalized values, not the raw ones, so that the same patient
+    entered twice, from the form or from a CSV, maps to one key and one probability.
+    """
+    return {
+        'Age': int(features['Age']),
+        'CancerStage': str(features['CancerStage']).strip(),
+        'TumorSize': float(features['TumorSize']),
+        'TumorType': str(features['TumorType']).strip(),
+        'Metastasis': str(features['Metastasis']).strip(),
+        'TreatmentType': str(features['TreatmentType']).strip(),
+        'Comorbidities': str(features['Comorbidities']).strip(),
+    }
+
+
+def prediction_key(features, model_hash):
+    """Cache key for one set of model inputs; score the `normalize_features` output with it."""
+    features = normalize_features(features)
+    return (model_hash,) + tuple(features[col] for col in INPUT_FEATURES)
+
+
+class PredictionCache:
+    """
+    A thread-safe LRU cache of predicted probabilities with a per-entry time-to-live.
+
+    Keys include the model hash, so results from a previous model are never served;
+    the first lookup under a new hash also drops every entry for the old one.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (probability, expires_at)
+        self._lock = threading.Lock()
+        self._model_hash = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_model(self, model_hash):
+        # Called with the lock held
+        if model_hash != self._model_hash:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._model_hash = model_hash
+
+    def get(self, key):
+        """Returns the cached probability for `key`, or None on a miss."""
+        with self._lock:
+            self._check_model(key[0])
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            probability, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return probability
+
+    def put(self, key, probability):
+        """Stores a probability, evicting the least recently used entries beyond `max_entries`."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_model(key[0])
+            self._entries[key] = (float(probability), time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def predict_proba(self, features, artifacts):
+        """
+        Positive-class probabilities for a batch, scoring only the cache misses.
+
+        Rows are normalized once; both the keys and the scored misses use the normalized values.
+
+        Args:
+            features: A list of feature dicts, a DataFrame or a dict of column arrays.
+            artifacts (dict): Loaded model artifacts (must carry 'model_hash').
+
+        Returns:
+            np.ndarray: One probability per row, in input order.
+        """
+        if isinstance(features, (list, tuple)):
+            columns = {col: [row[col] for row in features] for col in INPUT_FEATURES}
+        else:
+            columns = {col: np.asarray(features[col]) for col in INPUT_FEATURES}
+        n_rows = len(columns[INPUT_FEATURES[0]])
+        model_hash = artifacts['model_hash']
+
+        rows = [normalize_features(dict(zip(INPUT_FEATURES, values)))
+                for values in zip(*(columns[col] for col in INPUT_FEATURES))]
+        keys = [(model_hash,) + tuple(row[col] for col in INPUT_FEATURES) for row in rows]
+        probabilities = np.empty(n_rows, dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                probabilities[i] = cached
+
+        if missing:
+            subset = [rows[i] for i in missing]
+            X = artifacts['feature_plan'].transform(subset)
+            scored = artifacts['model'].predict_proba(X)[:, 1]
+            probabilities[missing] = scored
+            for i, probability in zip(missing, scored):
+                self.put(keys[i], probability)
+        return probabilities
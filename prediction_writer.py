@@ -0,0 +1,269 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+
+from configs import (DB_PATH, DB_STORAGE_PROFILE, PREDICTION_WRITE_MODES, PREDICTION_WRITER_BATCH_SIZE,
+                     PREDICTION_WRITER_FLUSH_INTERVAL, PREDICTION_WRITER_QUEUE_SIZE, PREDICTION_WRITER_PUT_TIMEOUT)
+from connection_pool import connect
+from query_cache import get_cache
+
+INSERT_PREDICTION = """
+    INSERT INTO predictions (doctor_id, patient_id, age, cancer_stage, tumor_size, tumor_type, metastasis, treatment_type, comorbidities, predicted_class, prediction_probability)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def prediction_values(prediction):
+    """The INSERT_PREDICTION parameters of a Prediction."""
+    return (
+        prediction.doctor_id,
+        prediction.patient_id,
+        prediction.age,
+        prediction.cancer_stage,
+        prediction.tumor_size,
+        prediction.tumor_type,
+        prediction.metastasis,
+        prediction.treatment_type,
+        prediction.comorbidities,
+        prediction.predicted_class,
+        prediction.prediction_probability,
+    )
+
+
+class _PendingWrite:
+    """A prediction waiting in the write queue; `values` is None for a flush marker."""
+
+    def __init__(self, values):
+        self.values = values
+        self.done = threading.Event()
+        self.result = None
+
+
+# Queued by close() to stop the writer thread once everything before it is committed
+_STOP = object()
+
+_CLOSED = {"success": False, "message": "Error logging prediction: the prediction writer is closed."}
+
+
+class PredictionWriter:
+    """
+    Writes predictions to the database in one of three durability modes.
+
+    - sync:  every write is its own transaction, committed before `write` returns.
+    - group: `write` still returns only once its row is committed, but a writer thread
+             commits every prediction queued by the time it gets to them in one
+             transaction, so concurrent callers share one commit (and one fsync).
+    - async: `write` returns as soon as the prediction is queued. The writer thread
+             commits a batch once `batch_size` are queued or `flush_interval` seconds
+             after the first; a crash can lose what is still queued.
+
+    The queue holds at most `max_queue` predictions. When it is full, `write` waits up
+    to `put_timeout` seconds for room and then fails instead of growing without bound.
+    A batch that fails is rolled back and retried row by row, so only the bad rows fail.
+    """
+
+    def __init__(self, db_path=DB_PATH, mode='group', profile=DB_STORAGE_PROFILE, batch_size=PREDICTION_WRITER_BATCH_SIZE,
+                 flush_interval=PREDICTION_WRITER_FLUSH_INTERVAL, max_queue=PREDICTION_WRITER_QUEUE_SIZE,
+                 put_timeout=PREDICTION_WRITER_PUT_TIMEOUT):
+        if mode not in PREDICTION_WRITE_MODES:
+            raise ValueError(f"Unknown write mode {mode!r}; expected one of {', '.join(PREDICTION_WRITE_MODES)}.")
+        self.db_path = db_path
+        self.mode = mode
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval if mode == 'async' else 0
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._cache = get_cache(db_path)
+        # Used by the writer thread, or by callers under the lock in sync mode
+        self._conn = connect(db_path, profile, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._closed = False
+        # Statistics
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.blocked_puts = 0
+        self.rejected_puts = 0
+        self._thread = None
+        if mode != 'sync':
+            self._thread = threading.Thread(target=self._run, name='prediction-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, prediction):
+        """
+        Logs a prediction according to the write mode.
+
+        Returns:
+            dict: {"success", "message"}; in async mode success means the prediction was queued.
+        """
+        if self.mode == 'sync':
+            with self._lock:
+                if self._closed:
+                    return dict(_CLOSED)
+                return self._commit([_PendingWrite(prediction_values(prediction))])[0].result
+
+        pending = _PendingWrite(prediction_values(prediction))
+        queued = self._enqueue(pending)
+        if queued is None:
+            return dict(_CLOSED)
+        if not queued:
+            return {"success": False, "message": "Error logging prediction: too many predictions are waiting to be "
+                                                 "written. Please try again."}
+        if self.mode == 'async':
+            return {"success": True, "message": "Prediction queued for logging."}
+        pending.done.wait()
+        return pending.result
+
+    def _enqueue(self, item):
+        """
+        Queues `item` unless the writer is closed. Returns True once queued, False if the
+        queue stayed full for `put_timeout` seconds and None if the writer is closed.
+
+        The closed check and the put happen under the lock, so nothing is queued behind
+        close()'s stop marker where the writer thread would never see it.
+        """
+        deadline = time.monotonic() + self.put_timeout
+        if not self._lock.acquire(timeout=self.put_timeout):
+            self.rejected_puts += 1
+            return False
+        try:
+            if self._closed:
+                return None
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                self.blocked_puts += 1
+            try:
+                self.queue.put(item, timeout=max(0, deadline - time.monotonic()))
+                return True
+            except queue.Full:
+                self.rejected_puts += 1
+                return False
+        finally:
+            self._lock.release()
+
+    def flush(self):
+        """Blocks until every prediction queued so far is committed."""
+        if self._thread is None:
+            return
+        marker = _PendingWrite(None)
+        with self._lock:
+            if self._closed:
+                return
+            self.queue.put(marker)
+        marker.done.wait()
+
+    def close(self):
+        """Commits whatever is still queued, stops the writer thread and closes its connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is not None:
+                self.queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join()
+            self._fail_queued()
+        with self._lock:
+            self._conn.close()
+
+    def _fail_queued(self):
+        """Fails anything left in the queue once the writer thread has stopped, so no caller waits forever."""
+        while True:
+            try:
+                pending = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if pending is not _STOP:
+                pending.result = dict(_CLOSED)
+                pending.done.set()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.flush_interval
+            # Group mode takes only what is already queued; async mode also waits for the flush interval
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            self._commit([pending for pending in batch if pending is not _STOP])
+            if stop:
+                return
+
+    def _commit(self, batch):
+        """Inserts the batch in one transaction, falling back to row by row if it fails; sets every result."""
+        rows = [pending for pending in batch if pending.values is not None]
+        if rows:
+            try:
+                self._conn.executemany(INSERT_PREDICTION, [pending.values for pending in rows])
+                self._conn.commit()
+                for pending in rows:
+                    pending.result = {"success": True, "message": "Prediction logged successfully."}
+                self.written += len(rows)
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(rows))
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                if len(rows) > 1:
+                    for pending in rows:
+                        self._commit([pending])
+                else:
+                    rows[0].result = {"success": False, "message": f"Error logging prediction: {str(e)}"}
+                    self.failed += 1
+                    if self.mode == 'async':
+                        print(f"Dropped a queued prediction: {e}")
+            self._cache.invalidate(('predictions',))
+        for pending in batch:
+            pending.done.set()
+        return batch
+
+    def stats(self):
+        """Write counters and the current queue depth."""
+        return {
+            'mode': self.mode,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch': self.written / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'queued': self.queue.qsize(),
+            'max_queue': self.queue.maxsize,
+            'blocked_puts': self.blocked_puts,
+            'rejected_puts': self.rejected_puts,
+        }
+
+
+# --- Process-wide Registry ---
+# One writer per database file, write mode and storage profile; all are flushed when the process exits
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path=DB_PATH, mode='group', profile=DB_STORAGE_PROFILE):
+    """Returns the shared writer for `db_path` in `mode`, creating it on first use."""
+    with _writers_lock:
+        writer = _writers.get((db_path, mode, profile))
+        if writer is None:
+            writer = _writers[(db_path, mode, profile)] = PredictionWriter(db_path, mode, profile)
+        return writer
+
+
+def close_writers():
+    """Flushes and closes every shared writer; registered to run at interpreter exit."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close_writers)
+
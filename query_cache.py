@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+from configs import DB_PATH, QUERY_CACHE_SIZE
+
+
+class QueryCache:
+    """
+    A bounded, thread-safe LRU cache of DatabaseManager read results.
+
+    Every entry remembers the tables it was read from and their versions in the
+    `table_versions` table, which triggers bump on every write. A lookup only hits
+    while those versions are unchanged, so a write by any connection, in any process,
+    invalidates exactly the entries that read the written table.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (tables, versions, value), least recently used first
+        self._lock = threading.Lock()
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, versions):
+        """Returns (True, value) for an entry read at `versions`, else (False, None); stale entries are dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[2]
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, tables, versions, value):
+        """Stores a result read from `tables` at `versions`, evicting the least recently used entries beyond the bound."""
+        with self._lock:
+            self._entries[key] = (frozenset(tables), versions, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Drops every entry read from any of `tables`, after a write to them in this process."""
+        tables = set(tables)
+        with self._lock:
+            stale = [key for key, (read_from, _, _) in self._entries.items() if read_from & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Size, hit rate and invalidation counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
+
+
+# --- Process-wide Registry ---
+# One cache per database file, shared by every session in the server process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_path=DB_PATH):
+    """Returns the shared query cache for `db_path`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = QueryCache()
+        return cache
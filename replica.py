@@ -0,0 +1,273 @@
+import argparse
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from configs import (DB_PATH, DB_REPLICA_MAX_STALENESS, DB_REPLICA_REFRESH_INTERVAL, DB_SNAPSHOT_MAX_RESTARTS,
+                     DB_SNAPSHOT_PAGES_PER_STEP, DB_SNAPSHOT_STEP_PAUSE, DB_STORAGE_PROFILE)
+from connection_pool import connect
+from db_metrics import connection_factory
+
+
+def replica_path(db_path):
+    """Where the analytics replica of `db_path` is kept: next to it, e.g. app_database.replica.db."""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}.replica{ext or '.db'}"
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def snapshot(db_path, dest_path, profile=DB_STORAGE_PROFILE, pages=DB_SNAPSHOT_PAGES_PER_STEP,
+             pause=DB_SNAPSHOT_STEP_PAUSE, max_restarts=DB_SNAPSHOT_MAX_RESTARTS):
+    """
+    Copies a live database to `dest_path` with the online backup API, `pages` pages per step.
+
+    Under WAL the copy runs inside one read transaction: it is a consistent snapshot of the
+    moment it started, and writers are never blocked. Under a rollback journal a read lock
+    would block every commit, so it is only held for each step and released for `pause`
+    seconds in between. A write landing between steps makes SQLite restart the copy; after
+    `max_restarts` restarts, the rest is copied in one step (blocking writers for that long).
+
+    The copy is written next to `dest_path` and moved into place once complete, in rollback
+    journal mode so it can be opened read-only. Its modification time is set to the moment
+    its contents were current, which is what staleness is measured from.
+
+    Returns:
+        dict: Pages and bytes copied, seconds taken, backup steps, restarts, whether the
+              one-step fallback was used, and `taken_at` (a time.time() timestamp).
+    """
+    src = connect(db_path, profile, check_same_thread=False)
+    tmp_path = dest_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    dst = sqlite3.connect(tmp_path)
+    wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == 'wal'
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'fallback': False}
+    remaining_before = None
+
+    def progress(status, remaining, total):
+        nonlocal remaining_before
+        stats['steps'] += 1
+        stats['pages'] = total
+        if remaining_before is not None and remaining > remaining_before:
+            stats['restarts'] += 1
+            if stats['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        remaining_before = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    start = time.perf_counter()
+    taken_at = time.time()
+    try:
+        if wal:
+            # The read transaction pins one WAL snapshot for every step, so nothing restarts the copy
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            src.backup(dst, pages=pages, progress=progress)
+        except _TooManyRestarts:
+            stats['fallback'] = True
+            src.backup(dst)
+        if not wal:
+            # With no writes since the last restart, the copy matches the database as of now
+            taken_at = time.time()
+        dst.execute("PRAGMA journal_mode = DELETE")
+    except BaseException:
+        dst.close()
+        os.remove(tmp_path)
+        raise
+    finally:
+        if src.in_transaction:
+            src.rollback()
+        src.close()
+    dst.close()
+    os.utime(tmp_path, (taken_at, taken_at))
+    os.replace(tmp_path, dest_path)
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['bytes'] = os.path.getsize(dest_path)
+    stats['taken_at'] = taken_at
+    return stats
+
+
+class Replica:
+    """
+    A read-only copy of one database file for analytics and report reads, and its connections.
+
+    `refresh` replaces the copy with a new snapshot; with `refresh_interval`, a daemon thread
+    does so on that schedule. `acquire` hands out a read-only connection only while the copy
+    is at most `max_staleness` seconds old, so callers fall back to the live database
+    otherwise. Connections opened on a copy that has since been replaced (by this or another
+    process) are closed instead of reused.
+    """
+
+    def __init__(self, db_path=DB_PATH, profile=DB_STORAGE_PROFILE, path=None, refresh_interval=None):
+        self.db_path = db_path
+        self.profile = profile
+        self.path = path or replica_path(db_path)
+        self.refresh_interval = refresh_interval
+        self._idle = []  # (connection, file identity), most recently returned last
+        self._opened_on = {}  # id(connection) -> identity of the file it was opened on, while checked out
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # Statistics
+        self.replica_reads = 0
+        self.stale_fallbacks = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh = None
+        if refresh_interval:
+            self._thread = threading.Thread(target=self._run, name='db-replica-refresh', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # A copy left by an earlier run is reused until it is one interval old
+        age = self.age()
+        wait = 0 if age is None else max(0.0, self.refresh_interval - age)
+        while not self._stop.wait(wait):
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError) as e:
+                self.refresh_failures += 1
+                print(f"Replica refresh failed: {e}")
+            wait = self.refresh_interval
+
+    def refresh(self):
+        """Takes a new snapshot into the replica file; returns its statistics (see snapshot)."""
+        with self._refresh_lock:
+            stats = snapshot(self.db_path, self.path, self.profile)
+        with self._lock:
+            self.refreshes += 1
+            self.last_refresh = stats
+        return stats
+
+    def _identity(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, None
+        return (st.st_ino, st.st_mtime_ns), st.st_mtime
+
+    def age(self):
+        """Seconds since the replica's contents were current, or None if there is no replica yet."""
+        _, taken_at = self._identity()
+        return None if taken_at is None else time.time() - taken_at
+
+    def _open(self):
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False,
+                               factory=connection_factory())
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    def acquire(self, max_staleness=DB_REPLICA_MAX_STALENESS):
+        """A read-only connection to the replica, or None when it is missing or older than `max_staleness` seconds."""
+        identity, taken_at = self._identity()
+        if taken_at is None or time.time() - taken_at > max_staleness:
+            with self._lock:
+                self.stale_fallbacks += 1
+            return None
+        with self._lock:
+            self.replica_reads += 1
+            while self._idle:
+                conn, opened_on = self._idle.pop()
+                if opened_on == identity:
+                    self._opened_on[id(conn)] = identity
+                    return conn
+                conn.close()
+        conn = self._open()
+        with self._lock:
+            self._opened_on[id(conn)] = identity
+        return conn
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._idle.append((conn, self._opened_on.pop(id(conn))))
+
+    def stats(self):
+        """Replica age, routing counters and the last snapshot's statistics."""
+        with self._lock:
+            return {
+                'path': self.path,
+                'age_s': self.age(),
+                'replica_reads': self.replica_reads,
+                'stale_fallbacks': self.stale_fallbacks,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures,
+                'last_refresh': self.last_refresh,
+            }
+
+    def close(self):
+        """Stops the refresh thread and closes the idle connections."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            for conn, _ in self._idle:
+                conn.close()
+            self._idle.clear()
+
+
+# --- Process-wide Registry ---
+# One replica per database file, refreshed by the server process that first asks for it
+_replicas = {}
+_replicas_lock = threading.Lock()
+
+
+def get_replica(db_path=DB_PATH, profile=DB_STORAGE_PROFILE, refresh_interval=DB_REPLICA_REFRESH_INTERVAL):
+    """Returns the shared replica of `db_path`, starting its refresh schedule on first use."""
+    with _replicas_lock:
+        replica = _replicas.get(db_path)
+        if replica is None:
+            replica = _replicas[db_path] = Replica(db_path, profile, refresh_interval=refresh_interval)
+        return replica
+
+
+def close_replicas():
+    """Stops every shared replica's refresh thread; registered to run at interpreter exit."""
+    with _replicas_lock:
+        replicas = list(_replicas.values())
+        _replicas.clear()
+    for replica in replicas:
+        replica.close()
+
+
+atexit.register(close_replicas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Take online snapshots of the database or refresh its analytics replica.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    snap = subparsers.add_parser('snapshot', help="Copy the live database to a file, e.g. for a backup")
+    snap.add_argument('out')
+    refresh = subparsers.add_parser('refresh', help="Refresh the analytics replica now")
+    status = subparsers.add_parser('status', help="Show the analytics replica's age")
+    for sub in (snap, refresh, status):
+        sub.add_argument('--db', default=DB_PATH)
+        sub.add_argument('--profile', default=DB_STORAGE_PROFILE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        replica = Replica(args.db, args.profile)
+        age = replica.age()
+        print(f"{replica.path}: " + ("missing" if age is None else f"{age:,.0f}s old (bound {DB_REPLICA_MAX_STALENESS}s)"))
+        return
+
+    out = args.out if args.command == 'snapshot' else replica_path(args.db)
+    stats = snapshot(args.db, out, args.profile)
+    fallback = ", rest copied in one step" if stats['fallback'] else ""
+    print(f"Copied {stats['bytes'] / 2**20:,.1f} MB to {out} in {stats['seconds']:.2f}s "
+          f"({stats['steps']} steps, {stats['restarts']} restart(s){fallback}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import streamlit as st
+
+from configs import (RISK_TABLE_PATH, RISK_TABLE_AGE_RANGE, RISK_TABLE_SIZE_STEP, TUMOR_SIZE_RANGE,
+                     CANCER_STAGES, TUMOR_TYPES, METASTASIS_OPTIONS, TREATMENT_TYPES, COMORBIDITIES)
+from model_bundle import artifact_mtimes, source_fingerprint
+from utils import MODEL_DIR, read_model_artifacts
+
+TABLE_FORMAT_VERSION = 1
+
+# Categorical inputs covered by the table, with the values offered by the prediction form
+TABLE_OPTIONS = {
+    'CancerStage': list(dict.fromkeys(CANCER_STAGES)),
+    'TumorType': list(dict.fromkeys(TUMOR_TYPES)),
+    'Metastasis': list(dict.fromkeys(METASTASIS_OPTIONS)),
+    'TreatmentType': list(dict.fromkeys(TREATMENT_TYPES)),
+    'Comorbidities': list(dict.fromkeys(COMORBIDITIES)),
+}
+
+
+def model_fingerprint(model_dir=MODEL_DIR):
+    """
+    Returns the SHA-256 over the model and its scaler and encoders, used to detect stale tables:
+    re-fitting any of them changes which table slot an input maps to.
+    """
+    return source_fingerprint(model_dir)
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _size_grid(step):
+    low, high = TUMOR_SIZE_RANGE
+    n_sizes = int(round((high - low) / step)) + 1
+    return np.round(low + step * np.arange(n_sizes), 6)
+
+
+class RiskTable:
+    """
+    A memory-mapped table of model probabilities over the whole prediction form domain.
+
+    Categorical combinations that the model cannot tell apart (e.g. every non-stomach
+    tumor type) share one slot, so the table holds one (age x tumor size) plane per
+    distinct encoded combination rather than per raw combination.
+    """
+
+    def __init__(self, table, meta):
+        self.table = table
+        self.meta = meta
+        self.age_min, self.age_max = meta['age_range']
+        self.size_min, self.size_step, self.n_sizes = meta['size_grid']
+        self.slot_index = np.asarray(meta['slot_index'], dtype=np.int32)
+        self.option_index = {src: {value: i for i, value in enumerate(values)} for src, values in meta['options'].items()}
+
+    @classmethod
+    def open(cls, path=RISK_TABLE_PATH):
+        """Maps a table built by `build_risk_table` without reading it into memory."""
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+        if meta.get('version') != TABLE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported risk table version: {meta.get('version')}")
+        return cls(np.load(path, mmap_mode='r'), meta)
+
+    def is_fresh(self):
+        """True if the table was built from the model and preprocessing artifacts currently on disk."""
+        # Tables from before the fingerprint covered every artifact carry 'model_sha256' and count as stale
+        return self.meta.get('artifacts_sha256') == model_fingerprint()
+
+    def lookup(self, features):
+        """
+        Returns the positive-class probability for a single feature dict,
+        or None if the input falls outside the table's domain.
+        """
+        age = int(round(features['Age']))
+        if not self.age_min <= age <= self.age_max:
+            return None
+        size_idx = int(round((float(features['TumorSize']) - self.size_min) / self.size_step))
+        if not 0 <= size_idx < self.n_sizes:
+            return None
+        try:
+            position = tuple(self.option_index[src][features[src]] for src in self.option_index)
+        except KeyError:
+            return None
+        slot = self.slot_index[position]
+        return float(self.table[slot, age - self.age_min, size_idx])
+
+
+@st.cache_resource(max_entries=1)
+def _open_fresh_table(path, table_mtime, mtimes):
+    """Opens the table once per (table, model artifacts) version; returns None if it is stale."""
+    table = RiskTable.open(path)
+    if not table.is_fresh():
+        print(f"Risk table {path} is stale; falling back to the live model.")
+        return None
+    return table
+
+
+def load_risk_table(path=RISK_TABLE_PATH):
+    """Returns the cached RiskTable, or None if it has not been built or no longer matches the model artifacts."""
+    try:
+        table_mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    mtimes = artifact_mtimes()
+    if None in mtimes[:-1]:  # a pickle is missing (the bundle is optional)
+        return None
+    return _open_fresh_table(path, table_mtime, mtimes)
+
+
+def build_risk_table(path=RISK_TABLE_PATH, age_range=RISK_TABLE_AGE_RANGE, size_step=RISK_TABLE_SIZE_STEP, artifacts=None):
+    """
+    Scores every form combination with the live model and writes the table to `path`.
+
+    The table is written to a temporary file and renamed into place, so readers
+    never observe a partially written table.
+    """
+    artifacts = artifacts or read_model_artifacts()
+    plan, model = artifacts['feature_plan'], artifacts['model']
+
+    ages = np.arange(age_range[0], age_range[1] + 1)
+    sizes = _size_grid(size_step)
+
+    # 1. Collapse raw combinations to the distinct rows the model actually sees
+    combos = list(itertools.product(*TABLE_OPTIONS.values()))
+    columns = {src: np.array([combo[i] for combo in combos], dtype=object) for i, src in enumerate(TABLE_OPTIONS)}
+    columns['Age'] = np.zeros(len(combos))
+    columns['TumorSize'] = np.zeros(len(combos))
+    encoded = plan.transform(columns)
+    _, first_combo, slot_of_combo = np.unique(encoded, axis=0, return_index=True, return_inverse=True)
+    slot_index = slot_of_combo.reshape([len(values) for values in TABLE_OPTIONS.values()])
+
+    # 2. Score the full (age x size) grid for one representative combination per slot
+    grid_age, grid_size = (g.ravel() for g in np.meshgrid(ages, sizes, indexing='ij'))
+    tmp_path = path + '.tmp.npy'
+    table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                      shape=(len(first_combo), len(ages), len(sizes)))
+    for slot, combo_idx in enumerate(first_combo):
+        slot_columns = {src: np.full(len(grid_age), columns[src][combo_idx], dtype=object) for src in TABLE_OPTIONS}
+        slot_columns['Age'] = grid_age
+        slot_columns['TumorSize'] = grid_size
+        table[slot] = model.predict_proba(plan.transform(slot_columns))[:, 1].reshape(len(ages), len(sizes))
+    table.flush()
+    del table
+
+    meta = {
+        'version': TABLE_FORMAT_VERSION,
+        'artifacts_sha256': model_fingerprint(),
+        'age_range': [int(ages[0]), int(ages[-1])],
+        'size_grid': [float(sizes[0]), float(size_step), int(len(sizes))],
+        'options': TABLE_OPTIONS,
+        'slot_index': slot_index.tolist(),
+    }
+    with open(_meta_path(path) + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+    os.replace(_meta_path(path) + '.tmp', _meta_path(path))
+    return meta
+
+
+def verify_risk_table(path=RISK_TABLE_PATH, samples=20_000, seed=0, artifacts=None):
+    """
+    Compares table lookups with live model output on random form inputs.
+
+    Tumor sizes are drawn at the form's 0.01 cm resolution, so the reported
+    deviation includes the error from snapping to the table's size grid.
+    """
+    artifacts = artifacts or read_model_artifacts()
+    table = RiskTable.open(path)
+    rng = np.random.default_rng(seed)
+    low, high = TUMOR_SIZE_RANGE
+
+    rows = [{
+        'Age': int(rng.integers(table.age_min, table.age_max + 1)),
+        'TumorSize': round(float(rng.uniform(low, high)), 2),
+        **{src: values[rng.integers(len(values))] for src, values in TABLE_OPTIONS.items()},
+    } for _ in range(samples)]
+
+    live = artifacts['model'].predict_proba(artifacts['feature_plan'].transform(rows))[:, 1]
+    start = time.perf_counter()
+    looked_up = np.array([table.lookup(row) for row in rows], dtype=np.float64)
+    lookup_us = (time.perf_counter() - start) / samples * 1e6
+    deviation = np.abs(looked_up - live)
+
+    return {
+        'fresh': table.is_fresh(),
+        'samples': samples,
+        'max_abs_deviation': float(deviation.max()),
+        'mean_abs_deviation': float(deviation.mean()),
+        'lookup_us': lookup_us,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or verify the precomputed risk lookup table.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Rebuild the table if the model has changed")
+    build.add_argument('--path', default=RISK_TABLE_PATH)
+    build.add_argument('--size-step', type=float, default=RISK_TABLE_SIZE_STEP, help="Tumor size granularity in cm")
+    build.add_argument('--age-min', type=int, default=RISK_TABLE_AGE_RANGE[0])
+    build.add_argument('--age-max', type=int, default=RISK_TABLE_AGE_RANGE[1])
+    build.add_argument('--force', action='store_true', help="Rebuild even if the table is up to date")
+
+    verify = subparsers.add_parser('verify', help="Report the maximum deviation from live model output")
+    verify.add_argument('--path', default=RISK_TABLE_PATH)
+    verify.add_argument('--samples', type=int, default=20_000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if not args.force and os.path.exists(args.path):
+            current = RiskTable.open(args.path)
+            same_grid = (current.meta['age_range'] == [args.age_min, args.age_max]
+                         and current.size_step == args.size_step)
+            if same_grid and current.is_fresh():
+                print(f"Risk table {args.path} is up to date.")
+                return
+        start = time.perf_counter()
+        meta = build_risk_table(args.path, (args.age_min, args.age_max), args.size_step)
+        n_slots = np.max(meta['slot_index']) + 1
+        print(f"Built {args.path}: {n_slots} slots x {meta['age_range'][1] - meta['age_range'][0] + 1} ages "
+              f"x {meta['size_grid'][2]} sizes in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(args.path) / 1e6:.1f} MB)")
+    else:
+        report = verify_risk_table(args.path, args.samples)
+        print(f"Table fresh: {report['fresh']}")
+        print(f"Samples: {report['samples']}")
+        print(f"Max abs deviation from live model: {report['max_abs_deviation']:.6f}")
+        print(f"Mean abs deviation from live model: {report['mean_abs_deviation']:.6f}")
+        print(f"Lookup latency: {report['lookup_us']:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
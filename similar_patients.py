@@ -0,0 +1,409 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from configs import SIMILAR_INDEX_PATH, SIMILAR_PATIENTS_K
+from utils import SELECTED_FEATURES, load_model_artifacts, read_model_artifacts
+
+INDEX_FORMAT_VERSION = 1
+
+# Where a reference row came from
+SOURCE_TRAINING = 0
+SOURCE_PREDICTION = 1
+SOURCE_DELETED = 2  # a logged prediction since deleted with its patient or doctor; never returned by queries
+
+# One fixed-width record per reference row, so new rows are appended to the file without rewriting it.
+#   vector:     the scaled model input
+#   ref_id:     row number in X_train_scaled.csv, or the prediction_id
+#   patient_id: the patient of a logged prediction (-1 for training rows)
+#   outcome:    SurvivalStatus for training rows (0 alive, 1 deceased), the predicted probability otherwise
+RECORD_DTYPE = np.dtype([
+    ('vector', '<f4', (len(SELECTED_FEATURES),)),
+    ('source', 'u1'),
+    ('ref_id', '<i8'),
+    ('patient_id', '<i8'),
+    ('outcome', '<f4'),
+])
+
+# Rows scored per step of the brute-force kernel; bounds the temporary distance buffer
+BLOCK_ROWS = 65_536
+
+
+def plan_fingerprint(plan):
+    """SHA-256 of the feature plan parameters; the index must be rebuilt when the encoding changes."""
+    return hashlib.sha256(json.dumps(plan.to_params(), sort_keys=True).encode()).hexdigest()
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def _read_meta(path):
+    with open(_meta_path(path)) as f:
+        meta = json.load(f)
+    if meta.get('version') != INDEX_FORMAT_VERSION:
+        raise ValueError(f"Unsupported similar patients index version: {meta.get('version')}")
+    return meta
+
+
+def _write_meta(path, meta):
+    tmp_path = _meta_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path(path))
+
+
+def _prediction_records(predictions, plan):
+    """Encodes logged predictions, read with get_predictions_after(..., columnar=True), into index records."""
+    records = np.zeros(len(predictions['prediction_id']), dtype=RECORD_DTYPE)
+    if not len(records):
+        return records
+    columns = {
+        'Age': predictions['age'],
+        'CancerStage': predictions['cancer_stage'],
+        'TumorSize': predictions['tumor_size'],
+        'TumorType': predictions['tumor_type'],
+        'Metastasis': predictions['metastasis'],
+        'TreatmentType': predictions['treatment_type'],
+        'Comorbidities': predictions['comorbidities'],
+    }
+    columns = {src: np.asarray(values, dtype=object) for src, values in columns.items()}
+    records['vector'] = plan.transform(columns)
+    records['source'] = SOURCE_PREDICTION
+    records['ref_id'] = predictions['prediction_id']
+    records['patient_id'] = predictions['patient_id']
+    records['outcome'] = predictions['prediction_probability']
+    return records
+
+
+class SimilarPatientsIndex:
+    """
+    An exact k-nearest-neighbour index over scaled patient vectors.
+
+    Queries use a blocked brute-force kernel: squared distances are expanded as
+    |x|^2 - 2 x.q + |q|^2 with the row norms precomputed, so each block is one
+    matrix-vector product followed by a partial sort. Unlike a KD-tree, the index
+    never needs rebuilding: new rows are appended to the record file and to
+    in-memory buffers that grow by doubling, and rows of deleted predictions are
+    masked in place by giving them an infinite norm.
+    """
+
+    def __init__(self, path, meta, records):
+        self.path = path
+        self.meta = meta
+        self._lock = threading.Lock()
+        self.size = 0
+        self._vectors = np.empty((0, RECORD_DTYPE['vector'].shape[0]), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._info = np.empty(0, dtype=RECORD_DTYPE)
+        self._extend(records)
+
+    @classmethod
+    def open(cls, path=SIMILAR_INDEX_PATH):
+        """Loads an index built by `build_index`; records past the committed count are ignored."""
+        meta = _read_meta(path)
+        records = np.fromfile(path, dtype=RECORD_DTYPE, count=meta['n_records'])
+        return cls(path, meta, records)
+
+    def __len__(self):
+        return self.size
+
+    def _extend(self, records):
+        """Appends records to the in-memory buffers, doubling their capacity when full."""
+        needed = self.size + len(records)
+        if needed > len(self._info):
+            capacity = max(needed, 2 * len(self._info), 1024)
+            for name in ('_vectors', '_norms', '_info'):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+        vectors = records['vector']
+        self._vectors[self.size:needed] = vectors
+        self._norms[self.size:needed] = np.einsum('ij,ij->i', vectors, vectors)
+        self._norms[self.size:needed][records['source'] == SOURCE_DELETED] = np.inf
+        self._info[self.size:needed] = records
+        self.size = needed
+
+    def append(self, records):
+        """
+        Persists new records and adds them to the index.
+
+        Records are written after the last committed one and only then counted in
+        the metadata, so an interrupted append leaves the index as it was.
+        """
+        if len(records) == 0:
+            return
+        with self._lock:
+            self._catch_up()
+            with open(self.path, 'r+b') as f:
+                f.seek(self.size * RECORD_DTYPE.itemsize)
+                f.truncate()
+                f.write(records.tobytes())
+            self._extend(records)
+            self.meta['n_records'] = self.size
+            self.meta['last_prediction_id'] = int(max(self.meta['last_prediction_id'], records['ref_id'][records['source'] == SOURCE_PREDICTION].max(initial=0)))
+            _write_meta(self.path, self.meta)
+
+    def _catch_up(self):
+        """Loads records appended, and masks rows deleted, by other processes since this index was opened (lock held)."""
+        meta = _read_meta(self.path)
+        if meta.get('n_deleted', 0) != self.meta.get('n_deleted', 0):
+            sources = np.fromfile(self.path, dtype=RECORD_DTYPE, count=self.size)['source']
+            self._apply_deletions(np.flatnonzero(sources == SOURCE_DELETED))
+        if meta['n_records'] > self.size:
+            records = np.fromfile(self.path, dtype=RECORD_DTYPE, count=meta['n_records'] - self.size,
+                                  offset=self.size * RECORD_DTYPE.itemsize)
+            self._extend(records)
+        self.meta = meta
+
+    def _apply_deletions(self, rows):
+        self._info['source'][rows] = SOURCE_DELETED
+        self._norms[rows] = np.inf
+
+    def remove(self, rows):
+        """
+        Masks rows of deleted predictions, in memory and in the record file.
+
+        Each record's source byte is overwritten in place; the metadata's deletion count
+        tells other processes to re-read the masks.
+        """
+        if len(rows) == 0:
+            return
+        with self._lock:
+            self._apply_deletions(rows)
+            source_offset = RECORD_DTYPE.fields['source'][1]
+            with open(self.path, 'r+b') as f:
+                for row in rows:
+                    f.seek(int(row) * RECORD_DTYPE.itemsize + source_offset)
+                    f.write(bytes([SOURCE_DELETED]))
+            self.meta['n_deleted'] = self.meta.get('n_deleted', 0) + len(rows)
+            _write_meta(self.path, self.meta)
+
+    def sync(self, db_manager, plan):
+        """
+        Appends every prediction logged since the last sync and masks the ones deleted since.
+        Returns the number of rows added.
+
+        Deletions are detected by comparing the predictions counter with the indexed rows, so
+        the full list of prediction ids is only read after predictions were deleted.
+        """
+        predictions = db_manager.get_predictions_after(self.meta['last_prediction_id'], columnar=True)
+        with self._lock:
+            self._catch_up()
+        records = _prediction_records(predictions, plan)
+        records = records[records['ref_id'] > self.meta['last_prediction_id']]
+        self.append(records)
+
+        totals = db_manager.get_system_totals()
+        logged = sum(value for name, value in totals.items() if name.startswith('predictions.class:'))
+        with self._lock:
+            indexed = np.flatnonzero(self._info['source'][:self.size] == SOURCE_PREDICTION)
+        if len(indexed) > logged:
+            live = db_manager.get_prediction_ids()
+            deleted = indexed[[ref_id not in live for ref_id in self._info['ref_id'][indexed].tolist()]]
+            self.remove(deleted)
+        return len(records)
+
+    def query(self, vector, k=SIMILAR_PATIENTS_K, exclude_patient_id=None):
+        """
+        Finds the `k` reference rows closest to one scaled vector.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Row positions and Euclidean distances, nearest first.
+        """
+        q = np.asarray(vector, dtype=np.float32).ravel()
+        q_norm = float(q @ q)
+        # Appends replace the buffers as they grow; rows below the snapshot's size never move
+        with self._lock:
+            n_rows, vectors, norms, info = self.size, self._vectors, self._norms, self._info
+        best_rows = np.empty(0, dtype=np.intp)
+        best_d2 = np.empty(0, dtype=np.float32)
+
+        for start in range(0, n_rows, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, n_rows)
+            d2 = norms[start:stop] - 2.0 * (vectors[start:stop] @ q) + q_norm
+            if exclude_patient_id is not None:
+                d2[info['patient_id'][start:stop] == exclude_patient_id] = np.inf
+            if len(d2) > k:
+                top = np.argpartition(d2, k)[:k]
+            else:
+                top = np.arange(len(d2))
+            best_rows = np.concatenate([best_rows, top + start])
+            best_d2 = np.concatenate([best_d2, d2[top]])
+            if len(best_d2) > k:
+                keep = np.argpartition(best_d2, k)[:k]
+                best_rows, best_d2 = best_rows[keep], best_d2[keep]
+
+        order = np.argsort(best_d2, kind='stable')
+        best_rows, best_d2 = best_rows[order], best_d2[order]
+        found = np.isfinite(best_d2)
+        return best_rows[found], np.sqrt(np.maximum(best_d2[found], 0.0))
+
+    def similar_patients(self, features, artifacts, k=SIMILAR_PATIENTS_K, exclude_patient_id=None):
+        """
+        The `k` most similar historical cases for one raw feature dict, as a display-ready DataFrame.
+
+        Only the features the model can distinguish are shown, decoded from the scaled vectors.
+        """
+        plan = artifacts['feature_plan']
+        rows, distances = self.query(plan.transform(features)[0], k, exclude_patient_id)
+        with self._lock:
+            info = self._info[rows]
+        vectors = info['vector'].astype(np.float64)
+
+        decoded = {}
+        for src, idx, mean, scale in plan.numeric:
+            decoded[src] = vectors[:, idx] * scale + mean
+        for src, (indices, table, _) in plan.categorical.items():
+            if src in ('CancerStage', 'Metastasis'):
+                labels = {int(encoded[0]): value for value, encoded in table.items()}
+                decoded[src] = [labels.get(int(round(v)), '') for v in vectors[:, indices[0]]]
+
+        is_training = info['source'] == SOURCE_TRAINING
+        outcome = np.where(
+            is_training,
+            np.where(info['outcome'] >= 0.5, 'Deceased', 'Alive'),
+            [f"Predicted {p:.2f}" for p in info['outcome']],
+        )
+        return pd.DataFrame({
+            'Source': np.where(is_training, 'Training data', 'Logged prediction'),
+            'Age': np.rint(decoded['Age']).astype(int),
+            'Cancer Stage': decoded['CancerStage'],
+            'Tumor Size (cm)': np.round(decoded['TumorSize'], 1),
+            'Metastasis': decoded['Metastasis'],
+            'Outcome': outcome,
+            'Distance': np.round(distances, 3),
+        })
+
+
+def build_index(path=SIMILAR_INDEX_PATH, artifacts=None, db_manager=None,
+                X_path='dataset/processed/X_train_scaled.csv', y_path='dataset/processed/y_train.csv'):
+    """
+    Writes a fresh index from the training set, plus every logged prediction when `db_manager` is given.
+
+    Both files are written to temporary paths and renamed into place.
+    """
+    artifacts = artifacts or read_model_artifacts()
+    plan = artifacts['feature_plan']
+
+    X = pd.read_csv(X_path)[SELECTED_FEATURES].to_numpy(dtype=np.float32)
+    y = pd.read_csv(y_path).iloc[:, 0].to_numpy()
+    training = np.zeros(len(X), dtype=RECORD_DTYPE)
+    training['vector'] = X
+    training['source'] = SOURCE_TRAINING
+    training['ref_id'] = np.arange(len(X))
+    training['patient_id'] = -1
+    training['outcome'] = y
+
+    predictions = db_manager.get_predictions_after(0, columnar=True) if db_manager else {'prediction_id': ()}
+    records = np.concatenate([training, _prediction_records(predictions, plan)])
+
+    tmp_path = path + '.tmp'
+    records.tofile(tmp_path)
+    meta = {
+        'version': INDEX_FORMAT_VERSION,
+        'columns': SELECTED_FEATURES,
+        'plan_sha256': plan_fingerprint(plan),
+        'n_records': len(records),
+        'last_prediction_id': int(max(predictions['prediction_id'], default=0)),
+    }
+    os.replace(tmp_path, path)
+    _write_meta(path, meta)
+    return meta
+
+
+@st.cache_resource(max_entries=1)
+def _open_index(path, plan_sha256):
+    """Opens the index once per process; returns None if it was built with a different feature encoding."""
+    index = SimilarPatientsIndex.open(path)
+    if index.meta['plan_sha256'] != plan_sha256:
+        print(f"Similar patients index {path} does not match the current model; rebuild it.")
+        return None
+    return index
+
+
+def load_similar_patients_index(path=SIMILAR_INDEX_PATH):
+    """Returns the shared index, loading it on first use, or None if it has not been built."""
+    if not os.path.exists(path) or not os.path.exists(_meta_path(path)):
+        return None
+    artifacts = load_model_artifacts()
+    return _open_index(path, plan_fingerprint(artifacts['feature_plan']))
+
+
+def benchmark(path, n_rows=100_000, queries=1_000, k=SIMILAR_PATIENTS_K, seed=0):
+    """
+    Measures query latency on an index grown to `n_rows` by appending jittered training rows,
+    checking every answer against a plain full-sort search.
+    """
+    base = SimilarPatientsIndex.open(path)
+    rng = np.random.default_rng(seed)
+    source = base._info[:base.size]
+    extra = source[rng.integers(len(source), size=max(0, n_rows - base.size))].copy()
+    extra['vector'] += rng.normal(0, 0.05, size=extra['vector'].shape).astype(np.float32)
+    index = SimilarPatientsIndex(path, dict(base.meta), np.concatenate([source, extra]))
+
+    probes = index._vectors[rng.integers(index.size, size=queries)] + rng.normal(0, 0.1, size=(queries, index._vectors.shape[1])).astype(np.float32)
+    latencies = []
+    mismatches = 0
+    for q in probes:
+        start = time.perf_counter()
+        rows, distances = index.query(q, k)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        exact = np.sort(np.sqrt(((index._vectors[:index.size] - q) ** 2).sum(axis=1)))[:k]
+        mismatches += not np.allclose(distances, exact, atol=1e-3)
+
+    return {
+        'rows': index.size,
+        'queries': queries,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'mismatches': mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, update or benchmark the similar patients index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Rebuild the index from the training set and the predictions table")
+    build.add_argument('--path', default=SIMILAR_INDEX_PATH)
+    build.add_argument('--training-only', action='store_true', help="Skip logged predictions")
+
+    sync = subparsers.add_parser('sync', help="Append predictions logged since the last build or sync")
+    sync.add_argument('--path', default=SIMILAR_INDEX_PATH)
+
+    bench = subparsers.add_parser('bench', help="Measure k-NN query latency at a given index size")
+    bench.add_argument('--path', default=SIMILAR_INDEX_PATH)
+    bench.add_argument('--rows', type=int, default=100_000)
+    bench.add_argument('--queries', type=int, default=1_000)
+    bench.add_argument('-k', type=int, default=SIMILAR_PATIENTS_K)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from database import DatabaseManager
+        db_manager = None if args.training_only else DatabaseManager()
+        meta = build_index(args.path, db_manager=db_manager)
+        print(f"Built {args.path}: {meta['n_records']} rows "
+              f"({os.path.getsize(args.path) / 1e6:.1f} MB, last prediction_id {meta['last_prediction_id']})")
+    elif args.command == 'sync':
+        from database import DatabaseManager
+        index = SimilarPatientsIndex.open(args.path)
+        added = index.sync(DatabaseManager(), read_model_artifacts()['feature_plan'])
+        print(f"Appended {added} predictions; index now holds {len(index)} rows.")
+    else:
+        r = benchmark(args.path, args.rows, args.queries, args.k)
+        print(f"{r['queries']} queries for k={args.k} over {r['rows']} rows: "
+              f"p50 {r['p50_ms']:.3f} ms, p99 {r['p99_ms']:.3f} ms, {r['mismatches']} mismatches against a full sort")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import sqlite3
+import time
+
+from archive import including_archives
+from configs import DB_PATH
+
+# Each patient's latest prediction, in the order the history lists use (newest timestamp, then highest id)
+LATEST_PREDICTIONS = """
+    SELECT patient_id, prediction_id, doctor_id, prediction_timestamp, predicted_class, prediction_probability
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (
+            PARTITION BY patient_id ORDER BY prediction_timestamp DESC, prediction_id DESC
+        ) AS rn
+        FROM predictions
+    )
+    WHERE rn = 1
+"""
+
+# --- Summary Definitions ---
+# Ordered (table, columns, count column, query computing the table from scratch). Triggers added by
+# migration 5 keep the tables in step with every write; rows whose count dropped to zero are kept,
+# so they are ignored when comparing. system_totals comes last: rebuilding patient_latest_prediction
+# fires the triggers that count patients by latest risk class.
+SUMMARY_TABLES = [
+    ('doctor_risk_counts', ['doctor_id', 'predicted_class', 'predictions'], 'predictions', """
+        SELECT doctor_id, predicted_class, COUNT(*) FROM predictions GROUP BY doctor_id, predicted_class
+    """),
+    ('doctor_assignment_counts', ['doctor_id', 'status', 'assignments'], 'assignments', """
+        SELECT doctor_id, status, COUNT(*) FROM doctor_patient_assignments GROUP BY doctor_id, status
+    """),
+    ('patient_latest_prediction', ['patient_id', 'prediction_id', 'doctor_id', 'prediction_timestamp',
+                                   'predicted_class', 'prediction_probability'], None, LATEST_PREDICTIONS),
+    ('system_totals', ['name', 'value'], 'value', f"""
+        SELECT 'users.role:' || role, COUNT(*) FROM users GROUP BY role
+        UNION ALL
+        SELECT 'users.status:' || status, COUNT(*) FROM users GROUP BY status
+        UNION ALL
+        SELECT 'predictions.class:' || predicted_class, COUNT(*) FROM predictions GROUP BY predicted_class
+        UNION ALL
+        SELECT 'assignments.status:' || status, COUNT(*) FROM doctor_patient_assignments GROUP BY status
+        UNION ALL
+        SELECT 'patients.latest:' || predicted_class, COUNT(*) FROM ({LATEST_PREDICTIONS}) GROUP BY predicted_class
+    """),
+]
+
+# Statements filling the (empty or stale) summary tables from the base tables, in order
+REBUILD_STATEMENTS = [
+    statement
+    for table, columns, _, query in SUMMARY_TABLES
+    for statement in (f"DELETE FROM {table}", f"INSERT INTO {table} ({', '.join(columns)}) {query}")
+]
+
+
+def check_summaries(conn):
+    """
+    Recomputes every summary table from scratch and compares it with the stored one.
+
+    Returns:
+        dict: table -> (missing, extra): rows the table should hold but does not, and rows it holds
+              but should not. Both lists are empty for a consistent table.
+    """
+    report = {}
+    # Archived predictions stay counted (see archive.py), so they are recounted with the hot ones
+    with including_archives(conn):
+        for table, columns, count_column, query in SUMMARY_TABLES:
+            stored = f"SELECT {', '.join(columns)} FROM {table}" + (f" WHERE {count_column} != 0" if count_column else "")
+            missing = conn.execute(f"SELECT * FROM ({query}) EXCEPT {stored}").fetchall()
+            extra = conn.execute(f"{stored} EXCEPT SELECT * FROM ({query})").fetchall()
+            report[table] = ([tuple(row) for row in missing], [tuple(row) for row in extra])
+    return report
+
+
+def rebuild_summaries(conn):
+    """Refills every summary table from the base tables, archived predictions included, in one IMMEDIATE transaction."""
+    with including_archives(conn):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statement in REBUILD_STATEMENTS:
+                conn.execute(statement)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check or rebuild the trigger-maintained summary tables.")
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--db', default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    start = time.perf_counter()
+    if args.command == 'rebuild':
+        rebuild_summaries(conn)
+        print(f"Rebuilt {len(SUMMARY_TABLES)} summary tables in {time.perf_counter() - start:.2f}s.")
+        conn.close()
+        return
+
+    failures = 0
+    for table, (missing, extra) in check_summaries(conn).items():
+        problems = f": {len(missing)} missing, {len(extra)} extra row(s)" if missing or extra else ""
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<6}{table}{problems}")
+        for row in missing[:5]:
+            print(f"        missing {row}")
+        for row in extra[:5]:
+            print(f"        extra   {row}")
+    print(f"{len(SUMMARY_TABLES) - failures}/{len(SUMMARY_TABLES)} summary tables consistent "
+          f"({time.perf_counter() - start:.2f}s).")
+    conn.close()
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
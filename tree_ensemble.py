@@ -0,0 +1,202 @@
+import json
+import time
+
+import numpy as np
+
+# Rows evaluated per block; bounds the (rows x splits) comparison matrix for large batches
+BLOCK_ROWS = 8192
+
+
+class TreeEnsemble:
+    """
+    A gradient-boosted tree ensemble flattened into contiguous node arrays.
+
+    All trees share one set of node arrays (feature, threshold, left/right child,
+    default direction, leaf value); `roots` holds each tree's first node. For scoring,
+    every tree is re-laid out as a perfect binary tree of depth `max_depth` in level
+    order, so walking a level is index arithmetic (2 * node + 1 or + 2) instead of a
+    child lookup, and all split comparisons for a batch are computed in one pass.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth, base_margin):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=np.bool_)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.base_margin = np.float32(base_margin)
+        self._build_dense_layout()
+
+    def _build_dense_layout(self):
+        """Pads every tree to a perfect binary tree of depth `max_depth`, stored level by level."""
+        n_trees, n_internal = len(self.roots), 2 ** self.max_depth - 1
+        self._split_feature = np.zeros((n_trees, n_internal), dtype=np.intp)
+        # A leaf reached early becomes a pass-through split whose whole subtree repeats its value
+        self._split_threshold = np.full((n_trees, n_internal), np.inf, dtype=np.float32)
+        self._split_default_left = np.ones((n_trees, n_internal), dtype=np.bool_)
+        self._leaf_value = np.zeros((n_trees, n_internal + 1), dtype=np.float32)
+
+        for t, root in enumerate(self.roots):
+            stack = [(int(root), 0)]  # (node in the flat arrays, slot in the dense tree)
+            while stack:
+                node, slot = stack.pop()
+                if slot >= n_internal:
+                    self._leaf_value[t, slot - n_internal] = self.value[node]
+                elif self.left[node] == node:
+                    stack.extend([(node, 2 * slot + 1), (node, 2 * slot + 2)])
+                else:
+                    self._split_feature[t, slot] = self.feature[node]
+                    self._split_threshold[t, slot] = self.threshold[node]
+                    self._split_default_left[t, slot] = self.default_left[node]
+                    stack.extend([(int(self.left[node]), 2 * slot + 1), (int(self.right[node]), 2 * slot + 2)])
+
+        # Group splits by feature so each feature row of X is compared against all its thresholds in one broadcast
+        split_feature = self._split_feature.ravel()
+        order = np.argsort(split_feature, kind='stable')
+        self._feature_groups = [
+            (int(f), self._split_threshold.ravel()[order][split_feature[order] == f][:, None],
+             self._split_default_left.ravel()[order][split_feature[order] == f][:, None])
+            for f in np.unique(split_feature)
+        ]
+        # Row of the grouped comparison matrix holding dense split `slot` of tree `t`: _split_row[t * n_internal + slot]
+        self._split_row = np.empty(n_trees * n_internal, dtype=np.intp)
+        self._split_row[order] = np.arange(n_trees * n_internal)
+        self._tree_split_offset = (np.arange(n_trees, dtype=np.intp) * n_internal)[:, None]
+        self._tree_leaf_offset = (np.arange(n_trees, dtype=np.intp) * (n_internal + 1))[:, None]
+        self._leaf_value = self._leaf_value.ravel()
+
+    @classmethod
+    def from_xgboost(cls, booster):
+        """Flattens an XGBoost booster (binary:logistic, numeric splits only) into node arrays."""
+        model = json.loads(booster.save_raw(raw_format='json'))['learner']
+        objective = model['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective: {objective}")
+
+        feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        for tree in model['gradient_booster']['model']['trees']:
+            if any(tree['split_type']):
+                raise ValueError("Categorical splits are not supported.")
+            offset = len(feature)
+            roots.append(offset)
+            depth = [0] * len(tree['left_children'])
+            for node, (l, r) in enumerate(zip(tree['left_children'], tree['right_children'])):
+                is_leaf = l == -1
+                feature.append(0 if is_leaf else tree['split_indices'][node])
+                threshold.append(0.0 if is_leaf else tree['split_conditions'][node])
+                left.append(offset + (node if is_leaf else l))
+                right.append(offset + (node if is_leaf else r))
+                default_left.append(bool(tree['default_left'][node]))
+                value.append(tree['split_conditions'][node] if is_leaf else 0.0)
+                if not is_leaf:
+                    depth[l] = depth[r] = depth[node] + 1
+            max_depth = max(max_depth, max(depth))
+
+        # base_score is stored as a probability, e.g. "[5E-1]"; the margin is its logit
+        base_score = np.float32(model['learner_model_param']['base_score'].strip('[]'))
+        base_margin = np.log(base_score / (np.float32(1) - base_score))
+        return cls(feature, threshold, left, right, default_left, value, roots, max_depth, base_margin)
+
+    def arrays(self):
+        """The node arrays, keyed by name, for serialization."""
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left, 'right': self.right,
+            'default_left': self.default_left, 'value': self.value, 'roots': self.roots,
+        }
+
+    def params(self):
+        """Scalar parameters that complete `arrays()`."""
+        return {'max_depth': self.max_depth, 'base_margin': float(self.base_margin)}
+
+    @classmethod
+    def from_arrays(cls, arrays, params):
+        """Rebuilds an ensemble from `arrays()` and `params()` (e.g. zero-copy views from a bundle)."""
+        return cls(**arrays, **params)
+
+    def predict_margin(self, X):
+        """Raw (pre-sigmoid) scores for every row of X."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        margin = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), BLOCK_ROWS):
+            margin[start:start + BLOCK_ROWS] = self._margin_block(X[start:start + BLOCK_ROWS])
+        return margin
+
+    def _margin_block(self, X):
+        n_internal = 2 ** self.max_depth - 1
+        X_t = X.T
+
+        # Evaluate every split of every tree at once: go left when x < threshold, or when x is missing and the default is left
+        blocks = []
+        for f, thresholds, default_left in self._feature_groups:
+            x = X_t[f]
+            go_left = x < thresholds
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, default_left, go_left)
+            blocks.append(go_left)
+        go_left = np.concatenate(blocks)
+
+        # Walk all trees one level at a time: child of slot i is 2i+1 (left) or 2i+2 (right)
+        slot = np.zeros((len(self.roots), len(X)), dtype=np.intp)
+        for _ in range(self.max_depth):
+            left = np.take_along_axis(go_left, self._split_row[self._tree_split_offset + slot], axis=0)
+            slot = 2 * slot + 2 - left
+        leaves = self._leaf_value[self._tree_leaf_offset + slot - n_internal]
+
+        # Accumulate leaves tree by tree in float32, the same order XGBoost uses
+        margin = np.full(len(X), self.base_margin, dtype=np.float32)
+        for tree_leaves in leaves:
+            margin += tree_leaves
+        return margin
+
+    def predict_proba(self, X):
+        """Returns [P(class 0), P(class 1)] per row, like XGBClassifier.predict_proba."""
+        margin = self.predict_margin(X)
+        # exp in float64 rounded to float32 matches the correctly rounded expf used by XGBoost
+        positive = np.float32(1) / (np.exp(-margin.astype(np.float64)).astype(np.float32) + np.float32(1))
+        return np.vstack((1 - positive, positive)).transpose()
+
+
+def _latency_ms(fn, X, repeat):
+    fn(X)  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e3
+
+
+def compare_with_xgboost(X_path='dataset/processed/X_test_scaled.csv'):
+    """Reports agreement and latency of the NumPy evaluator against the pickled XGB model."""
+    import pandas as pd
+    from utils import read_model_artifacts, SELECTED_FEATURES, classify_risk_array
+
+    model = read_model_artifacts()['model']
+    ensemble = TreeEnsemble.from_xgboost(model.get_booster())
+    X = pd.read_csv(X_path)[SELECTED_FEATURES].to_numpy(dtype=np.float32)
+
+    expected = model.predict_proba(X)[:, 1]
+    actual = ensemble.predict_proba(X)[:, 1]
+    print(f"Trees: {len(ensemble.roots)}, nodes: {len(ensemble.value)}, max depth: {ensemble.max_depth}")
+    print(f"Rows compared: {len(X)}")
+    print(f"Bit-identical probabilities: {np.mean(expected == actual):.2%}")
+    print(f"Max abs difference: {np.abs(expected - actual).max():.3e}")
+    print(f"Risk class agreement: {np.mean(classify_risk_array(expected) == classify_risk_array(actual)):.2%}")
+
+    import copy
+    single_thread = copy.deepcopy(model).set_params(n_jobs=1)
+    X_large = X[np.random.default_rng(0).integers(len(X), size=10_000)]
+    print(f"{'':14}{'XGBoost (ms)':>14}{'XGBoost 1T (ms)':>17}{'NumPy (ms)':>12}")
+    for label, batch, repeat in (('1 row', X[:1], 200), ('10k rows', X_large, 20)):
+        print(f"{label:14}{_latency_ms(model.predict_proba, batch, repeat):>14.3f}"
+              f"{_latency_ms(single_thread.predict_proba, batch, repeat):>17.3f}"
+              f"{_latency_ms(ensemble.predict_proba, batch, repeat):>12.3f}")
+
+
+if __name__ == "__main__":
+    compare_with_xgboost()
@@ -1,6 +1,7 @@
 import streamlit as st
 from auth import logout
 from configs import UserRole
+from models import Page
 
 def render_sidebar_and_auth(required_role: UserRole):
     """
@@ -32,7 +33,7 @@ def render_sidebar_and_auth(required_role: UserRole):
 
         # Define navigation options based on user role
         if st.session_state['role'] == UserRole.ADMIN.value:
-            nav_options = ["User Management", "Doctor Approvals"]
+            nav_options = ["User Management", "Doctor Approvals", "System Overview"]
         elif st.session_state['role'] == UserRole.DOCTOR.value:
             nav_options = ["My Dashboard", "Predict", "Patient Requests"]
         else: # Patient
@@ -54,30 +55,47 @@ def reset_pagination():
     """Resets the page number to the first page, used for search."""
     if 'page_number' in st.session_state:
         st.session_state.page_number = 0
+    st.session_state.page_cursors = [None]
 
-def render_pagination(total_items: int, items_per_page: int):
+def get_page_cursor():
     """
-    Renders the pagination controls and handles page number state.
+    Returns the keyset cursor of the current page, to pass to the paginated DatabaseManager methods.
 
-    Args:
-        total_items (int): The total number of items in the list being paginated.
-        items_per_page (int): The number of items to display on each page.
+    Cursors of the pages visited so far are kept in session state, so the previous page
+    is reached without any backward query. The first page has no cursor (None).
     """
     if 'page_number' not in st.session_state:
         st.session_state.page_number = 0
+    if 'page_cursors' not in st.session_state:
+        st.session_state.page_cursors = [None]
+    # A page number without a recorded cursor (e.g. set by another view) restarts from the first page
+    if st.session_state.page_number >= len(st.session_state.page_cursors):
+        st.session_state.page_number = 0
+    return st.session_state.page_cursors[st.session_state.page_number]
+
+def render_pagination(page: Page, items_per_page: int):
+    """
+    Renders the pagination controls for a keyset-paginated list and handles the cursor state.
+
+    Args:
+        page (Page): The page currently displayed, as returned by a paginated DatabaseManager method.
+        items_per_page (int): The number of items to display on each page.
+    """
+    get_page_cursor()  # initializes the page state
+
+    # --- A page emptied by deletions falls back to the first page ---
+    if not page.items and st.session_state.page_number > 0:
+        reset_pagination()
+        st.rerun()
 
     # --- Calculate total pages ---
-    total_pages = (total_items + items_per_page - 1) // items_per_page
+    total_pages = (page.total + items_per_page - 1) // items_per_page
     # Ensure total_pages is at least 1
     total_pages = max(1, total_pages)
 
-    # --- Adjust page number if it exceeds total pages ---
-    if st.session_state.page_number >= total_pages:
-        st.session_state.page_number = 0
-
     # --- Disable buttons if at the start or end ---
     prev_disabled = st.session_state.page_number == 0
-    next_disabled = st.session_state.page_number >= total_pages - 1
+    next_disabled = page.next_cursor is None
 
     st.divider()
 
@@ -91,8 +109,11 @@ def render_pagination(total_items: int, items_per_page: int):
 
     with nav_cols[3]:
         if st.button("➡️", disabled=next_disabled, help="Next Page"):
+            # Forget cursors beyond the current page, then record where the next page starts
+            st.session_state.page_cursors = st.session_state.page_cursors[:st.session_state.page_number + 1]
+            st.session_state.page_cursors.append(page.next_cursor)
             st.session_state.page_number += 1
             st.rerun()
 
     with nav_cols[2]:
-        st.write(f"Page {st.session_state.page_number + 1} of {total_pages}")
\ No newline at end of file
+        st.write(f"Page {st.session_state.page_number + 1} of {total_pages}{'' if page.total_is_exact else '+'}")
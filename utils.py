@@ -1,14 +1,24 @@
 import streamlit as st
 import pickle
+import numpy as np
 import pandas as pd
 import struct
 from datetime import date
+from configs import LOW_RISK_THRESHOLD, HIGH_RISK_THRESHOLD, MODEL_DIR, TREATMENT_TYPES, COMORBIDITIES
+from feature_plan import compile_feature_plan
+from model_bundle import load_bundle_artifacts, source_fingerprint, artifact_mtimes
 
-MODEL_DIR = 'models/'
+# Model input columns, in the order the XGB model was trained on
+SELECTED_FEATURES = [
+    'Age', 'TumorSize', 'CancerStage', 'Metastasis',
+    'TumorType_Stomach',
+    'TreatmentType_Radiation',
+    'Comorbidities_Diabetes, Hepatitis B', 'Comorbidities_Diabetes, Hypertension',
+    'Comorbidities_Hypertension, Hepatitis B', 'Comorbidities_No Comorbidities'
+]
 
-@st.cache_resource
-def load_model_artifacts():
-    """Loads the model and preprocessing artifacts from the specified directory."""
+def read_model_artifacts():
+    """Reads the model and preprocessing artifacts from disk (uncached, safe to call outside Streamlit)."""
     with open(f"{MODEL_DIR}XGB_cancer.pkl", 'rb') as f:
         model = pickle.load(f)
     with open(f"{MODEL_DIR}label_encoders.pkl", 'rb') as f:
@@ -21,9 +31,24 @@ def load_model_artifacts():
         'model': model,
         'label_encoders': label_encoders,
         'ohe': ohe,
-        'scaler': scaler
+        'scaler': scaler,
+        'feature_plan': compile_feature_plan(label_encoders, ohe, scaler, SELECTED_FEATURES),
+        'model_hash': source_fingerprint(MODEL_DIR)
     }
 
+@st.cache_resource(max_entries=1)
+def _load_model_artifacts(artifact_versions):
+    """Loads the artifacts once per version of the files on disk."""
+    return load_bundle_artifacts() or read_model_artifacts()
+
+def load_model_artifacts():
+    """
+    Loads the model and preprocessing artifacts, preferring the memory-mapped model bundle
+    and falling back to the pickles when no up-to-date bundle has been exported.
+    Replacing any artifact file on disk makes the next call load the new version.
+    """
+    return _load_model_artifacts(artifact_mtimes())
+
 def ordinal_encode(df, ordinal_encoders):
     """Applies ordinal encoding to the specified features using the provided encoders."""
     for col, encoder in ordinal_encoders.items():
@@ -50,13 +75,7 @@ def one_hot_encode(df, ohe_dict):
 
 def feature_selection(df):
     """Selects the relevant features for the model."""
-    selected_columns = [
-        'Age', 'TumorSize', 'CancerStage', 'Metastasis',
-        'TumorType_Stomach',
-        'TreatmentType_Radiation',
-        'Comorbidities_Diabetes, Hepatitis B', 'Comorbidities_Diabetes, Hypertension',
-        'Comorbidities_Hypertension, Hepatitis B', 'Comorbidities_No Comorbidities'
-    ]
+    selected_columns = SELECTED_FEATURES
     df_selected = pd.DataFrame(columns=selected_columns)
     for col in selected_columns:
         if col in df.columns:
@@ -71,8 +90,8 @@ def scale_features(df, scaler):
     df[numeric_cols] = scaler.transform(df[numeric_cols])
     return df
 
-def preprocess_for_prediction(input_df, artifacts):
-    """Preprocess user's input for prediction using the loaded artifacts."""
+def preprocess_dataframe(input_df, artifacts):
+    """Reference DataFrame pipeline, kept for parity checks against the compiled feature plan."""
     input_df = pd.DataFrame(input_df)
 
     # Apply label encoding
@@ -85,6 +104,43 @@ def preprocess_for_prediction(input_df, artifacts):
     input_df = scale_features(input_df, artifacts['scaler'])
     return input_df
 
+def preprocess_for_prediction(features, artifacts):
+    """
+    Preprocess user's input for prediction using the compiled feature plan.
+
+    Accepts a feature dict, a list of feature dicts, a DataFrame or a dict of column arrays
+    and returns a float32 matrix in the model's column order.
+    """
+    return artifacts['feature_plan'].transform(features)
+
+def score_treatment_options(features, artifacts, vary_comorbidities=False):
+    """
+    Scores one patient under every treatment type (and optionally every comorbidity option)
+    as a single batch: one feature-plan transform and one model call.
+
+    Returns:
+        pd.DataFrame: One row per scenario with 'TreatmentType', 'Comorbidities',
+        'prediction_probability' and 'predicted_class', ranked from lowest to highest risk.
+    """
+    treatments = list(dict.fromkeys(TREATMENT_TYPES))
+    comorbidities = list(dict.fromkeys(COMORBIDITIES)) if vary_comorbidities else [features['Comorbidities']]
+    n_rows = len(treatments) * len(comorbidities)
+
+    scenarios = {col: np.full(n_rows, value, dtype=object) for col, value in features.items()}
+    scenarios['TreatmentType'] = np.repeat(np.array(treatments, dtype=object), len(comorbidities))
+    scenarios['Comorbidities'] = np.tile(np.array(comorbidities, dtype=object), len(treatments))
+
+    X = artifacts['feature_plan'].transform(scenarios)
+    probabilities = artifacts['model'].predict_proba(X)[:, 1]
+
+    results = pd.DataFrame({
+        'TreatmentType': scenarios['TreatmentType'],
+        'Comorbidities': scenarios['Comorbidities'],
+        'prediction_probability': probabilities,
+        'predicted_class': classify_risk_array(probabilities),
+    })
+    return results.sort_values('prediction_probability', kind='stable').reset_index(drop=True)
+
 def to_float(x):
     """Safely converts various types to float."""
     if isinstance(x, float):
@@ -104,6 +160,20 @@ def to_float(x):
                 return struct.unpack('f', x)[0]
     return float(x) if x is not None else 0.0
 
+def classify_risk(probability):
+    """Maps a predicted probability to its risk class."""
+    if probability >= HIGH_RISK_THRESHOLD:
+        return "High Risk"
+    elif probability < LOW_RISK_THRESHOLD:
+        return "Low Risk"
+    return "Medium Risk"
+
+def classify_risk_array(probabilities):
+    """Vectorized classify_risk for a batch of probabilities."""
+    probabilities = np.asarray(probabilities)
+    return np.where(probabilities >= HIGH_RISK_THRESHOLD, "High Risk",
+                    np.where(probabilities < LOW_RISK_THRESHOLD, "Low Risk", "Medium Risk"))
+
 def highlight_risk(val):
     color = ""
     if val == "High Risk":